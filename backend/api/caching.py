@@ -0,0 +1,68 @@
+"""
+Conditional GET for per-user read endpoints.
+
+Every write to a user's readings, baselines or energy budgets bumps
+users.data_version (SQLite triggers, see backend.models), so the version
+identifies the state of everything those endpoints return. The endpoint
+dependencies here read it with a single primary key lookup and answer
+If-None-Match polls whose ETag is still current with 304, before the
+endpoint runs any query or serializes anything. They use the async session
+(shared with the async endpoints), so a poll never waits for a thread.
+
+The ETags are weak: GZipMiddleware compresses the same representation for
+clients sending Accept-Encoding: gzip, so the bytes differ by encoding
+while the data does not. If-None-Match uses weak comparison anyway
+(RFC 9110 13.1.2), and every response carries Vary: Accept-Encoding.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import get_async_db
+from backend.models import User
+
+async def data_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current data version of a user, or None if there is no such user"""
+    return await db.scalar(select(User.data_version).where(User.id == user_id))
+
+def make_etag(user_id: int, version: int, *parts: object) -> str:
+    """Weak ETag for a user's data version and any further state the response depends on"""
+    tag = f"{user_id}.{version}"
+    if parts:
+        tag += "." + hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+    return f'W/"{tag}"'
+
+def _opaque_tag(etag: str) -> str:
+    """ETag without its weakness indicator, for weak comparison"""
+    return etag[2:] if etag.startswith("W/") else etag
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """
+    Answer 304 if the request's If-None-Match lists etag (weak comparison),
+    otherwise set it on the response.
+
+    Raises:
+        HTTPException: 304 Not Modified (no body)
+    """
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {_opaque_tag(candidate.strip()) for candidate in if_none_match.split(",")}
+        if _opaque_tag(etag) in candidates or "*" in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+async def user_data_etag(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+) -> None:
+    """
+    Endpoint dependency: ETag from the user's data version (unknown users
+    are left to the endpoint).
+    """
+    version = await data_version(db, user_id)
+    if version is not None:
+        check_etag(request, response, make_etag(user_id, version))
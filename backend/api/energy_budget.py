@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
-from backend.database import get_db
+from datetime import datetime, timedelta
+from backend.database import get_async_db, get_db
 from backend.models import User, HRVReading, Baseline, EnergyBudget
 from backend.baseline_tracker import BaselineTracker
 from backend.energy_budget_calculator import EnergyBudgetCalculator
+from backend.api.pagination import MAX_PAGE_SIZE, keyset_page, set_page_links
+from backend.api.projection import ResponseFormat, projected_response, select_fields
+from backend.api.caching import check_etag, data_version, make_etag, user_data_etag
 
 router = APIRouter()
 baseline_tracker = BaselineTracker()
@@ -53,6 +58,31 @@ class HRVInterpretation(BaseModel):
     interpretation: str
     color: str
 
+async def trend_etag(
+    user_id: int,
+    days: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+) -> None:
+    """
+    ETag dependency of the trend endpoint. Its window ends now, so scores
+    leave and enter it without any write; the first and last date inside
+    the window (an index-only lookup) pin down which ones it holds.
+    """
+    version = await data_version(db, user_id)
+    if version is None:
+        return
+    end_date = datetime.utcnow()
+    window = (await db.execute(
+        select(func.min(EnergyBudget.date), func.max(EnergyBudget.date)).where(
+            EnergyBudget.user_id == user_id,
+            EnergyBudget.date >= end_date - timedelta(days=days),
+            EnergyBudget.date <= end_date
+        )
+    )).one()
+    check_etag(request, response, make_etag(user_id, version, days, *window))
+
 @router.post("/{user_id}/baseline", response_model=BaselineResponse)
 def calculate_baseline(user_id: int, db: Session = Depends(get_db)):
     """
@@ -85,8 +115,8 @@ def calculate_baseline(user_id: int, db: Session = Depends(get_db)):
 
     return baseline
 
-@router.get("/{user_id}/baseline", response_model=BaselineResponse)
-def get_active_baseline(user_id: int, db: Session = Depends(get_db)):
+@router.get("/{user_id}/baseline", response_model=BaselineResponse, dependencies=[Depends(user_data_etag)])
+async def get_active_baseline(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get current active baseline for user.
 
@@ -96,7 +126,7 @@ def get_active_baseline(user_id: int, db: Session = Depends(get_db)):
     Returns:
         Active baseline
     """
-    baseline = baseline_tracker.get_active_baseline(db, user_id)
+    baseline = await db.run_sync(baseline_tracker.get_active_baseline, user_id)
     if not baseline:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -153,35 +183,60 @@ def calculate_energy_budget(
 
     return score
 
-@router.get("/{user_id}/readiness", response_model=List[EnergyBudgetResponse])
-def get_energy_budgets(
+@router.get("/{user_id}/readiness", response_model=List[EnergyBudgetResponse], dependencies=[Depends(user_data_etag)])
+async def get_energy_budgets(
     user_id: int,
-    limit: int = 30,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    limit: int = Query(30, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: ResponseFormat = "rows",
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get recent readiness scores for user.
+    Get readiness scores for user, newest first, one page at a time.
+
+    Follow the Link header (rel="next" for older scores, rel="prev" for
+    newer ones) to page through the history; see backend.api.pagination.
+    Rows are selected as plain columns and encoded without per-row model
+    validation; with fields= only the selected columns are queried and
+    returned (see backend.api.projection).
 
     Args:
         user_id: User ID
         limit: Maximum number of scores to return
+        before: Cursor; return scores older than it
+        after: Cursor; return scores newer than it
+        fields: Comma-separated EnergyBudgetResponse fields (id and date
+            are always included)
+        format: 'rows' (list of objects) or 'columns' (one array per field)
 
     Returns:
-        List of readiness scores
+        List of readiness scores, or {field: [values]} for format=columns
     """
-    scores = db.query(EnergyBudget).filter(
-        EnergyBudget.user_id == user_id
-    ).order_by(
-        EnergyBudget.date.desc()
-    ).limit(limit).all()
-
-    return scores
-
-@router.get("/{user_id}/readiness/trend/{days}", response_model=List[dict])
-def get_readiness_trend(
+    names = select_fields(fields, EnergyBudgetResponse, always=("id", "date"))
+    columns = [getattr(EnergyBudget, name) for name in names]
+
+    scores, next_cursor, prev_cursor = await db.run_sync(lambda session: keyset_page(
+        session.query(*columns).filter(EnergyBudget.user_id == user_id),
+        EnergyBudget.date,
+        EnergyBudget.id,
+        limit,
+        before=before,
+        after=after
+    ))
+
+    page = projected_response(scores, names, format, headers=response.headers)
+    set_page_links(request, page, next_cursor, prev_cursor)
+    return page
+
+@router.get("/{user_id}/readiness/trend/{days}", response_model=List[dict], dependencies=[Depends(trend_etag)])
+async def get_readiness_trend(
     user_id: int,
     days: int = 7,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get readiness score trend over specified days.
@@ -193,15 +248,15 @@ def get_readiness_trend(
     Returns:
         Trend data
     """
-    trend = energy_budget_calc.get_readiness_trend(db, user_id, days)
+    trend = await db.run_sync(energy_budget_calc.get_readiness_trend, user_id, days)
     return trend
 
-@router.get("/{user_id}/interpretation/{rmssd}/{mean_hr}", response_model=HRVInterpretation)
-def get_hrv_interpretation(
+@router.get("/{user_id}/interpretation/{rmssd}/{mean_hr}", response_model=HRVInterpretation, dependencies=[Depends(user_data_etag)])
+async def get_hrv_interpretation(
     user_id: int,
     rmssd: float,
     mean_hr: float,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get interpretation of HRV metrics.
@@ -215,7 +270,7 @@ def get_hrv_interpretation(
         Interpretation and recommendations
     """
     # Get active baseline
-    baseline = baseline_tracker.get_active_baseline(db, user_id)
+    baseline = await db.run_sync(baseline_tracker.get_active_baseline, user_id)
     if not baseline:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
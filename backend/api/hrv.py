@@ -1,21 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+import tempfile
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from backend.database import get_db
-from backend.models import HRVReading, User
-from backend.hrv_calculator import HRVCalculator
+from backend.database import get_async_db, get_db
+from backend.models import HRVReading, IngestJob, RawRecording, User
+from backend.compute_pool import ComputePoolBusy, analyze_batch, analyze_recording, compute_pool
+from backend.ingest_queue import JobFailed, ingest_queue
+from backend.hrv_calculator import ALGORITHM_VERSION
+from backend.hrv_stream import HRVStream
+from backend.readings import reading_values
+from backend.rr_archive import decode_rr, encode_rr
+from backend.api.rr_payload import (
+    MAX_STREAM_BEATS,
+    RR_PAYLOAD_OPENAPI,
+    RR_STREAM_OPENAPI,
+    RRIntervalsInput,
+    RRPayload,
+    decode_rr_payload,
+    decode_stream_chunk,
+    decode_stream_header,
+    iter_stream_lines,
+    read_rr_payload,
+    request_content_type
+)
+from backend.api.energy_budget import baseline_tracker, energy_budget_calc
+from backend.api.pagination import MAX_PAGE_SIZE, keyset_page, set_page_links
+from backend.api.projection import ResponseFormat, projected_response, row_response, select_fields
+from backend.api.caching import user_data_etag
 
 router = APIRouter()
-hrv_calc = HRVCalculator()
 
-class RRIntervalsInput(BaseModel):
-    """Input model for raw RR intervals"""
-    rr_intervals: List[float] = Field(..., description="List of R-R intervals in milliseconds")
-    recorded_at: datetime
-    sleep_duration: Optional[float] = None
-    sleep_quality: Optional[float] = None
+# Streamed beats handed to HRVStream per threadpool call
+_STREAM_BATCH_BEATS = 4096
+
+# Archive frames of a stream are kept in memory up to this size, then on disk
+_STREAM_ARCHIVE_SPOOL_BYTES = 256 * 1024
 
 class HRVReadingResponse(BaseModel):
     """Response model for HRV reading"""
@@ -37,6 +65,14 @@ class HRVReadingResponse(BaseModel):
     total_power: Optional[float]
     lf_hf_ratio: Optional[float]
 
+    # Nonlinear
+    sd1: Optional[float]
+    sd2: Optional[float]
+    sample_entropy: Optional[float]
+    approximate_entropy: Optional[float]
+    dfa_alpha1: Optional[float]
+    dfa_alpha2: Optional[float]
+
     # Quality
     recording_duration: Optional[float]
     artifact_percentage: Optional[float]
@@ -44,15 +80,221 @@ class HRVReadingResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.post("/{user_id}/readings", response_model=HRVReadingResponse, status_code=status.HTTP_201_CREATED)
+class BulkReadingsInput(BaseModel):
+    """Input model for uploading several recordings at once"""
+    readings: List[RRIntervalsInput]
+
+class BulkReadingResult(BaseModel):
+    """Outcome of one recording in a bulk upload"""
+    index: int  # Position in the request
+    status_code: int  # 201 if stored, 200 if already stored, otherwise the error status of a single upload
+    reading: Optional[HRVReadingResponse] = None
+    detail: Optional[str] = None
+
+class IngestJobResponse(BaseModel):
+    """Response model for a queued upload"""
+    id: int
+    user_id: int
+    status: str  # queued, running, done or failed
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    reading_id: Optional[int]
+    energy_budget_id: Optional[int]
+    error: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class IngestQueueDepth(BaseModel):
+    """Number of ingest jobs per status"""
+    queued: int
+    running: int
+    done: int
+    failed: int
+
+def _require_user(db: Session, user_id: int) -> User:
+    """Look up a user or raise 404"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
+def _content_hasher(user_id: int, recorded_at: datetime) -> 'hashlib._Hash':
+    """
+    Start the content hash of a recording; update() it with the intervals.
+
+    Intervals are hashed as little-endian float64 (see _hash_intervals),
+    so the same night hashes the same whether it was uploaded as JSON,
+    binary or a stream, and recorded_at is taken in UTC.
+    """
+    if recorded_at.tzinfo is not None:
+        recorded_at = (recorded_at - recorded_at.utcoffset()).replace(tzinfo=None)
+    return hashlib.sha256(f"{user_id}|{recorded_at.isoformat()}|".encode())
+
+def _hash_intervals(hasher: 'hashlib._Hash', rr_intervals) -> None:
+    """Add RR intervals to a content hash in canonical form"""
+    hasher.update(np.ascontiguousarray(rr_intervals, dtype="<f8"))
+
+def _content_hash(user_id: int, data) -> str:
+    """Content hash of an RRPayload or RRIntervalsInput"""
+    hasher = _content_hasher(user_id, data.recorded_at)
+    _hash_intervals(hasher, data.rr_intervals)
+    return hasher.hexdigest()
+
+def _find_duplicate(db: Session, content_hash: str) -> Optional[HRVReading]:
+    """The reading already stored for this content hash, if any"""
+    return db.query(HRVReading).filter(HRVReading.content_hash == content_hash).first()
+
+def _analysis_error(error: Exception) -> HTTPException:
+    """HTTP error for a failed analyze_recording call"""
+    if isinstance(error, ComputePoolBusy):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="HRV computation queue is full, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Error calculating HRV metrics: {str(error)}"
+    )
+
+def _valid_reading_values(user_id: int, data, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Column values for a new HRVReading (see reading_values).
+
+    Args:
+        user_id: User ID
+        data: RRPayload, RRIntervalsInput or RRStreamHeader of the recording
+        analysis: analyze_recording() or HRVStream.finish() result
+
+    Raises:
+        HTTPException: 400 if the recording failed the quality check
+    """
+    # Only uncorrectable nights (too short or too many artifacts) are rejected
+    quality = analysis['quality']
+    if not quality['is_valid']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid data quality: {', '.join(quality['issues'])}"
+        )
+    return reading_values(user_id, data, analysis)
+
+def _store_reading(
+    db: Session,
+    values: Dict[str, Any],
+    rr_data: bytes,
+    beat_count: int
+) -> Tuple[HRVReading, bool]:
+    """
+    Insert and commit one reading with its archived RR intervals (rr_archive frames).
+
+    Returns:
+        Tuple of (reading, created); created is False if a concurrent upload
+        of the same recording was stored first
+    """
+    reading = HRVReading(**values)
+    reading.raw_recording = RawRecording(
+        beat_count=beat_count,
+        rr_data=rr_data,
+        algorithm_version=ALGORITHM_VERSION
+    )
+    db.add(reading)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = _find_duplicate(db, values['content_hash'])
+        if existing is None:
+            raise
+        return existing, False
+    db.refresh(reading)
+    return reading, True
+
+def _ingest_reading(db: Session, user_id: int, data: RRPayload) -> Tuple[HRVReading, bool]:
+    """
+    Analyze and store an upload, or find the stored duplicate.
+
+    Returns:
+        Tuple of (reading, created)
+
+    Raises:
+        HTTPException: 400 for invalid data quality, 503/500 if the
+            analysis failed
+    """
+    content_hash = _content_hash(user_id, data)
+    existing = _find_duplicate(db, content_hash)
+    if existing:
+        return existing, False
+
+    # Quality check, artifact correction and metrics run in a worker process
+    try:
+        analysis = compute_pool.run(analyze_recording, data.rr_intervals)
+    except Exception as e:
+        raise _analysis_error(e)
+
+    values = dict(_valid_reading_values(user_id, data, analysis), content_hash=content_hash)
+    return _store_reading(db, values, encode_rr(data.rr_intervals), len(data.rr_intervals))
+
+def process_ingest_job(db: Session, job: IngestJob) -> None:
+    """
+    Ingest queue handler: store the reading of a queued upload, then chain
+    the energy budget calculation if the user has an active baseline.
+
+    The reading is committed before the energy budget, so a retry after a
+    failed energy budget step only repeats that step. Re-uploads of a
+    stored recording finish without an energy budget.
+
+    Raises:
+        JobFailed: Invalid payload or data quality (not retried)
+    """
+    if job.reading_id is None:
+        try:
+            data = decode_rr_payload(job.payload, job.content_type)
+            reading, created = _ingest_reading(db, job.user_id, data)
+        except RequestValidationError as e:
+            raise JobFailed(f"Invalid payload: {e.errors()}")
+        except HTTPException as e:
+            if e.status_code >= 500:
+                raise
+            raise JobFailed(e.detail)
+
+        job.reading_id = reading.id
+        db.commit()
+        if not created:
+            return
+    else:
+        reading = db.get(HRVReading, job.reading_id)
+
+    baseline = baseline_tracker.get_active_baseline(db, job.user_id)
+    if baseline is not None:
+        readiness_data = energy_budget_calc.calculate_readiness(db, job.user_id, reading, baseline)
+        score = energy_budget_calc.save_energy_budget(db, job.user_id, reading.recorded_at, readiness_data)
+        job.energy_budget_id = score.id
+
+@router.post(
+    "/{user_id}/readings",
+    response_model=HRVReadingResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=RR_PAYLOAD_OPENAPI
+)
 def create_hrv_reading(
     user_id: int,
-    data: RRIntervalsInput,
+    response: Response,
+    data: RRPayload = Depends(read_rr_payload),
     db: Session = Depends(get_db)
 ):
     """
     Calculate and store HRV metrics from raw RR intervals.
 
+    The body is either JSON (RRIntervalsInput) or the packed binary format
+    described in backend.api.rr_payload. Re-uploading a stored recording
+    (same user, recorded_at and intervals) returns the existing reading
+    with status 200 and computes nothing.
+
     Args:
         user_id: User ID
         data: RR intervals and metadata
@@ -60,99 +302,430 @@ def create_hrv_reading(
     Returns:
         Calculated HRV metrics
     """
-    # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    _require_user(db, user_id)
 
-    # Check data quality
-    quality = hrv_calc.check_data_quality(data.rr_intervals)
-    if not quality['is_valid']:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid data quality: {', '.join(quality['issues'])}"
-        )
+    reading, created = _ingest_reading(db, user_id, data)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return reading
+
+@router.post(
+    "/{user_id}/readings:stream",
+    response_model=HRVReadingResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=RR_STREAM_OPENAPI
+)
+async def create_hrv_reading_stream(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Calculate and store HRV metrics from an NDJSON stream of RR intervals.
+
+    The body is an RRStreamHeader line followed by JSON arrays of RR
+    intervals (see backend.api.rr_payload). Chunks are corrected and folded
+    into the metrics as they arrive (HRVStream) and archived as they are
+    parsed (spooled to disk past _STREAM_ARCHIVE_SPOOL_BYTES), and the
+    reading is stored when the stream ends. Streams are limited to
+    MAX_STREAM_BEATS intervals. Entropy and DFA need the whole recording
+    and are left empty until the reading is recomputed from its archived
+    intervals.
+
+    A stream of an already stored recording returns the existing reading
+    with status 200. When the user already has a reading at the header's
+    recorded_at, chunks are only hashed and archived; they are corrected
+    from the archive afterwards only if the content turns out to differ.
+
+    Args:
+        user_id: User ID
+        request: Streamed request
+
+    Returns:
+        Calculated HRV metrics
+
+    Raises:
+        HTTPException: 413 if the stream has more than MAX_STREAM_BEATS
+            intervals
+    """
+    await run_in_threadpool(_require_user, db, user_id)
+
+    header = None
+    hasher = None
+    likely_duplicate = False
+    stream = HRVStream()
+    batch = []
+    batch_beats = 0
+    total_beats = 0
+
+    with tempfile.SpooledTemporaryFile(max_size=_STREAM_ARCHIVE_SPOOL_BYTES) as archive:
+        def extend(rr_intervals: np.ndarray) -> None:
+            # Each batch is archived as its own frame
+            archive.write(encode_rr(rr_intervals))
+            _hash_intervals(hasher, rr_intervals)
+            if not likely_duplicate:
+                stream.extend(rr_intervals)
+
+        async for line_number, line in iter_stream_lines(request):
+            if header is None:
+                header = decode_stream_header(line, line_number)
+                hasher = _content_hasher(user_id, header.recorded_at)
+                likely_duplicate = await run_in_threadpool(
+                    _has_reading_at, db, user_id, header.recorded_at
+                )
+                continue
+            chunk = decode_stream_chunk(line, line_number)
+            total_beats += len(chunk)
+            if total_beats > MAX_STREAM_BEATS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                    detail=f"Stream has more than {MAX_STREAM_BEATS} RR intervals"
+                )
+            batch.append(chunk)
+            batch_beats += len(chunk)
+            # Correction runs off the event loop, a few thousand beats at a time
+            if batch_beats >= _STREAM_BATCH_BEATS:
+                await run_in_threadpool(extend, np.concatenate(batch))
+                batch, batch_beats = [], 0
+
+        if header is None:
+            raise RequestValidationError([
+                {"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}
+            ])
+
+        if batch:
+            await run_in_threadpool(extend, np.concatenate(batch))
+
+        content_hash = hasher.hexdigest()
+        existing = await run_in_threadpool(_find_duplicate, db, content_hash)
+        if existing:
+            response.status_code = status.HTTP_200_OK
+            return existing
+
+        archive.seek(0)
+        rr_data = archive.read()
 
-    # Calculate all metrics
     try:
-        metrics = hrv_calc.calculate_all_metrics(data.rr_intervals)
+        if likely_duplicate:
+            # Same recorded_at but different intervals: correct them now
+            await run_in_threadpool(_replay_archive, stream, rr_data)
+        analysis = await run_in_threadpool(stream.finish)
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error calculating HRV metrics: {str(e)}"
-        )
+        raise _analysis_error(e)
+
+    values = dict(_valid_reading_values(user_id, header, analysis), content_hash=content_hash)
+    reading, created = await run_in_threadpool(_store_reading, db, values, rr_data, total_beats)
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return reading
+
+def _has_reading_at(db: Session, user_id: int, recorded_at: datetime) -> bool:
+    """Whether the user has a reading recorded at this time (a possible re-upload)"""
+    return db.query(
+        db.query(HRVReading).filter(
+            HRVReading.user_id == user_id,
+            HRVReading.recorded_at == recorded_at
+        ).exists()
+    ).scalar()
+
+def _replay_archive(stream: HRVStream, rr_data: bytes) -> None:
+    """Feed archived intervals to an HRVStream in _STREAM_BATCH_BEATS batches"""
+    rr_intervals = decode_rr(rr_data)
+    for start in range(0, len(rr_intervals), _STREAM_BATCH_BEATS):
+        stream.extend(rr_intervals[start:start + _STREAM_BATCH_BEATS])
+
+@router.post("/{user_id}/readings:bulk", response_model=List[BulkReadingResult])
+def create_hrv_readings_bulk(
+    user_id: int,
+    data: BulkReadingsInput,
+    db: Session = Depends(get_db)
+):
+    """
+    Calculate and store HRV metrics for many recordings in one request.
+
+    Recordings are analyzed in chunks on the compute pool (the time and
+    frequency domain metrics of a chunk come from one calculate_batch
+    call), and all valid readings and their archived intervals are inserted
+    with bulk INSERTs in a single transaction.
+    Each recording gets its own result, so one bad night does not reject
+    the others. Recordings that are already stored (see create_hrv_reading)
+    return the existing reading with status 200 and are not recomputed.
+
+    Args:
+        user_id: User ID
+        data: Recordings to store
+
+    Returns:
+        One result per recording, in request order
+    """
+    _require_user(db, user_id)
+
+    # Recordings already stored, or repeated within this request, are
+    # answered from the stored reading without computing anything
+    hashes = [_content_hash(user_id, recording) for recording in data.readings]
+    existing = {
+        reading.content_hash: reading
+        for reading in db.query(HRVReading).filter(HRVReading.content_hash.in_(set(hashes)))
+    }
+    first_index = {}
+    for index, content_hash in enumerate(hashes):
+        if content_hash not in existing:
+            first_index.setdefault(content_hash, index)
+    pending = sorted(first_index.values())
 
-    # Create reading
-    reading = HRVReading(
-        user_id=user_id,
-        recorded_at=data.recorded_at,
-        mean_rri=metrics['mean_rri'],
-        mean_hr=metrics['mean_hr'],
-        sdnn=metrics['sdnn'],
-        rmssd=metrics['rmssd'],
-        pnn50=metrics['pnn50'],
-        vlf_power=metrics['vlf_power'],
-        lf_power=metrics['lf_power'],
-        hf_power=metrics['hf_power'],
-        total_power=metrics['total_power'],
-        lf_hf_ratio=metrics['lf_hf_ratio'],
-        lf_nu=metrics['lf_nu'],
-        hf_nu=metrics['hf_nu'],
-        sleep_duration=data.sleep_duration,
-        sleep_quality=data.sleep_quality,
-        recording_duration=len(data.rr_intervals) / 60.0,  # Approximate minutes
-        artifact_percentage=quality['artifact_percentage']
+    # Chunks of recordings per worker call, each through calculate_batch
+    futures = compute_pool.map_batches(
+        analyze_batch,
+        [data.readings[index].rr_intervals for index in pending]
     )
 
-    db.add(reading)
-    db.commit()
-    db.refresh(reading)
+    results: List[Optional[BulkReadingResult]] = [None] * len(data.readings)
+    rows = []
+    archives = []
+    for index, future in zip(pending, futures):
+        recording = data.readings[index]
+        try:
+            try:
+                analysis = future.result()
+            except Exception as e:
+                raise _analysis_error(e)
+            rows.append(dict(_valid_reading_values(user_id, recording, analysis), content_hash=hashes[index]))
+            archives.append(recording.rr_intervals)
+            results[index] = BulkReadingResult(index=index, status_code=status.HTTP_201_CREATED)
+        except HTTPException as e:
+            results[index] = BulkReadingResult(index=index, status_code=e.status_code, detail=e.detail)
 
-    return reading
+    if rows:
+        try:
+            # Batched into multi-row INSERTs; ids come back in the order of rows
+            reading_ids = db.scalars(
+                insert(HRVReading).returning(HRVReading.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            db.execute(insert(RawRecording), [
+                dict(
+                    reading_id=reading_id,
+                    beat_count=len(rr_intervals),
+                    rr_data=encode_rr(rr_intervals),
+                    algorithm_version=ALGORITHM_VERSION
+                )
+                for reading_id, rr_intervals in zip(reading_ids, archives)
+            ])
+            db.commit()
+        except IntegrityError:
+            # A concurrent upload stored one of these recordings first
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Some recordings were stored by a concurrent upload, please retry"
+            )
+
+        created = iter(zip(reading_ids, rows))
+        for result in results:
+            if result is not None and result.status_code == status.HTTP_201_CREATED:
+                reading_id, values = next(created)
+                result.reading = HRVReadingResponse(id=reading_id, **values)
+
+    # Duplicates get the stored reading, or the result of their first occurrence
+    for index, content_hash in enumerate(hashes):
+        if results[index] is not None:
+            continue
+        if content_hash in existing:
+            results[index] = BulkReadingResult(
+                index=index,
+                status_code=status.HTTP_200_OK,
+                reading=HRVReadingResponse.model_validate(existing[content_hash])
+            )
+        else:
+            first = results[first_index[content_hash]]
+            stored = first.status_code == status.HTTP_201_CREATED
+            results[index] = first.model_copy(update={
+                'index': index,
+                'status_code': status.HTTP_200_OK if stored else first.status_code
+            })
+
+    return results
 
-@router.get("/{user_id}/readings", response_model=List[HRVReadingResponse])
-def get_hrv_readings(
+@router.post(
+    "/{user_id}/readings:enqueue",
+    response_model=IngestJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=RR_PAYLOAD_OPENAPI
+)
+async def enqueue_hrv_reading(
     user_id: int,
-    limit: int = 30,
+    request: Request,
+    response: Response,
+    data: RRPayload = Depends(read_rr_payload),
     db: Session = Depends(get_db)
 ):
     """
-    Get recent HRV readings for a user.
+    Queue raw RR intervals for background processing.
+
+    Takes the same body as create_hrv_reading, which is decoded here so
+    malformed uploads are still rejected at once. The body is then
+    committed to the durable ingest queue and the job is returned
+    immediately; a worker stores the reading and calculates the energy
+    budget (see process_ingest_job). Poll the job's Location for the result.
+
+    Args:
+        user_id: User ID
+        data: RR intervals and metadata
+
+    Returns:
+        The queued job
+    """
+    await run_in_threadpool(_require_user, db, user_id)
+    job = await run_in_threadpool(
+        ingest_queue.enqueue, db, user_id, request_content_type(request), await request.body()
+    )
+    response.headers["Location"] = f"{request.url.path.rsplit('/', 1)[0]}/jobs/{job.id}"
+    return job
+
+@router.get("/{user_id}/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    user_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the status of a queued upload"""
+    job = await db.scalar(select(IngestJob).where(
+        IngestJob.id == job_id,
+        IngestJob.user_id == user_id
+    ))
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job
+
+@router.get("/ingest-queue", response_model=IngestQueueDepth)
+async def get_ingest_queue_depth(db: AsyncSession = Depends(get_async_db)):
+    """Number of ingest jobs per status"""
+    return await db.run_sync(ingest_queue.depth)
+
+@router.get("/{user_id}/readings", response_model=List[HRVReadingResponse], dependencies=[Depends(user_data_etag)])
+async def get_hrv_readings(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(30, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: ResponseFormat = "rows",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get HRV readings for a user, newest first, one page at a time.
+
+    Follow the Link header (rel="next" for older readings, rel="prev" for
+    newer ones) to page through the history; see backend.api.pagination.
+    Rows are selected as plain columns and encoded without per-row model
+    validation; with fields= only the selected columns are queried and
+    returned (see backend.api.projection).
 
     Args:
         user_id: User ID
         limit: Maximum number of readings to return
+        before: Cursor; return readings older than it
+        after: Cursor; return readings newer than it
+        fields: Comma-separated HRVReadingResponse fields (id and
+            recorded_at are always included)
+        format: 'rows' (list of objects) or 'columns' (one array per field)
 
     Returns:
-        List of HRV readings
+        List of HRV readings, or {field: [values]} for format=columns
     """
-    readings = db.query(HRVReading).filter(
+    names = select_fields(fields, HRVReadingResponse, always=("id", "recorded_at"))
+    columns = [getattr(HRVReading, name) for name in names]
+
+    readings, next_cursor, prev_cursor = await db.run_sync(lambda session: keyset_page(
+        session.query(*columns).filter(HRVReading.user_id == user_id),
+        HRVReading.recorded_at,
+        HRVReading.id,
+        limit,
+        before=before,
+        after=after
+    ))
+
+    page = projected_response(readings, names, format, headers=response.headers)
+    set_page_links(request, page, next_cursor, prev_cursor)
+    return page
+
+@router.get("/{user_id}/readings/{reading_id}", response_model=HRVReadingResponse, dependencies=[Depends(user_data_etag)])
+async def get_hrv_reading(
+    user_id: int,
+    reading_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get specific HRV reading"""
+    names = list(HRVReadingResponse.model_fields)
+    reading = (await db.execute(select(*[getattr(HRVReading, name) for name in names]).where(
+        HRVReading.id == reading_id,
         HRVReading.user_id == user_id
-    ).order_by(
-        HRVReading.recorded_at.desc()
-    ).limit(limit).all()
+    ))).first()
+
+    if not reading:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reading not found"
+        )
 
-    return readings
+    return row_response(reading, names, headers=response.headers)
 
-@router.get("/{user_id}/readings/{reading_id}", response_model=HRVReadingResponse)
-def get_hrv_reading(
+@router.post("/{user_id}/readings/{reading_id}:recompute", response_model=HRVReadingResponse)
+def recompute_hrv_reading(
     user_id: int,
     reading_id: int,
     db: Session = Depends(get_db)
 ):
-    """Get specific HRV reading"""
+    """
+    Recompute a reading's metrics from its archived RR intervals.
+
+    The intervals are decoded straight into an array and analyzed with the
+    current algorithms, and the archive records the new ALGORITHM_VERSION.
+    Readings whose archive has an older version predate a metric change.
+
+    Args:
+        user_id: User ID
+        reading_id: Reading ID
+
+    Returns:
+        Recomputed HRV metrics
+    """
     reading = db.query(HRVReading).filter(
         HRVReading.id == reading_id,
         HRVReading.user_id == user_id
     ).first()
-
     if not reading:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reading not found"
         )
 
+    # Loaded only here: the archive is never read with the reading itself
+    raw_recording = reading.raw_recording
+    if raw_recording is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No RR intervals archived for this reading"
+        )
+
+    try:
+        analysis = compute_pool.run(analyze_recording, decode_rr(raw_recording.rr_data))
+    except Exception as e:
+        raise _analysis_error(e)
+
+    for column, value in _valid_reading_values(user_id, reading, analysis).items():
+        setattr(reading, column, value)
+    raw_recording.algorithm_version = ALGORITHM_VERSION
+    db.commit()
+    db.refresh(reading)
+
     return reading
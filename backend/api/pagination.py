@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination for history endpoints.
+
+Pages are ordered newest first by (timestamp, id). A cursor encodes the
+(timestamp, id) of the row a page ends at, and the next page is the rows
+strictly before it:
+
+    WHERE user_id = ? AND (recorded_at, id) < (?, ?)
+    ORDER BY recorded_at DESC, id DESC LIMIT ?
+
+With an index on (user_id, timestamp) this is an index range scan that
+starts at the cursor, so a page deep in the history costs the same as the
+first one (an OFFSET would walk every skipped row). Links to the adjacent
+pages are returned in the Link header (rel="next" for older rows,
+rel="prev" for newer rows).
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+# Largest page a client can request
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor for the position of a row"""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Position encoded by encode_cursor.
+
+    Raises:
+        HTTPException: 400 for a malformed cursor
+    """
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = text.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def keyset_page(
+    query: Query,
+    timestamp_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None
+) -> Tuple[List, Optional[str], Optional[str]]:
+    """
+    One page of a query, newest first.
+
+    Args:
+        query: Filtered query (e.g. by user), without ordering or limit
+        timestamp_column: Column the history is ordered by
+        id_column: Primary key, breaking ties between equal timestamps
+        limit: Page size
+        before: Cursor; return the rows older than it
+        after: Cursor; return the rows newer than it
+
+    Returns:
+        Tuple of (rows, next_cursor, prev_cursor); next_cursor is None on
+        the oldest page and prev_cursor on the newest
+
+    Raises:
+        HTTPException: 400 if both cursors are given or one is malformed
+    """
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before or after, not both"
+        )
+    key = tuple_(timestamp_column, id_column)
+
+    if after:
+        # Walk forward from the cursor, then present newest first
+        rows = query.filter(key > tuple_(*decode_cursor(after))).order_by(
+            timestamp_column.asc(), id_column.asc()
+        ).limit(limit + 1).all()
+        has_newer, has_older = len(rows) > limit, True
+        rows = rows[:limit][::-1]
+    else:
+        if before:
+            query = query.filter(key < tuple_(*decode_cursor(before)))
+        rows = query.order_by(
+            timestamp_column.desc(), id_column.desc()
+        ).limit(limit + 1).all()
+        has_newer, has_older = before is not None, len(rows) > limit
+        rows = rows[:limit]
+
+    def cursor(row) -> str:
+        return encode_cursor(getattr(row, timestamp_column.key), getattr(row, id_column.key))
+
+    next_cursor = cursor(rows[-1]) if rows and has_older else None
+    prev_cursor = cursor(rows[0]) if rows and has_newer else None
+    return rows, next_cursor, prev_cursor
+
+def set_page_links(
+    request: Request,
+    response: Response,
+    next_cursor: Optional[str],
+    prev_cursor: Optional[str]
+) -> None:
+    """Link header with the URLs of the adjacent pages"""
+    links = []
+    for rel, param, cursor in (("next", "before", next_cursor), ("prev", "after", prev_cursor)):
+        if cursor:
+            url = request.url.remove_query_params(["before", "after"]).include_query_params(**{param: cursor})
+            links.append(f'<{url}>; rel="{rel}"')
+    if links:
+        response.headers["Link"] = ", ".join(links)
@@ -0,0 +1,129 @@
+"""
+Field projection and columnar responses for history endpoints.
+
+`fields=rmssd,mean_hr` selects only those columns in SQL, so rows come
+back as plain tuples without building ORM objects, and `format=columns`
+returns one array per field instead of one object per row:
+
+    {"id": [12, 11], "recorded_at": ["2024-01-02T07:00:00", ...], "rmssd": [41.2, 38.9]}
+
+The row id and timestamp are always included: pagination cursors and
+chart axes need them. Together with gzip (GZipMiddleware) a year of one
+or two series is a small fraction of the full row objects.
+
+Without fields= every column of the response model is selected the same
+way. The rows come straight from the database, so they are encoded as
+they are (FastJSONResponse) instead of being validated into a response
+model object per row; the endpoints keep their response_model for the
+OpenAPI schema. orjson is used when installed (the `fast` extra), the
+standard library otherwise, with the same output.
+"""
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Mapping, Optional, Sequence, Type
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ResponseFormat = Literal["rows", "columns"]
+
+def _json_default(value: Any) -> Any:
+    """Datetimes as ISO 8601, like pydantic"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _finite(value: Any) -> Any:
+    """NaN and infinities as None (null), as orjson and pydantic write them"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON of database values"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        _finite(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_json_default
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with dumps(), without validating the content"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def select_fields(
+    fields: Optional[str],
+    response_model: Type[BaseModel],
+    always: Sequence[str]
+) -> List[str]:
+    """
+    Fields to return for a fields= parameter.
+
+    Args:
+        fields: Comma-separated field names, or None for all fields
+        response_model: Model whose fields may be selected
+        always: Fields returned whether selected or not (id, timestamp)
+
+    Returns:
+        Field names, the `always` fields first
+
+    Raises:
+        HTTPException: 400 for an unknown field
+    """
+    available = list(response_model.model_fields)
+    if fields is None:
+        requested = available
+    else:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(available))
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+            )
+    return list(always) + [name for name in dict.fromkeys(requested) if name not in always]
+
+def projected_response(
+    rows: Sequence[Any],
+    names: Sequence[str],
+    response_format: ResponseFormat,
+    headers: Optional[Mapping[str, str]] = None
+) -> JSONResponse:
+    """
+    JSON response with the selected fields of column rows.
+
+    Args:
+        rows: Rows of a query over exactly `names`, in that order
+        names: Field names
+        response_format: 'rows' for a list of objects, 'columns' for one
+            array per field
+        headers: Headers already set for the request (e.g. the ETag on
+            the endpoint's Response parameter, which a returned response
+            replaces)
+    """
+    if response_format == "columns":
+        columns: Dict[str, List[Any]] = {name: [] for name in names}
+        if rows:
+            columns = dict(zip(names, map(list, zip(*rows))))
+        return FastJSONResponse(columns, headers=headers)
+    return FastJSONResponse([dict(zip(names, row)) for row in rows], headers=headers)
+
+def row_response(row: Any, names: Sequence[str], headers: Optional[Mapping[str, str]] = None) -> JSONResponse:
+    """JSON object of a single column row (see projected_response)"""
+    return FastJSONResponse(dict(zip(names, row)), headers=headers)
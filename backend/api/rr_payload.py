@@ -0,0 +1,565 @@
+"""
+Request body decoding for RR interval uploads.
+
+Besides JSON (RRIntervalsInput), the readings endpoint accepts a packed
+binary payload with Content-Type application/vnd.undercurrent.rr:
+
+    offset  size  field
+    0       4     magic b'RRI1'
+    4       1     sample type: 1 = uint16 ms, 2 = float32 ms
+    5       3     reserved (zero)
+    8       4     number of intervals (uint32)
+    12      8     recorded_at, Unix time in milliseconds UTC (int64)
+    20      4     sleep_duration in hours (float32, NaN if absent)
+    24      4     sleep_quality 0-100 (float32, NaN if absent)
+    28      ...   intervals
+
+All fields are little-endian. The intervals are read with np.frombuffer
+straight from the request body; a uint16 night is about a quarter of the
+size of the same night as JSON.
+
+JSON bodies decode the rr_intervals array with a vectorized number parser
+(see _parse_number_array) and fall back to full pydantic validation for
+anything it does not accept, so errors are the same as for a plain
+RRIntervalsInput body parameter.
+
+Whatever the format, the decoded intervals must all be finite and positive
+(one vectorized check, _check_intervals); anything else is a 400.
+
+Long recordings can also be streamed as NDJSON (application/x-ndjson):
+an RRStreamHeader object on the first line, then any number of JSON arrays
+of RR intervals, one chunk per line:
+
+    {"recorded_at": "2024-01-15T07:00:00", "sleep_duration": 7.5}
+    [812, 790.5, 845, ...]
+    [830, 822, ...]
+
+iter_stream_lines splits the body as it arrives, so the server never holds
+more than one line of it.
+"""
+import re
+import json
+import struct
+import numpy as np
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+RR_BINARY_CONTENT_TYPE = "application/vnd.undercurrent.rr"
+RR_STREAM_CONTENT_TYPE = "application/x-ndjson"
+
+# Longest NDJSON line accepted; clients send long recordings as more lines
+MAX_STREAM_LINE_BYTES = 1024 * 1024
+
+# Most intervals accepted in one stream (about two days at 70 bpm), which
+# bounds the archive a stream builds up
+MAX_STREAM_BEATS = 200_000
+
+RR_BINARY_MAGIC = b"RRI1"
+RR_BINARY_HEADER = struct.Struct("<4sB3xIqff")
+
+# Sample type codes in the binary header
+RR_SAMPLE_TYPES = {
+    1: np.dtype("<u2"),  # Whole milliseconds
+    2: np.dtype("<f4"),  # Fractional milliseconds
+}
+
+# Characters of a JSON array of numbers, for the fast decoding path
+_COMMA, _MINUS, _DOT, _SLASH, _ZERO, _NINE = b",-./09"
+_SPACE, _TAB, _NEWLINE, _RETURN = _WHITESPACE = b" \t\n\r"
+
+# Up to 15 characters a number's digits form an exact float64 integer
+# mantissa, so mantissa / 10**k is correctly rounded, exactly like float(text)
+_MAX_LENGTH = 15
+_POWERS_OF_TEN = 10.0 ** np.arange(_MAX_LENGTH + 1)
+
+# Rows of decimal places for a given number length (a power of two, so
+# places combine pairwise), and the type and factor of each combining level
+_PLACE_ROWS = [max(1 << (width - 1).bit_length(), 2) for width in range(_MAX_LENGTH + 1)]
+_PLACE_LEVELS = ((np.uint8, 10), (np.uint16, 100), (np.uint32, 10 ** 4), (np.float64, 10 ** 8))
+
+# Below about 3-4k intervals pydantic's own parser is faster
+_FAST_PATH_MIN_BYTES = 24 * 1024
+
+_RR_ARRAY_START = re.compile(rb'"rr_intervals"\s*:\s*\[')
+
+class RRIntervalsInput(BaseModel):
+    """Input model for raw RR intervals"""
+    rr_intervals: List[float] = Field(..., description="List of R-R intervals in milliseconds")
+    recorded_at: datetime
+    sleep_duration: Optional[float] = None
+    sleep_quality: Optional[float] = None
+
+class RRStreamHeader(BaseModel):
+    """First line of an NDJSON RR stream: the recording metadata"""
+    recorded_at: datetime
+    sleep_duration: Optional[float] = None
+    sleep_quality: Optional[float] = None
+
+class RRPayload(NamedTuple):
+    """Decoded upload: RR intervals as an array plus recording metadata"""
+    rr_intervals: np.ndarray
+    recorded_at: datetime
+    sleep_duration: Optional[float]
+    sleep_quality: Optional[float]
+
+# OpenAPI request body for endpoints using read_rr_payload
+RR_PAYLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": RRIntervalsInput.model_json_schema()
+            },
+            RR_BINARY_CONTENT_TYPE: {
+                "schema": {"type": "string", "format": "binary"}
+            }
+        }
+    }
+}
+
+# OpenAPI request body for the streaming endpoint
+RR_STREAM_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            RR_STREAM_CONTENT_TYPE: {
+                "schema": {
+                    "type": "string",
+                    "description": "RRStreamHeader line, then JSON arrays of RR intervals (ms)"
+                }
+            }
+        }
+    }
+}
+
+_RR_CHUNK = TypeAdapter(List[float])
+
+async def read_rr_payload(request: Request) -> RRPayload:
+    """
+    Dependency decoding an RR upload from either JSON or the binary format.
+
+    Args:
+        request: Incoming request
+
+    Returns:
+        RRPayload with the intervals as a NumPy array
+
+    Raises:
+        RequestValidationError: Malformed JSON or fields (same 422 errors
+            as a RRIntervalsInput body parameter)
+        HTTPException: 400 for a malformed binary payload
+    """
+    return decode_rr_payload(await request.body(), request_content_type(request))
+
+def request_content_type(request: Request) -> str:
+    """Media type of a request body, without parameters"""
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+def decode_rr_payload(body: bytes, content_type: str) -> RRPayload:
+    """
+    Decode an RR upload body by its media type (binary format or JSON).
+
+    Raises:
+        RequestValidationError: Malformed JSON body
+        HTTPException: 400 for a malformed binary payload
+    """
+    if content_type == RR_BINARY_CONTENT_TYPE:
+        return decode_binary_payload(body)
+    return decode_json_payload(body)
+
+def decode_binary_payload(body: bytes) -> RRPayload:
+    """
+    Decode the packed binary format (see module docstring).
+
+    Raises:
+        HTTPException: 400 if the header or length is invalid, or an
+            interval is not a finite positive number
+    """
+    if len(body) < RR_BINARY_HEADER.size:
+        raise _bad_payload("payload shorter than header")
+
+    magic, sample_type, count, recorded_ms, sleep_duration, sleep_quality = \
+        RR_BINARY_HEADER.unpack_from(body)
+    if magic != RR_BINARY_MAGIC:
+        raise _bad_payload("unknown format")
+    if sample_type not in RR_SAMPLE_TYPES:
+        raise _bad_payload(f"unknown sample type {sample_type}")
+
+    dtype = RR_SAMPLE_TYPES[sample_type]
+    if len(body) != RR_BINARY_HEADER.size + count * dtype.itemsize:
+        raise _bad_payload(f"expected {count} intervals of {dtype.itemsize} bytes")
+
+    rr_intervals = _check_intervals(
+        np.frombuffer(body, dtype=dtype, count=count, offset=RR_BINARY_HEADER.size)
+    )
+
+    try:
+        recorded_at = datetime(1970, 1, 1) + timedelta(milliseconds=recorded_ms)
+    except OverflowError:
+        raise _bad_payload("recorded_at out of range")
+
+    return RRPayload(
+        rr_intervals=rr_intervals,
+        recorded_at=recorded_at,
+        sleep_duration=None if np.isnan(sleep_duration) else float(sleep_duration),
+        sleep_quality=None if np.isnan(sleep_quality) else float(sleep_quality)
+    )
+
+def encode_binary_payload(
+    rr_intervals: np.ndarray,
+    recorded_at: datetime,
+    sleep_duration: Optional[float] = None,
+    sleep_quality: Optional[float] = None,
+    sample_type: int = 1
+) -> bytes:
+    """
+    Pack RR intervals into the binary format (for clients and benchmarks).
+
+    Args:
+        rr_intervals: R-R intervals in milliseconds
+        recorded_at: Recording time (naive datetimes are taken as UTC)
+        sleep_duration: Sleep duration in hours
+        sleep_quality: Sleep quality score 0-100
+        sample_type: 1 for uint16 (rounded to whole ms) or 2 for float32
+
+    Returns:
+        Payload bytes
+    """
+    dtype = RR_SAMPLE_TYPES[sample_type]
+    values = np.asarray(rr_intervals, dtype=np.float64)
+    if dtype.kind == "u":
+        values = np.rint(values)
+    if recorded_at.tzinfo is not None:
+        recorded_at = (recorded_at - recorded_at.utcoffset()).replace(tzinfo=None)
+    recorded_ms = (recorded_at - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+
+    header = RR_BINARY_HEADER.pack(
+        RR_BINARY_MAGIC,
+        sample_type,
+        len(values),
+        recorded_ms,
+        np.nan if sleep_duration is None else sleep_duration,
+        np.nan if sleep_quality is None else sleep_quality
+    )
+    return header + values.astype(dtype).tobytes()
+
+def decode_json_payload(body: bytes) -> RRPayload:
+    """
+    Decode a JSON RRIntervalsInput body.
+
+    For large bodies the rr_intervals array is parsed straight into a
+    float64 array and only the remaining fields go through RRIntervalsInput.
+    Bodies the fast path does not accept (including every invalid body)
+    are decoded and validated in full, so errors are unchanged.
+
+    Raises:
+        RequestValidationError: With the same errors FastAPI reports for a
+            RRIntervalsInput body parameter
+        HTTPException: 400 if an interval is not a finite positive number
+            (NaN, Infinity or an overflowing literal such as 1e400)
+    """
+    payload = _decode_json_fast(body)
+    if payload is not None:
+        _check_intervals(payload.rr_intervals)
+        return payload
+
+    if not body:
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}
+        ])
+    try:
+        document = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise _json_error(e, ("body",))
+
+    try:
+        data = RRIntervalsInput.model_validate(document)
+    except ValidationError as e:
+        raise _validation_error(e, ("body",), document)
+
+    return RRPayload(
+        rr_intervals=_check_intervals(np.asarray(data.rr_intervals, dtype=np.float64)),
+        recorded_at=data.recorded_at,
+        sleep_duration=data.sleep_duration,
+        sleep_quality=data.sleep_quality
+    )
+
+async def iter_stream_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split an NDJSON request body into lines as it arrives.
+
+    Args:
+        request: Incoming request
+
+    Yields:
+        (line number, line) for every non-blank line, numbered from 1
+
+    Raises:
+        HTTPException: 413 if a line is longer than MAX_STREAM_LINE_BYTES
+    """
+    buffer = bytearray()
+    line_number = 0
+    async for data in request.stream():
+        buffer += data
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline < 0:
+                break
+            line_number += 1
+            line = bytes(buffer[start:newline]).strip()
+            start = newline + 1
+            if len(line) > MAX_STREAM_LINE_BYTES:
+                raise _line_too_long(line_number)
+            if line:
+                yield line_number, line
+        del buffer[:start]
+        if len(buffer) > MAX_STREAM_LINE_BYTES:
+            raise _line_too_long(line_number + 1)
+
+    line = bytes(buffer).strip()
+    if line:
+        yield line_number + 1, line
+
+def decode_stream_header(line: bytes, line_number: int) -> RRStreamHeader:
+    """
+    Decode the RRStreamHeader line of an NDJSON stream.
+
+    Raises:
+        RequestValidationError: Malformed JSON or fields, located at
+            ("body", line_number, ...)
+    """
+    try:
+        document = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise _json_error(e, ("body", line_number))
+    try:
+        return RRStreamHeader.model_validate(document)
+    except ValidationError as e:
+        raise _validation_error(e, ("body", line_number), document)
+
+def decode_stream_chunk(line: bytes, line_number: int) -> np.ndarray:
+    """
+    Decode one chunk line of an NDJSON stream: a JSON array of RR intervals.
+
+    Arrays of plain decimal numbers go through _parse_number_array; anything
+    else is decoded and validated in full.
+
+    Returns:
+        float64 array of the chunk's intervals
+
+    Raises:
+        RequestValidationError: Malformed JSON or values, located at
+            ("body", line_number, ...)
+        HTTPException: 400 if an interval is not a finite positive number
+    """
+    if line[:1] == b"[" and line[-1:] == b"]":
+        values = _parse_number_array(line[1:-1])
+        if values is not None:
+            return _check_intervals(values, f"line {line_number}: ")
+
+    try:
+        document = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise _json_error(e, ("body", line_number))
+    try:
+        values = np.asarray(_RR_CHUNK.validate_python(document), dtype=np.float64)
+    except ValidationError as e:
+        raise _validation_error(e, ("body", line_number), document)
+    return _check_intervals(values, f"line {line_number}: ")
+
+def _decode_json_fast(body: bytes) -> Optional[RRPayload]:
+    """
+    Fast path of decode_json_payload, or None if the body needs the full path.
+
+    The rr_intervals array is cut out of the body and replaced by [], the
+    rest is validated as usual, and the array is decoded with
+    _parse_number_array.
+    """
+    if len(body) < _FAST_PATH_MIN_BYTES or body.count(b'"rr_intervals"') != 1:
+        return None
+    match = _RR_ARRAY_START.search(body)
+    if match is None:
+        return None
+    end = body.find(b"]", match.end())
+    if end < 0:
+        return None
+
+    rr_intervals = _parse_number_array(body[match.end():end])
+    if rr_intervals is None:
+        return None
+
+    try:
+        data = RRIntervalsInput.model_validate_json(body[:match.end()] + body[end:])
+    except ValidationError:
+        return None
+    # The replaced array must be the top-level field
+    if data.rr_intervals:
+        return None
+
+    return RRPayload(
+        rr_intervals=rr_intervals,
+        recorded_at=data.recorded_at,
+        sleep_duration=data.sleep_duration,
+        sleep_quality=data.sleep_quality
+    )
+
+def _parse_number_array(text: bytes) -> Optional[np.ndarray]:
+    """
+    Parse the inside of a JSON array of plain decimal numbers.
+
+    The bytes are checked with uint8 comparisons and stripped of whitespace
+    with bytes.translate. The numbers are then right-aligned and read one
+    character column at a time over all numbers at once (the loop runs once
+    per character of the longest number), checking the JSON number grammar
+    -?(0|[1-9][0-9]*)(.[0-9]+)? along the way. Each digit goes to its
+    decimal place, and the places are combined pairwise in uint8, uint16
+    and uint32 into exact integer mantissas; mantissa / 10**(fraction
+    digits) then gives the same float64 as float(text).
+
+    Args:
+        text: Bytes between '[' and ']'
+
+    Returns:
+        float64 array, or None if the array is empty, not valid JSON, or
+        uses something the fast path does not handle (exponents, numbers
+        longer than 15 characters)
+    """
+    codes = np.frombuffer(text, dtype=np.uint8)
+    # ',' '-' '.' and digits are the range ',' to '9' without '/'; whitespace sorts below
+    if np.any(codes > _NINE) or np.any(codes == _SLASH):
+        return None
+    space = codes < _COMMA
+    n_spaces = np.count_nonzero(space)
+    if n_spaces:
+        n_whitespace = sum(np.count_nonzero(codes == blank) for blank in _WHITESPACE)
+        if n_whitespace != n_spaces:
+            return None
+        # Whitespace may separate numbers from commas but not split them
+        comma = codes == _COMMA
+        token = ~(comma | space)
+        n_tokens = np.count_nonzero(token[1:] & ~token[:-1]) + int(token[0])
+        if n_tokens != np.count_nonzero(comma) + 1:
+            return None
+        codes = np.frombuffer(text.translate(None, _WHITESPACE), dtype=np.uint8)
+    if len(codes) == 0:
+        return None
+
+    ends = np.append(np.flatnonzero(codes == _COMMA), len(codes))
+    lengths = np.diff(ends, prepend=-1) - 1
+    width = int(lengths.max())
+    if lengths.min() < 1 or width > _MAX_LENGTH:
+        return None
+    lengths = lengths.astype(np.uint8)
+
+    # Column k holds the k-th character from the right of every number
+    padded = np.concatenate((np.full(width, _COMMA, dtype=np.uint8), codes))
+    index = ends + (width - 1)
+    places = np.zeros((_PLACE_ROWS[width], len(ends)), dtype=np.uint8)
+    fraction_digits = np.zeros(len(ends), dtype=np.uint8)
+    negative = np.zeros(len(ends), dtype=bool)
+    seen_dot = np.zeros(len(ends), dtype=bool)
+    right_digit = right_dot = leading_zero = None
+
+    for column in range(width):
+        code = padded[index]
+        index -= 1
+        inside = lengths > column
+        value = code - _ZERO
+        digit = inside & (value < 10)
+        dot = inside & (code == _DOT)
+        minus = inside & (code == _MINUS)
+
+        if column == 0:
+            # Numbers end in a digit
+            if not np.all(digit):
+                return None
+        elif (
+            # A minus sign starts the number, a dot sits between two digits
+            np.any(minus & ((lengths != column + 1) | ~right_digit))
+            or np.any(dot & (seen_dot | ~right_digit))
+            or np.any(right_dot & ~digit)
+            # A zero followed by a digit must not start the integer part
+            or np.any(leading_zero & ~digit & ~dot)
+        ):
+            return None
+
+        # Left of the dot, digits move down one place
+        value *= digit
+        places[column] |= value * ~seen_dot
+        if column:
+            places[column - 1] |= value * seen_dot
+        fraction_digits += dot.view(np.uint8) * np.uint8(column)
+        negative |= minus
+        seen_dot |= dot
+        leading_zero = digit & (value == 0) & (right_digit if column else False)
+        right_digit, right_dot = digit, dot
+
+    if np.any(leading_zero) or np.any(right_dot):
+        return None
+
+    # Combine neighbouring places pairwise, each level in the narrowest
+    # type that holds it exactly
+    for dtype, factor in _PLACE_LEVELS:
+        if len(places) == 1:
+            break
+        places = places[0::2].astype(dtype) + places[1::2].astype(dtype) * dtype(factor)
+    mantissa = places[0].astype(np.float64)
+
+    # JSON -0 is the integer zero, but -0.0 is a negative float
+    negative &= (mantissa != 0) | seen_dot
+
+    values = mantissa / _POWERS_OF_TEN[fraction_digits]
+    np.negative(values, out=values, where=negative)
+    return values
+
+def _check_intervals(rr_intervals: np.ndarray, where: str = "") -> np.ndarray:
+    """
+    Range check shared by every decoder, on the whole array at once.
+
+    JSON NaN and Infinity (and literals like 1e400 that overflow to inf)
+    get past both JSON decoders, so the values are checked here rather
+    than by the parsers.
+
+    Raises:
+        HTTPException: 400 if an interval is not finite or not positive
+    """
+    if not np.all(np.isfinite(rr_intervals)):
+        raise _bad_payload(f"{where}intervals must be finite numbers")
+    if not np.all(rr_intervals > 0):
+        raise _bad_payload(f"{where}intervals must be positive")
+    return rr_intervals
+
+def _json_error(error: json.JSONDecodeError, loc: tuple) -> RequestValidationError:
+    """FastAPI's error for a body that is not valid JSON"""
+    return RequestValidationError([
+        {
+            "type": "json_invalid",
+            "loc": (*loc, error.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": error.msg},
+        }
+    ], body=error.doc)
+
+def _validation_error(error: ValidationError, loc: tuple, body) -> RequestValidationError:
+    """FastAPI's error for a body that fails model validation"""
+    return RequestValidationError(
+        [{**detail, "loc": (*loc, *detail["loc"])} for detail in error.errors(include_url=False)],
+        body=body
+    )
+
+def _line_too_long(line_number: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Stream line {line_number} is longer than {MAX_STREAM_LINE_BYTES} bytes"
+    )
+
+def _bad_payload(reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Malformed RR payload: {reason}"
+    )
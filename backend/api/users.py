@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from datetime import datetime
 from backend.database import get_db
 from backend.models import User
+from backend.api.projection import row_response
 import bcrypt
 
 router = APIRouter()
@@ -29,28 +31,10 @@ class UserResponse(BaseModel):
     age: Optional[int]
     sex: Optional[str]
     bmi: Optional[float]
-    created_at: str
+    created_at: datetime
 
     class Config:
         from_attributes = True
-        json_encoders = {
-            'datetime': lambda v: v.isoformat() if v else None
-        }
-
-    @classmethod
-    def model_validate(cls, obj):
-        """Custom validation to convert datetime to string"""
-        if hasattr(obj, 'created_at') and obj.created_at:
-            obj_dict = {
-                'id': obj.id,
-                'email': obj.email,
-                'age': obj.age,
-                'sex': obj.sex,
-                'bmi': obj.bmi,
-                'created_at': obj.created_at.isoformat()
-            }
-            return cls(**obj_dict)
-        return super().model_validate(obj)
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -79,15 +63,16 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(db_user)
 
-    return UserResponse.model_validate(db_user)
+    return db_user
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    names = list(UserResponse.model_fields)
+    user = db.query(*[getattr(User, name) for name in names]).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserResponse.model_validate(user)
+    return row_response(user, names)
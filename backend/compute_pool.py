@@ -0,0 +1,369 @@
+import os
+import threading
+import logging
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from backend.hrv_calculator import HRVCalculator
+from backend.rr_series import RRSeries
+
+logger = logging.getLogger(__name__)
+
+# Calculator used by analyze_recording (one per worker process)
+_calculator = HRVCalculator()
+
+class ComputePoolBusy(RuntimeError):
+    """Raised when the compute queue stays full for longer than the queue timeout"""
+
+class ComputePool:
+    """
+    Process pool for CPU-heavy HRV computation.
+
+    FastAPI runs sync endpoints in a small threadpool, and NumPy/SciPy work
+    there contends for one GIL, so a burst of uploads serializes on a
+    single core. ComputePool runs the work in separate worker processes:
+
+    - Bounded queue: at most max_pending calls are in flight; further calls
+      wait up to queue_timeout seconds for a slot, then raise ComputePoolBusy
+      so the API can answer 503 instead of queueing without limit.
+    - Warm workers: each worker imports NumPy/SciPy and runs one small
+      calculation when it starts, and start() spawns all workers up front,
+      so no request pays for imports or cold caches.
+    - RR intervals are copied once into a shared memory block that the
+      worker maps as a NumPy array, instead of being pickled with the call.
+
+    When the pool is not running (max_workers=0, or before start()) run()
+    executes the function in the calling thread.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+        max_pending: Optional[int] = None,
+        queue_timeout: float = 5.0
+    ):
+        """
+        Initialize compute pool (call start() to spawn the workers).
+
+        Args:
+            max_workers: Number of worker processes; 0 runs work inline
+            max_pending: Maximum calls in flight (default: 4 per worker)
+            queue_timeout: Seconds to wait for a free slot before raising
+                ComputePoolBusy
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending or 4 * max(max_workers, 1)
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    @classmethod
+    def from_env(cls) -> 'ComputePool':
+        """
+        Build a pool from environment variables:
+        HRV_COMPUTE_WORKERS (default: CPU count, 0 disables the pool),
+        HRV_COMPUTE_QUEUE (default: 4 per worker) and
+        HRV_COMPUTE_QUEUE_TIMEOUT (seconds, default: 5).
+        """
+        max_workers = int(os.getenv('HRV_COMPUTE_WORKERS', os.cpu_count() or 1))
+        max_pending = os.getenv('HRV_COMPUTE_QUEUE')
+        return cls(
+            max_workers=max_workers,
+            max_pending=int(max_pending) if max_pending else None,
+            queue_timeout=float(os.getenv('HRV_COMPUTE_QUEUE_TIMEOUT', 5.0))
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Spawn and warm up all worker processes"""
+        if self.running or self.max_workers <= 0:
+            return
+
+        # 'spawn' avoids forking a process that already runs server threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+        warmups = [self._executor.submit(os.getpid) for _ in range(self.max_workers)]
+        for future in warmups:
+            future.result()
+        logger.info(f"Started HRV compute pool with {self.max_workers} workers")
+
+    def shutdown(self) -> None:
+        """Stop the workers, waiting for calls in flight"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        rr_intervals: Union[Sequence[float], np.ndarray],
+        *args: Any
+    ) -> Future:
+        """
+        Run func(rr_array, *args) in a worker process.
+
+        Args:
+            func: Module-level function taking the RR intervals as a float64
+                array; its result must not reference the array
+            rr_intervals: R-R intervals in milliseconds
+            *args: Further (picklable) arguments for func
+
+        Returns:
+            Future with the function's result
+
+        Raises:
+            ComputePoolBusy: If no slot frees up within queue_timeout
+        """
+        if not self.running:
+            raise RuntimeError("Compute pool is not running")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ComputePoolBusy("HRV compute queue is full")
+
+        try:
+            # Arrays of any numeric dtype (e.g. uint16 binary uploads) are
+            # converted while copying into the block, without a float64 copy
+            if isinstance(rr_intervals, np.ndarray):
+                rr_array = rr_intervals.reshape(-1)
+            else:
+                rr_array = np.asarray(rr_intervals, dtype=np.float64).reshape(-1)
+            block = shared_memory.SharedMemory(create=True, size=max(len(rr_array) * 8, 1))
+            np.ndarray(rr_array.shape, dtype=np.float64, buffer=block.buf)[:] = rr_array
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def release(_future: Future) -> None:
+            block.close()
+            block.unlink()
+            self._slots.release()
+
+        try:
+            future = self._executor.submit(_run_shared, func, block.name, len(rr_array), args)
+        except BaseException:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def map(
+        self,
+        func: Callable[..., Any],
+        recordings: Sequence[Union[Sequence[float], np.ndarray]],
+        *args: Any
+    ) -> List[Future]:
+        """
+        Run func(rr_array, *args) for every recording, spread over the workers.
+
+        Submitting waits for free slots as earlier recordings complete, so a
+        large batch flows through the bounded queue. A recording that gets
+        no slot within queue_timeout has a Future holding ComputePoolBusy,
+        and without a running pool the calls run in the calling thread, so
+        callers can treat every item the same way.
+
+        Returns:
+            One Future per recording, in order
+        """
+        futures = []
+        for rr_intervals in recordings:
+            if self.running:
+                try:
+                    futures.append(self.submit(func, rr_intervals, *args))
+                    continue
+                except ComputePoolBusy as e:
+                    future = Future()
+                    future.set_exception(e)
+            else:
+                future = Future()
+                try:
+                    future.set_result(func(np.asarray(rr_intervals, dtype=np.float64), *args))
+                except Exception as e:
+                    future.set_exception(e)
+            futures.append(future)
+        return futures
+
+    def map_batches(
+        self,
+        func: Callable[..., List[Any]],
+        recordings: Sequence[Union[Sequence[float], np.ndarray]],
+        chunk_size: Optional[int] = None
+    ) -> List[Future]:
+        """
+        Run func(rr_array, lengths) on chunks of recordings, spread over the workers.
+
+        Each chunk's intervals are concatenated into one shared block, so a
+        worker gets many recordings per call and can process them together
+        (see analyze_batch). func returns one result per recording; an
+        Exception in its list fails only that recording.
+
+        Args:
+            func: Module-level function taking the concatenated intervals of
+                a chunk and the number of intervals of each recording
+            recordings: RR intervals of every recording
+            chunk_size: Recordings per call (default: the recordings split
+                evenly into 4 calls per worker)
+
+        Returns:
+            One Future per recording, in order (as map())
+        """
+        if chunk_size is None:
+            calls = 4 * max(self.max_workers, 1) if self.running else 1
+            chunk_size = -(-len(recordings) // calls)
+        chunk_size = max(chunk_size, 1)
+
+        futures: List[Future] = []
+        for start in range(0, len(recordings), chunk_size):
+            chunk = [np.asarray(rr, dtype=np.float64).reshape(-1) for rr in recordings[start:start + chunk_size]]
+            lengths = [len(rr) for rr in chunk]
+            flat = np.concatenate(chunk) if chunk else np.empty(0)
+            chunk_futures = [Future() for _ in chunk]
+            futures.extend(chunk_futures)
+            if not self.running:
+                try:
+                    _resolve_chunk(chunk_futures, func(flat, lengths))
+                except Exception as e:
+                    _fail_all(chunk_futures, e)
+                continue
+            try:
+                future = self.submit(func, flat, lengths)
+            except ComputePoolBusy as e:
+                _fail_all(chunk_futures, e)
+                continue
+            future.add_done_callback(lambda done, targets=chunk_futures: _resolve_chunk_future(targets, done))
+        return futures
+
+    def run(
+        self,
+        func: Callable[..., Any],
+        rr_intervals: Union[Sequence[float], np.ndarray],
+        *args: Any
+    ) -> Any:
+        """
+        Run func(rr_array, *args) in a worker and wait for the result, or
+        in the calling thread if the pool is not running.
+        """
+        if not self.running:
+            return func(np.asarray(rr_intervals, dtype=np.float64), *args)
+        return self.submit(func, rr_intervals, *args).result()
+
+def analyze_recording(rr_intervals: np.ndarray) -> Dict[str, Any]:
+    """
+    Quality check, artifact correction and all metrics for one recording.
+
+    This is the unit of work the API sends to the pool: the series is
+    prepared once and shared by every step.
+
+    Args:
+        rr_intervals: R-R intervals in milliseconds
+
+    Returns:
+        Dictionary with 'quality' (check_data_quality() result without the
+        corrected series) and 'metrics' (calculate_all_metrics() result,
+        or None if the recording is not valid)
+    """
+    series = RRSeries(rr_intervals)
+    quality = _calculator.check_data_quality(series)
+    corrected = quality.pop('corrected')
+    metrics = _calculator.calculate_all_metrics(corrected) if quality['is_valid'] else None
+    return {'quality': quality, 'metrics': metrics}
+
+def analyze_batch(rr_intervals: np.ndarray, lengths: Sequence[int]) -> List[Any]:
+    """
+    analyze_recording() for a chunk of recordings at once.
+
+    Quality checks and artifact correction run per recording; the time and
+    frequency domain metrics of all valid recordings then come from one
+    calculate_batch() call, and only the nonlinear metrics are computed one
+    recording at a time.
+
+    Args:
+        rr_intervals: R-R intervals of all recordings, concatenated
+        lengths: Number of intervals of each recording
+
+    Returns:
+        One analyze_recording() result per recording, or the exception
+        analyzing it raised
+    """
+    bounds = np.cumsum(lengths)[:-1]
+    results: List[Any] = []
+    batched = []
+    for index, rr in enumerate(np.split(rr_intervals, bounds) if len(lengths) else []):
+        try:
+            quality = _calculator.check_data_quality(RRSeries(rr))
+            corrected = quality.pop('corrected')
+            if not quality['is_valid']:
+                results.append({'quality': quality, 'metrics': None})
+                continue
+            if len(corrected) < 60:
+                # Fails the frequency domain as calculate_all_metrics() would
+                results.append({'quality': quality, 'metrics': _calculator.calculate_all_metrics(corrected)})
+                continue
+            metrics = _calculator.calculate_nonlinear(corrected)
+            results.append({'quality': quality, 'metrics': metrics})
+            batched.append((index, corrected))
+        except Exception as e:
+            results.append(e)
+
+    if batched:
+        try:
+            batch = _calculator.calculate_batch([corrected for _, corrected in batched])
+            for (index, _), record in zip(batched, HRVCalculator.batch_to_records(batch)):
+                results[index]['metrics'].update(record)
+        except Exception as e:
+            for index, _ in batched:
+                results[index] = e
+    return results
+
+def _resolve_chunk(futures: List[Future], results: List[Any]) -> None:
+    """Hand each recording of a map_batches() chunk its result or exception"""
+    for future, result in zip(futures, results):
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+def _resolve_chunk_future(futures: List[Future], done: Future) -> None:
+    """Done callback of a map_batches() chunk running in a worker"""
+    error = done.exception()
+    if error is not None:
+        _fail_all(futures, error)
+    else:
+        _resolve_chunk(futures, done.result())
+
+def _fail_all(futures: List[Future], error: BaseException) -> None:
+    for future in futures:
+        future.set_exception(error)
+
+def _init_worker() -> None:
+    """Worker initializer: import SciPy and fill the calculation caches once"""
+    from scipy import ndimage, signal  # noqa: F401
+
+    warmup = 800.0 + 40.0 * np.sin(np.arange(300) / 3.0)
+    analyze_recording(warmup)
+
+def _run_shared(func: Callable[..., Any], name: str, length: int, args: tuple) -> Any:
+    """
+    Map the shared RR buffer as an array and call func on it.
+
+    Workers share the parent's resource tracker, so attaching here does not
+    take ownership: the parent unlinks the block when the call completes.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        rr_array = np.ndarray((length,), dtype=np.float64, buffer=block.buf)
+        rr_array.setflags(write=False)
+        result = func(rr_array, *args)
+        del rr_array
+        return result
+    finally:
+        block.close()
+
+# Shared pool instance, started and stopped with the application
+compute_pool = ComputePool.from_env()
@@ -1,16 +1,25 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from backend.storage import StorageSettings, apply_pragmas, engine_options
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cfs_hrv.db"
+settings = StorageSettings()
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(settings))
+apply_pragmas(engine, settings.pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the read endpoints (async def): a request waiting on the
+# database holds no threadpool thread. Writes stay on the sync engine.
+async_engine = create_async_engine(settings.async_database_url, **engine_options(settings))
+apply_pragmas(async_engine.sync_engine, settings.pragmas)
+
+# Objects stay readable after commit; responses are built after the session closes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,3 +29,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
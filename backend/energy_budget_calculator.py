@@ -260,12 +260,14 @@ class EnergyBudgetCalculator:
         Returns:
             Dictionary with risk level and consecutive low days
         """
-        # Get last 7 days of readiness scores
+        # Get readiness scores from the 7 days before this one. A score
+        # already stored for current_date is left out, so recalculating it
+        # does not count its own previous value
         start_date = current_date - timedelta(days=7)
         recent_scores = db.query(EnergyBudget).filter(
             EnergyBudget.user_id == user_id,
             EnergyBudget.date >= start_date,
-            EnergyBudget.date <= current_date
+            EnergyBudget.date < current_date
         ).order_by(EnergyBudget.date.desc()).all()
 
         # Count consecutive low HRV days
@@ -1,10 +1,34 @@
+import itertools
 import numpy as np
 from scipy import signal
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 import logging
+from backend import nonlinear, spectral
+from backend.rr_series import RRSeries
+from backend.artifact_correction import ArtifactCorrector
 
 logger = logging.getLogger(__name__)
 
+RRInput = Union[List[float], np.ndarray, RRSeries]
+
+# Metrics produced by calculate_nonlinear (also HRVReading columns)
+NONLINEAR_METRICS = (
+    'sd1', 'sd2', 'sample_entropy', 'approximate_entropy',
+    'dfa_alpha1', 'dfa_alpha2',
+)
+
+# Metric columns produced by calculate_batch (mirror HRVReading columns)
+BATCH_METRICS = (
+    'mean_rri', 'mean_hr', 'sdnn', 'rmssd', 'pnn50',
+    'vlf_power', 'lf_power', 'hf_power', 'total_power',
+    'lf_hf_ratio', 'lf_nu', 'hf_nu',
+)
+
+# Version of the metric algorithms, stored with each archived recording so
+# readings can be recomputed after a change. Bump whenever a change alters
+# the metrics stored for the same RR intervals.
+ALGORITHM_VERSION = 3
+
 class HRVCalculator:
     """
     Calculates HRV metrics based on ME/CFS research findings.
@@ -15,21 +39,61 @@ class HRVCalculator:
     - Boneva et al. (2007) - Higher HR and reduced HRV persist during sleep in CFS
     """
 
-    def __init__(self, sampling_rate: float = 200.0):
+    def __init__(
+        self,
+        sampling_rate: float = 200.0,
+        ar_order: int = 16,
+        ar_criterion: Optional[str] = None,
+        extra_bands: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
         """
         Initialize HRV calculator.
 
         Args:
             sampling_rate: ECG sampling rate in Hz (default: 200 Hz per Boneva et al.)
+            ar_order: Autoregressive model order for method='ar' (default: 16),
+                or the highest order considered when ar_criterion is set
+            ar_criterion: Optional AR order selection criterion ('aic' or 'fpe')
+            extra_bands: Optional additional bands to report, as
+                {name: (low_hz, high_hz)}, e.g. a lower HF band for slow
+                breathers, {'slow_hf': (0.08, 0.15)}. Each is returned as
+                '<name>_power' alongside the standard VLF/LF/HF metrics.
+                Bands must lie within 0-0.40 Hz (the Lomb-Scargle and AR
+                grids) and be at least 0.03125 Hz wide (two Welch bins).
+
+        Raises:
+            ValueError: For an extra band clashing with a standard band
+                name, outside 0-0.40 Hz or narrower than two Welch bins
         """
         self.sampling_rate = sampling_rate
-
-    def calculate_time_domain(self, rr_intervals: List[float]) -> Dict[str, float]:
+        self.ar_order = ar_order
+        self.ar_criterion = ar_criterion
+
+        extra_bands = extra_bands or {}
+        standard_names = {name for name, _ in spectral.FREQUENCY_BANDS}
+        clashes = standard_names.intersection(extra_bands)
+        if clashes:
+            raise ValueError(f"Extra bands clash with standard bands: {sorted(clashes)}")
+        for name, (low, high) in extra_bands.items():
+            if not 0.0 <= low < high <= spectral.MAX_BAND_FREQ:
+                raise ValueError(
+                    f"Extra band '{name}' ({low}-{high} Hz) must lie within 0-{spectral.MAX_BAND_FREQ} Hz"
+                )
+            if high - low < spectral.MIN_BAND_WIDTH:
+                raise ValueError(
+                    f"Extra band '{name}' ({low}-{high} Hz) is narrower than "
+                    f"{spectral.MIN_BAND_WIDTH} Hz and would always have zero Welch power"
+                )
+        self.bands = spectral.FREQUENCY_BANDS + tuple(
+            (name, (float(low), float(high))) for name, (low, high) in extra_bands.items()
+        )
+
+    def calculate_time_domain(self, rr_intervals: RRInput) -> Dict[str, float]:
         """
         Calculate time domain HRV parameters.
 
         Args:
-            rr_intervals: List of R-R intervals in milliseconds
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
 
         Returns:
             Dictionary containing:
@@ -38,11 +102,15 @@ class HRVCalculator:
             - sdnn: Standard deviation of NN intervals (ms)
             - rmssd: Root mean square of successive differences (ms)
             - pnn50: Percentage of successive intervals >50ms (%)
+
+            For a corrected RRSeries, RMSSD and pNN50 use only the successive
+            differences between beats that were not corrected.
         """
         if len(rr_intervals) < 2:
             raise ValueError("Need at least 2 RR intervals for time domain analysis")
 
-        rr_array = np.array(rr_intervals)
+        series = RRSeries.coerce(rr_intervals)
+        rr_array = series.values
 
         # Mean RR interval
         mean_rri = np.mean(rr_array)
@@ -55,7 +123,9 @@ class HRVCalculator:
 
         # RMSSD: Root mean square of successive differences
         # Formula: RMSSD = √(Σ(RRᵢ₊₁ - RRᵢ)² / N)
-        successive_diffs = np.diff(rr_array)
+        successive_diffs = series.nn_diffs
+        if len(successive_diffs) == 0:
+            raise ValueError("No successive differences between uncorrected beats")
         rmssd = np.sqrt(np.mean(successive_diffs ** 2))
 
         # PNN50: Percentage of successive NN intervals differing by >50ms
@@ -73,15 +143,16 @@ class HRVCalculator:
 
     def calculate_frequency_domain(
         self,
-        rr_intervals: List[float],
+        rr_intervals: RRInput,
         method: str = 'welch'
     ) -> Dict[str, float]:
         """
         Calculate frequency domain HRV parameters using power spectral density.
 
         Args:
-            rr_intervals: List of R-R intervals in milliseconds
-            method: 'welch' or 'ar' (autoregressive). Default: 'welch'
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
+            method: 'welch', 'lomb' (Lomb-Scargle on the uneven beat times,
+                no resampling) or 'ar' (autoregressive). Default: 'welch'
 
         Returns:
             Dictionary containing:
@@ -92,102 +163,180 @@ class HRVCalculator:
             - lf_hf_ratio: LF/HF ratio
             - lf_nu: LF normalized units
             - hf_nu: HF normalized units
+            - <name>_power: Power in each configured extra band (ms²)
         """
         if len(rr_intervals) < 60:
             raise ValueError("Need at least 60 RR intervals for frequency domain analysis")
 
-        rr_array = np.array(rr_intervals)
+        series = RRSeries.coerce(rr_intervals)
 
-        # Resample RR intervals to evenly spaced time series (4 Hz standard)
-        resampling_rate = 4.0  # Hz
-        time_stamps = np.cumsum(rr_array) / 1000.0  # Convert to seconds
-        time_stamps = np.insert(time_stamps, 0, 0)  # Add initial 0
-
-        # Create evenly spaced time array
-        total_time = time_stamps[-1]
-        even_time = np.arange(0, total_time, 1.0 / resampling_rate)
+        if method == 'lomb':
+            # Lomb-Scargle periodogram on beat onset times, all bands in one pass
+            onsets = series.onsets
+            table = spectral.lomb_scargle_grid(onsets[-1], bands=self.bands)
+            psd = spectral.lomb_scargle_psd(onsets, series.values, table.freqs)
+            return self._frequency_metrics(table, psd)
 
-        # Interpolate RR intervals to evenly spaced samples
-        rr_interpolated = np.interp(even_time, time_stamps[:-1], rr_array)
+        # Resample RR intervals to evenly spaced time series (4 Hz standard),
+        # cached on the series so repeated spectral calls share it
+        resampling_rate = 4.0  # Hz
+        _, rr_interpolated = series.resampled(resampling_rate)
 
         # Calculate power spectral density using Welch's method
         if method == 'welch':
-            freqs, psd = signal.welch(
+            nperseg = min(256, len(rr_interpolated))
+            _, psd = signal.welch(
                 rr_interpolated,
                 fs=resampling_rate,
-                nperseg=min(256, len(rr_interpolated)),
+                nperseg=nperseg,
                 scaling='density'
             )
+            table = spectral.welch_band_table(resampling_rate, nperseg, self.bands)
+        elif method == 'ar':
+            # Burg autoregressive spectrum, evaluated on a cached grid
+            table, psd = spectral.ar_psd(
+                rr_interpolated,
+                fs=resampling_rate,
+                order=self.ar_order,
+                criterion=self.ar_criterion,
+                bands=self.bands
+            )
         else:
-            # Autoregressive method (more complex, not implemented in basic version)
-            raise NotImplementedError("AR method not yet implemented")
+            raise ValueError(f"Unknown spectral method: {method}")
+
+        return self._frequency_metrics(table, psd)
+
+    def _frequency_metrics(
+        self,
+        table: spectral.BandTable,
+        psd: np.ndarray
+    ) -> Dict[str, float]:
+        """
+        Integrate all bands of a single PSD and derive the frequency domain metrics.
+
+        Args:
+            table: Cached band table for the PSD's frequency grid
+            psd: Power spectral density (ms²/Hz)
+
+        Returns:
+            Dictionary of frequency domain metrics as floats
+        """
+        derived = self._derive_frequency_metrics(spectral.integrate_bands(table, psd))
+        return {name: float(value) for name, value in derived.items()}
+
+    @staticmethod
+    def _derive_frequency_metrics(band_powers: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Derive total power, LF/HF ratio and normalized units from band powers.
+
+        Works element-wise, so the same formulas serve a single reading and a
+        whole batch of readings.
 
-        # Define frequency bands
-        vlf_band = (0.0033, 0.04)  # Very low frequency
-        lf_band = (0.04, 0.15)     # Low frequency
-        hf_band = (0.15, 0.40)     # High frequency
+        Args:
+            band_powers: Power per band (ms²) from spectral.integrate_bands,
+                including vlf_power, lf_power and hf_power
 
-        # Calculate power in each band
-        vlf_power = self._calculate_band_power(freqs, psd, vlf_band)
-        lf_power = self._calculate_band_power(freqs, psd, lf_band)
-        hf_power = self._calculate_band_power(freqs, psd, hf_band)
+        Returns:
+            Dictionary with all frequency domain metrics as arrays, followed
+            by any extra band powers
+        """
+        vlf_power = np.asarray(band_powers['vlf_power'], dtype=np.float64)
+        lf_power = np.asarray(band_powers['lf_power'], dtype=np.float64)
+        hf_power = np.asarray(band_powers['hf_power'], dtype=np.float64)
 
         # Total power: TP = VLF + LF + HF
         total_power = vlf_power + lf_power + hf_power
 
         # LF/HF ratio
-        lf_hf_ratio = lf_power / hf_power if hf_power > 0 else 0.0
+        lf_hf_ratio = np.divide(
+            lf_power, hf_power,
+            out=np.zeros_like(hf_power), where=hf_power > 0
+        )
 
         # Normalized units: LF(nu) = [LF / (TP - VLF)] × 100
         total_minus_vlf = total_power - vlf_power
-        lf_nu = (lf_power / total_minus_vlf * 100) if total_minus_vlf > 0 else 0.0
-        hf_nu = (hf_power / total_minus_vlf * 100) if total_minus_vlf > 0 else 0.0
-
-        return {
-            'vlf_power': float(vlf_power),
-            'lf_power': float(lf_power),
-            'hf_power': float(hf_power),
-            'total_power': float(total_power),
-            'lf_hf_ratio': float(lf_hf_ratio),
-            'lf_nu': float(lf_nu),
-            'hf_nu': float(hf_nu)
+        lf_nu = np.divide(
+            lf_power * 100, total_minus_vlf,
+            out=np.zeros_like(lf_power), where=total_minus_vlf > 0
+        )
+        hf_nu = np.divide(
+            hf_power * 100, total_minus_vlf,
+            out=np.zeros_like(hf_power), where=total_minus_vlf > 0
+        )
+
+        # Propagate missing band powers (NaN) instead of reporting zeros
+        missing = np.isnan(total_power)
+        for derived in (lf_hf_ratio, lf_nu, hf_nu):
+            derived[missing] = np.nan
+
+        metrics = {
+            'vlf_power': vlf_power,
+            'lf_power': lf_power,
+            'hf_power': hf_power,
+            'total_power': total_power,
+            'lf_hf_ratio': lf_hf_ratio,
+            'lf_nu': lf_nu,
+            'hf_nu': hf_nu
         }
 
-    def _calculate_band_power(
-        self,
-        freqs: np.ndarray,
-        psd: np.ndarray,
-        band: tuple
-    ) -> float:
+        # User-defined extra bands are reported as they are
+        for name, power in band_powers.items():
+            metrics.setdefault(name, np.asarray(power, dtype=np.float64))
+        return metrics
+
+    def calculate_nonlinear(self, rr_intervals: RRInput) -> Dict[str, Optional[float]]:
         """
-        Calculate power in a specific frequency band.
+        Calculate nonlinear HRV parameters.
 
         Args:
-            freqs: Frequency array from PSD
-            psd: Power spectral density array
-            band: Tuple of (low_freq, high_freq) in Hz
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
 
         Returns:
-            Power in the specified band (ms²)
+            Dictionary containing:
+            - sd1: Poincaré short-term variability (ms)
+            - sd2: Poincaré long-term variability (ms)
+            - sample_entropy: Sample entropy (m=2, r=0.2×SDNN)
+            - approximate_entropy: Approximate entropy (m=2, r=0.2×SDNN)
+            - dfa_alpha1: Short-term DFA exponent (4-16 beats)
+            - dfa_alpha2: Long-term DFA exponent (16-64 beats)
+
+            Entropies and DFA exponents are None when the recording is too
+            short or too regular for them to be defined. Recordings longer
+            than nonlinear.ENTROPY_WINDOW_BEATS get the mean entropies of
+            equal windows, each with its own r (see nonlinear.entropies).
         """
-        band_mask = (freqs >= band[0]) & (freqs < band[1])
-        band_power = np.trapz(psd[band_mask], freqs[band_mask])
-        return float(band_power)
+        series = RRSeries.coerce(rr_intervals)
+        if len(series.nn_diffs) < 2:
+            raise ValueError("Need at least 3 RR intervals for nonlinear analysis")
+
+        rr_array = series.values
+        sd1, sd2 = nonlinear.poincare(rr_array, series.nn_diffs)
+        sample_entropy, approximate_entropy = nonlinear.entropies(rr_array)
+
+        return {
+            'sd1': sd1,
+            'sd2': sd2,
+            'sample_entropy': sample_entropy,
+            'approximate_entropy': approximate_entropy,
+            'dfa_alpha1': nonlinear.dfa_alpha(rr_array, nonlinear.DFA_SHORT_SCALES),
+            'dfa_alpha2': nonlinear.dfa_alpha(rr_array, nonlinear.DFA_LONG_SCALES)
+        }
 
     def calculate_all_metrics(
         self,
-        rr_intervals: List[float]
+        rr_intervals: RRInput
     ) -> Dict[str, float]:
         """
-        Calculate all HRV metrics (time and frequency domain).
+        Calculate all HRV metrics (time, frequency and nonlinear domain).
 
         Args:
-            rr_intervals: List of R-R intervals in milliseconds
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
 
         Returns:
             Dictionary containing all HRV metrics
         """
         metrics = {}
+        rr_intervals = RRSeries.coerce(rr_intervals)
 
         # Time domain
         try:
@@ -205,58 +354,492 @@ class HRVCalculator:
             logger.error(f"Error calculating frequency domain metrics: {e}")
             raise
 
+        # Nonlinear
+        try:
+            nonlinear_metrics = self.calculate_nonlinear(rr_intervals)
+            metrics.update(nonlinear_metrics)
+        except Exception as e:
+            logger.error(f"Error calculating nonlinear metrics: {e}")
+            raise
+
         return metrics
 
+    def calculate_windowed(
+        self,
+        rr_intervals: RRInput,
+        window_seconds: float = 300.0,
+        step_seconds: float = 30.0
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate a timeline of HRV metrics over sliding windows.
+
+        Time domain metrics come from prefix sums over the whole recording
+        (each window is two lookups), and frequency domain metrics from one
+        4 Hz resampling of the whole recording, viewed as overlapping windows
+        with a strided view and passed to a single vectorized Welch call.
+        Because windows share the recording's resampling grid, their spectral
+        values can differ slightly from calculate_frequency_domain() run on
+        the same beats in isolation.
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
+            window_seconds: Window length in seconds (default: 5 minutes)
+            step_seconds: Step between window starts in seconds (default: 30 s)
+
+        Returns:
+            Columnar dictionary with 'window_start' (seconds from the start
+            of the recording), 'n_intervals' and one array per metric in
+            BATCH_METRICS. Windows with fewer than 2 intervals have NaN time
+            domain metrics; fewer than 60 intervals, NaN frequency domain.
+        """
+        resampling_rate = 4.0  # Hz
+        window_samples = int(round(window_seconds * resampling_rate))
+        step_samples = int(round(step_seconds * resampling_rate))
+        if window_samples < 1 or step_samples < 1:
+            raise ValueError("Window and step must each be at least one resampled sample long")
+
+        series = RRSeries.coerce(rr_intervals)
+        rr_array = series.values
+        even_time = np.arange(0, series.total_time, 1.0 / resampling_rate)
+
+        n_windows = max((len(even_time) - window_samples) // step_samples + 1, 0)
+        window_start = np.arange(n_windows) * step_samples / resampling_rate
+
+        # Intervals whose onset falls inside [start, start + window)
+        onsets = series.onsets
+        lo = np.searchsorted(onsets, window_start, side='left')
+        hi = np.searchsorted(onsets, window_start + window_samples / resampling_rate, side='left')
+        counts = hi - lo
+
+        timeline = {'window_start': window_start, 'n_intervals': counts}
+        for name in BATCH_METRICS:
+            timeline[name] = np.full(n_windows, np.nan)
+        if n_windows == 0:
+            return timeline
+
+        # Time domain from prefix sums (centred for numerical stability)
+        centred = rr_array - np.mean(rr_array)
+        # Successive differences touching a corrected beat are left out
+        usable = series.diff_mask
+        successive_diffs = np.where(usable, series.diffs, 0.0)
+        sum_x = np.concatenate(([0.0], np.cumsum(centred)))
+        sum_x2 = np.concatenate(([0.0], np.cumsum(centred ** 2)))
+        sum_d2 = np.concatenate(([0.0], np.cumsum(successive_diffs ** 2)))
+        sum_nn50 = np.concatenate(([0], np.cumsum(np.abs(successive_diffs) > 50)))
+        sum_usable = np.concatenate(([0], np.cumsum(usable)))
+
+        valid = counts >= 2
+        n = counts[valid]
+        lo_v, hi_v = lo[valid], hi[valid]
+        window_sum = sum_x[hi_v] - sum_x[lo_v]
+        mean_rri = window_sum / n + np.mean(rr_array)
+        squared_deviation = np.maximum(sum_x2[hi_v] - sum_x2[lo_v] - window_sum ** 2 / n, 0.0)
+
+        timeline['mean_rri'][valid] = mean_rri
+        timeline['mean_hr'][valid] = 60000.0 / mean_rri
+        timeline['sdnn'][valid] = np.sqrt(squared_deviation / (n - 1))
+        n_diffs = (sum_usable[hi_v - 1] - sum_usable[lo_v]).astype(np.float64)
+        n_diffs[n_diffs == 0] = np.nan
+        timeline['rmssd'][valid] = np.sqrt((sum_d2[hi_v - 1] - sum_d2[lo_v]) / n_diffs)
+        timeline['pnn50'][valid] = (sum_nn50[hi_v - 1] - sum_nn50[lo_v]) / n_diffs * 100
+
+        # Frequency domain over strided windows of the resampled recording
+        has_spectrum = counts >= 60
+        if np.any(has_spectrum):
+            _, rr_interpolated = series.resampled(resampling_rate)
+            windows = np.lib.stride_tricks.sliding_window_view(
+                rr_interpolated, window_samples
+            )[::step_samples][has_spectrum]
+            nperseg = min(256, window_samples)
+            _, psd = signal.welch(
+                windows,
+                fs=resampling_rate,
+                nperseg=nperseg,
+                scaling='density',
+                axis=-1
+            )
+
+            table = spectral.welch_band_table(resampling_rate, nperseg, self.bands)
+            derived = self._derive_frequency_metrics(spectral.integrate_bands(table, psd))
+            for name, values in derived.items():
+                timeline.setdefault(name, np.full(n_windows, np.nan))[has_spectrum] = values
+
+        return timeline
+
+    def calculate_batch(
+        self,
+        recordings: Union[Sequence[Sequence[float]], np.ndarray],
+        lengths: Optional[Sequence[int]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate time and frequency domain metrics for many recordings at once.
+
+        All recordings are flattened into one buffer, so differencing,
+        resampling, the Welch PSD and band integration each run as a single
+        vectorized NumPy operation instead of one calculate_all_metrics()
+        call per recording. Results match the per-recording methods to
+        floating point tolerance.
+
+        Args:
+            recordings: Either a sequence of RR interval lists, arrays or
+                RRSeries (ragged), or a 2-D array with each row padded at the
+                end with NaN
+            lengths: Optional number of valid intervals per row of a padded
+                array (default: count of non-NaN values)
+
+        Returns:
+            Columnar dictionary with one array per metric in BATCH_METRICS,
+            plus 'n_intervals'. Metrics that cannot be computed for a
+            recording (fewer than 2 intervals for time domain, fewer than 60
+            for frequency domain) are NaN.
+        """
+        values, counts, mask = self._flatten_recordings(recordings, lengths)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+        batch = {'n_intervals': counts}
+        batch.update(self._batch_time_domain(values, counts, starts, mask))
+        batch.update(self._batch_frequency_domain(values, counts, starts))
+        return batch
+
+    @staticmethod
+    def batch_to_records(batch: Dict[str, np.ndarray]) -> List[Dict[str, Optional[float]]]:
+        """
+        Convert a calculate_batch() result into row dictionaries.
+
+        The keys match HRVReading columns, so the result can be passed
+        straight to Session.bulk_insert_mappings() after adding user_id,
+        recorded_at and any other per-row fields.
+
+        Args:
+            batch: Columnar result from calculate_batch()
+
+        Returns:
+            One dictionary per recording (NaN metrics become None)
+        """
+        columns = []
+        for name in BATCH_METRICS:
+            column = batch[name].astype(object)
+            column[np.isnan(batch[name])] = None
+            columns.append(column.tolist())
+
+        return [dict(zip(BATCH_METRICS, row)) for row in zip(*columns)]
+
+    @staticmethod
+    def _flatten_recordings(
+        recordings: Union[Sequence[Sequence[float]], np.ndarray],
+        lengths: Optional[Sequence[int]] = None
+    ) -> tuple:
+        """
+        Flatten ragged or padded recordings into one contiguous buffer.
+
+        Returns:
+            Tuple of (values, counts, mask): all intervals concatenated in
+            recording order, the number of intervals per recording, and the
+            concatenated per-beat correction masks (None if no recording is
+            a masked RRSeries)
+        """
+        if isinstance(recordings, np.ndarray) and recordings.ndim == 2:
+            padded = np.asarray(recordings, dtype=np.float64)
+            if lengths is None:
+                counts = np.sum(~np.isnan(padded), axis=1)
+            else:
+                counts = np.asarray(lengths)
+            counts = counts.astype(np.int64)
+            valid = np.arange(padded.shape[1]) < counts[:, None]
+            return padded[valid], counts, None
+
+        counts = np.fromiter((len(r) for r in recordings), dtype=np.int64)
+        if any(isinstance(r, (np.ndarray, RRSeries)) for r in recordings):
+            values = np.concatenate([np.asarray(r, dtype=np.float64).reshape(-1) for r in recordings])
+            mask = None
+            if any(isinstance(r, RRSeries) and r.mask is not None for r in recordings):
+                mask = np.concatenate([
+                    r.mask if isinstance(r, RRSeries) and r.mask is not None
+                    else np.zeros(len(r), dtype=bool)
+                    for r in recordings
+                ])
+            return values, counts, mask
+        values = np.fromiter(
+            itertools.chain.from_iterable(recordings),
+            dtype=np.float64,
+            count=int(counts.sum())
+        )
+        return values, counts, None
+
+    @staticmethod
+    def _batch_time_domain(
+        values: np.ndarray,
+        counts: np.ndarray,
+        starts: np.ndarray,
+        mask: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized time domain metrics for flattened recordings.
+
+        Per-recording sums are taken with np.add.reduceat over the start
+        offsets of non-empty recordings; successive differences that would
+        cross a recording boundary, or touch a beat set in the optional
+        correction mask, are zeroed before summing.
+        """
+        n_recordings = len(counts)
+        result = {
+            name: np.full(n_recordings, np.nan)
+            for name in ('mean_rri', 'mean_hr', 'sdnn', 'rmssd', 'pnn50')
+        }
+        valid = counts >= 2
+        if not np.any(valid):
+            return result
+
+        nonempty = counts > 0
+        segment_starts = starts[nonempty]
+        segment_counts = counts[nonempty]
+
+        def per_recording_sum(per_interval: np.ndarray) -> np.ndarray:
+            totals = np.zeros(n_recordings)
+            totals[nonempty] = np.add.reduceat(per_interval, segment_starts)
+            return totals
+
+        # Mean RR interval and heart rate
+        mean_rri = per_recording_sum(values) / np.maximum(counts, 1)
+
+        # SDNN (two-pass to avoid cancellation in the sum of squares)
+        deviations = values - np.repeat(mean_rri[nonempty], segment_counts)
+        sdnn = np.sqrt(per_recording_sum(deviations ** 2) / np.maximum(counts - 1, 1))
+
+        # Successive differences; the last interval of each recording has none
+        usable = np.ones(len(values), dtype=bool)
+        usable[-1:] = False
+        usable[segment_starts + segment_counts - 1] = False
+        if mask is not None:
+            usable[:-1] &= ~(mask[:-1] | mask[1:])
+        successive_diffs = np.zeros_like(values)
+        successive_diffs[:-1] = np.diff(values)
+        successive_diffs[~usable] = 0.0
+
+        n_diffs = per_recording_sum(usable.astype(np.float64))
+        n_diffs[n_diffs == 0] = np.nan
+        rmssd = np.sqrt(per_recording_sum(successive_diffs ** 2) / n_diffs)
+        nn50_count = per_recording_sum((np.abs(successive_diffs) > 50).astype(np.float64))
+        pnn50 = nn50_count / n_diffs * 100
+
+        result['mean_rri'][valid] = mean_rri[valid]
+        result['mean_hr'][valid] = 60000.0 / mean_rri[valid]
+        result['sdnn'][valid] = sdnn[valid]
+        result['rmssd'][valid] = rmssd[valid]
+        result['pnn50'][valid] = pnn50[valid]
+        return result
+
+    def _batch_frequency_domain(
+        self,
+        values: np.ndarray,
+        counts: np.ndarray,
+        starts: np.ndarray,
+        max_segments_per_chunk: int = 8192
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized Welch frequency domain metrics for flattened recordings.
+
+        Every eligible recording is resampled to 4 Hz with one np.interp call
+        (recordings are laid end to end on a shared time axis, separated by a
+        hold point so no interpolation crosses a boundary). The Welch
+        segments of all recordings are then detrended, windowed and
+        transformed together, in chunks of at most max_segments_per_chunk
+        segments to bound memory.
+        """
+        n_recordings = len(counts)
+        band_powers = {
+            f'{name}_power': np.full(n_recordings, np.nan)
+            for name, _ in self.bands
+        }
+
+        rows = np.flatnonzero(counts >= 60)
+        if len(rows) > 0:
+            resampling_rate = 4.0  # Hz
+            row_counts = counts[rows]
+            rr = values[self._flat_ranges(starts[rows], row_counts)]
+            row_starts = np.concatenate(([0], np.cumsum(row_counts)[:-1]))
+            row_ends = row_starts + row_counts
+
+            # Beat onset times within each recording (seconds from its start)
+            elapsed = np.cumsum(rr)
+            row_base = elapsed[row_starts] - rr[row_starts]
+            onset = (elapsed - rr - np.repeat(row_base, row_counts)) / 1000.0
+            total_time = (elapsed[row_ends - 1] - row_base) / 1000.0
+
+            # Lay recordings end to end with a one second gap, and add a
+            # hold point at each recording's end so trailing samples keep
+            # the last RR value (np.interp's behaviour for a single series)
+            offsets = np.concatenate(([0.0], np.cumsum(total_time + 1.0)[:-1]))
+            xp = np.insert(onset + np.repeat(offsets, row_counts), row_ends, offsets + total_time)
+            fp = np.insert(rr, row_ends, rr[row_ends - 1])
+
+            n_samples = np.ceil(total_time * resampling_rate).astype(np.int64)
+            sample_starts = np.concatenate(([0], np.cumsum(n_samples)[:-1]))
+            sample_index = np.arange(n_samples.sum()) - np.repeat(sample_starts, n_samples)
+            even_time = sample_index / resampling_rate + np.repeat(offsets, n_samples)
+            resampled = np.interp(even_time, xp, fp)
+
+            powers = self._batch_welch_band_powers(
+                resampled, sample_starts, n_samples, resampling_rate,
+                max_segments_per_chunk
+            )
+            for name, power in powers.items():
+                band_powers[name][rows] = power
+
+        return self._derive_frequency_metrics(band_powers)
+
+    def _batch_welch_band_powers(
+        self,
+        resampled: np.ndarray,
+        sample_starts: np.ndarray,
+        n_samples: np.ndarray,
+        fs: float,
+        max_segments_per_chunk: int
+    ) -> Dict[str, np.ndarray]:
+        """
+        Welch band powers for evenly resampled recordings laid end to end.
+
+        Reproduces signal.welch(x, fs, nperseg=min(256, len(x))) with its
+        defaults (periodic Hann window, 50% overlap, constant detrend,
+        one-sided density scaling) for each recording.
+        """
+        n_rows = len(n_samples)
+        powers = {f'{name}_power': np.full(n_rows, np.nan) for name, _ in self.bands}
+
+        def store(row_index: np.ndarray, nperseg: int, psd: np.ndarray):
+            table = spectral.welch_band_table(fs, nperseg, self.bands)
+            for name, power in spectral.integrate_bands(table, psd).items():
+                powers[name][row_index] = power
+
+        # Short recordings: a single segment as long as the recording itself
+        for length in np.unique(n_samples[n_samples < 256]):
+            row_index = np.flatnonzero(n_samples == length)
+            stacked = resampled[self._flat_ranges(sample_starts[row_index], np.full(len(row_index), length))]
+            _, psd = signal.welch(
+                stacked.reshape(len(row_index), length),
+                fs=fs,
+                nperseg=int(length),
+                scaling='density',
+                axis=-1
+            )
+            store(row_index, int(length), psd)
+
+        # Full recordings: 256-sample segments with 128-sample steps
+        nperseg, step = 256, 128
+        full_rows = np.flatnonzero(n_samples >= nperseg)
+        if len(full_rows) == 0:
+            return powers
+
+        window = signal.get_window('hann', nperseg)
+        scale = 1.0 / (fs * np.sum(window ** 2))
+        segments = np.lib.stride_tricks.sliding_window_view(resampled, nperseg)
+
+        n_segments = (n_samples[full_rows] - nperseg) // step + 1
+        first_segment = np.concatenate(([0], np.cumsum(n_segments)[:-1]))
+        chunk_ids = first_segment // max_segments_per_chunk
+        chunk_bounds = np.flatnonzero(np.diff(chunk_ids)) + 1
+        for chunk in np.split(np.arange(len(full_rows)), chunk_bounds):
+            chunk_rows = full_rows[chunk]
+            chunk_segments = n_segments[chunk]
+            segment_offsets = self._flat_ranges(np.zeros(len(chunk), dtype=np.int64), chunk_segments) * step
+            segment_starts = np.repeat(sample_starts[chunk_rows], chunk_segments) + segment_offsets
+
+            windowed = segments[segment_starts]
+            windowed = (windowed - windowed.mean(axis=1, keepdims=True)) * window
+            psd = np.abs(np.fft.rfft(windowed, axis=1)) ** 2 * scale
+            psd[:, 1:-1] *= 2  # One-sided spectrum (even nperseg keeps Nyquist single)
+
+            first_segment = np.concatenate(([0], np.cumsum(chunk_segments)[:-1]))
+            mean_psd = np.add.reduceat(psd, first_segment, axis=0) / chunk_segments[:, None]
+            store(chunk_rows, nperseg, mean_psd)
+
+        return powers
+
+    @staticmethod
+    def _flat_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Concatenate arange(start, start + count) for every (start, count) pair"""
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return np.arange(int(np.sum(counts))) + np.repeat(starts - offsets, counts)
+
     def check_data_quality(
         self,
-        rr_intervals: List[float],
+        rr_intervals: RRInput,
         max_hr: float = 200.0,
-        min_hr: float = 30.0
+        min_hr: float = 30.0,
+        max_artifact_percentage: float = 20.0
     ) -> Dict[str, any]:
         """
-        Check RR interval data quality and detect artifacts.
+        Check RR interval data quality, then detect and correct artifacts.
+
+        Artifacts are classified beat by beat (ectopic, long, short, missed,
+        extra) with ArtifactCorrector and corrected instead of rejecting the
+        recording; only recordings that are too short or where more than
+        max_artifact_percentage of beats needed correction are invalid.
 
         Args:
-            rr_intervals: List of R-R intervals in milliseconds
+            rr_intervals: R-R intervals in milliseconds (list, array or RRSeries)
             max_hr: Maximum physiological HR (bpm)
             min_hr: Minimum physiological HR (bpm)
+            max_artifact_percentage: Highest share of corrected beats (%) for
+                the recording to remain usable
 
         Returns:
             Dictionary with quality metrics:
             - is_valid: Boolean indicating if data is acceptable
-            - artifact_count: Number of potential artifacts
-            - artifact_percentage: Percentage of data that are artifacts
+            - artifact_count: Number of beats classified as artifacts
+            - artifact_percentage: Percentage of beats that are artifacts
+            - total_intervals: Number of intervals before correction
+            - artifact_types: Number of beats of each artifact type
+            - corrected: Corrected RRSeries with a per-beat correction mask,
+              to pass to calculate_all_metrics()
             - issues: List of quality issues
         """
-        rr_array = np.array(rr_intervals)
-        issues = []
-        artifact_count = 0
+        series = RRSeries.coerce(rr_intervals)
+        corrector = ArtifactCorrector(min_hr=min_hr, max_hr=max_hr)
+
+        # Classify every beat and correct the artifacts in one pass
+        beat_types = corrector.classify(series)
+        artifact_types = corrector.summarize(beat_types)
+        corrected = corrector.correct(series, beat_types)
+
+        quality = self.summarize_quality(artifact_types, len(series), max_artifact_percentage)
+        quality['corrected'] = corrected
+        return quality
+
+    @staticmethod
+    def summarize_quality(
+        artifact_types: Dict[str, int],
+        total_intervals: int,
+        max_artifact_percentage: float = 20.0
+    ) -> Dict[str, any]:
+        """
+        Quality verdict from artifact counts (check_data_quality() without
+        the corrected series).
 
-        # Convert HR limits to RR intervals (ms)
-        max_rri = 60000.0 / min_hr  # Maximum RR interval
-        min_rri = 60000.0 / max_hr  # Minimum RR interval
+        Args:
+            artifact_types: Number of beats of each artifact type
+            total_intervals: Number of intervals before correction
+            max_artifact_percentage: Highest share of corrected beats (%) for
+                the recording to remain usable
 
-        # Check for physiologically impossible values
-        invalid_rri = (rr_array > max_rri) | (rr_array < min_rri)
-        artifact_count += np.sum(invalid_rri)
-        if np.any(invalid_rri):
-            issues.append(f"Found {np.sum(invalid_rri)} physiologically impossible RR intervals")
+        Returns:
+            Dictionary with is_valid, artifact_count, artifact_percentage,
+            total_intervals, artifact_types and issues
+        """
+        issues = []
+        artifact_count = sum(artifact_types.values())
 
-        # Check for extreme successive differences (likely artifacts)
-        successive_diffs = np.abs(np.diff(rr_array))
-        extreme_diffs = successive_diffs > 300  # >300ms change is suspicious
-        artifact_count += np.sum(extreme_diffs)
-        if np.any(extreme_diffs):
-            issues.append(f"Found {np.sum(extreme_diffs)} extreme successive differences")
+        for name, count in artifact_types.items():
+            if count:
+                issues.append(f"Corrected {count} {name} beats")
 
         # Calculate artifact percentage
-        total_intervals = len(rr_intervals)
         artifact_percentage = (artifact_count / total_intervals) * 100 if total_intervals > 0 else 0
 
-        # Data is valid if <5% artifacts and sufficient length
-        is_valid = artifact_percentage < 5.0 and total_intervals >= 60
+        # Data is valid if artifacts are correctable and length is sufficient
+        is_valid = artifact_percentage <= max_artifact_percentage and total_intervals >= 60
 
-        if artifact_percentage >= 5.0:
+        if artifact_percentage > max_artifact_percentage:
             issues.append(f"High artifact rate: {artifact_percentage:.1f}%")
         if total_intervals < 60:
             issues.append(f"Insufficient data: only {total_intervals} intervals")
@@ -266,5 +849,6 @@ class HRVCalculator:
             'artifact_count': int(artifact_count),
             'artifact_percentage': float(artifact_percentage),
             'total_intervals': int(total_intervals),
+            'artifact_types': artifact_types,
             'issues': issues
         }
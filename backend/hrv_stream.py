@@ -0,0 +1,496 @@
+import numpy as np
+from scipy import signal
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from backend import spectral
+from backend.artifact_correction import BEAT_TYPES, ArtifactCorrector
+from backend.hrv_calculator import HRVCalculator
+
+class RRAccumulator:
+    """
+    Incremental time domain HRV for unbounded RR interval streams.
+
+    Keeps O(1) state (count, running mean and sum of squared deviations via
+    Welford's algorithm, sums of successive differences, NN50 count, first
+    and last interval), so a whole night can be consumed beat by beat or
+    chunk by chunk without holding the recording in memory. Partial
+    accumulators built on different workers can be combined with merge().
+
+    Beats can be marked as corrected artifacts; like RRSeries.nn_diffs, a
+    successive difference only counts when neither of its beats is marked.
+
+    snapshot() and poincare() return the same metrics as
+    HRVCalculator.calculate_time_domain and calculate_nonlinear to floating
+    point tolerance.
+    """
+
+    def __init__(self, nn50_threshold: float = 50.0):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            nn50_threshold: Successive difference threshold for pNN50 (ms)
+        """
+        self.nn50_threshold = nn50_threshold
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0              # Sum of squared deviations from the mean
+        self.n_diffs = 0           # Successive differences between unmarked beats
+        self.sum_diff = 0.0        # Σ(RRᵢ₊₁ - RRᵢ) over those differences
+        self.sum_sq_diff = 0.0     # Σ(RRᵢ₊₁ - RRᵢ)² over those differences
+        self.nn50_count = 0
+        self.first_rri: Optional[float] = None
+        self.last_rri: Optional[float] = None
+        self.first_masked = False
+        self.last_masked = False
+
+    def update(self, rr_interval: float, masked: bool = False) -> None:
+        """
+        Add a single RR interval (ms).
+
+        Args:
+            rr_interval: R-R interval in milliseconds
+            masked: Whether the beat is a corrected artifact
+        """
+        rr_interval = float(rr_interval)
+
+        if self.last_rri is None:
+            self.first_rri = rr_interval
+            self.first_masked = masked
+        elif not (masked or self.last_masked):
+            diff = rr_interval - self.last_rri
+            self.n_diffs += 1
+            self.sum_diff += diff
+            self.sum_sq_diff += diff * diff
+            if abs(diff) > self.nn50_threshold:
+                self.nn50_count += 1
+
+        # Welford's online update for mean and variance
+        self.count += 1
+        delta = rr_interval - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (rr_interval - self.mean)
+
+        self.last_rri = rr_interval
+        self.last_masked = masked
+
+    def extend(
+        self,
+        rr_intervals: Union[Iterable[float], np.ndarray],
+        mask: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Add a chunk of RR intervals (ms).
+
+        The chunk is reduced with NumPy and folded in with merge(), so the
+        per-beat cost stays O(1) while avoiding a Python loop per beat.
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds
+            mask: Optional boolean array, True for corrected artifacts
+        """
+        self.merge(self.from_array(rr_intervals, nn50_threshold=self.nn50_threshold, mask=mask))
+
+    @classmethod
+    def from_array(
+        cls,
+        rr_intervals: Union[Iterable[float], np.ndarray],
+        nn50_threshold: float = 50.0,
+        mask: Optional[np.ndarray] = None
+    ) -> 'RRAccumulator':
+        """
+        Build an accumulator state from a chunk of RR intervals.
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds
+            nn50_threshold: Successive difference threshold for pNN50 (ms)
+            mask: Optional boolean array, True for corrected artifacts
+
+        Returns:
+            Accumulator holding the chunk's summary state
+        """
+        rr_array = np.asarray(rr_intervals, dtype=np.float64).ravel()
+        accumulator = cls(nn50_threshold=nn50_threshold)
+        if rr_array.size == 0:
+            return accumulator
+
+        successive_diffs = np.diff(rr_array)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool).ravel()
+            if mask.shape != rr_array.shape:
+                raise ValueError("mask must have one entry per RR interval")
+            successive_diffs = successive_diffs[~(mask[1:] | mask[:-1])]
+            accumulator.first_masked = bool(mask[0])
+            accumulator.last_masked = bool(mask[-1])
+
+        accumulator.count = int(rr_array.size)
+        accumulator.mean = float(np.mean(rr_array))
+        accumulator.m2 = float(np.sum((rr_array - accumulator.mean) ** 2))
+        accumulator.n_diffs = int(successive_diffs.size)
+        accumulator.sum_diff = float(np.sum(successive_diffs))
+        accumulator.sum_sq_diff = float(np.sum(successive_diffs ** 2))
+        accumulator.nn50_count = int(np.sum(np.abs(successive_diffs) > nn50_threshold))
+        accumulator.first_rri = float(rr_array[0])
+        accumulator.last_rri = float(rr_array[-1])
+        return accumulator
+
+    def merge(self, other: 'RRAccumulator') -> 'RRAccumulator':
+        """
+        Fold another accumulator into this one.
+
+        `other` must cover the beats immediately following this accumulator's
+        beats; the successive difference across the seam is added here.
+        Variance states are combined with Chan et al.'s parallel formula.
+
+        Args:
+            other: Accumulator for the next chunk of the same recording
+
+        Returns:
+            self, to allow chaining
+        """
+        if other.nn50_threshold != self.nn50_threshold:
+            raise ValueError("Cannot merge accumulators with different NN50 thresholds")
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean
+            self.m2 = other.m2
+            self.n_diffs = other.n_diffs
+            self.sum_diff = other.sum_diff
+            self.sum_sq_diff = other.sum_sq_diff
+            self.nn50_count = other.nn50_count
+            self.first_rri = other.first_rri
+            self.last_rri = other.last_rri
+            self.first_masked = other.first_masked
+            self.last_masked = other.last_masked
+            return self
+
+        # Successive difference across the chunk boundary
+        self.n_diffs += other.n_diffs
+        self.sum_diff += other.sum_diff
+        self.sum_sq_diff += other.sum_sq_diff
+        self.nn50_count += other.nn50_count
+        if not (self.last_masked or other.first_masked):
+            seam_diff = other.first_rri - self.last_rri
+            self.n_diffs += 1
+            self.sum_diff += seam_diff
+            self.sum_sq_diff += seam_diff * seam_diff
+            self.nn50_count += int(abs(seam_diff) > self.nn50_threshold)
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.last_rri = other.last_rri
+        self.last_masked = other.last_masked
+        return self
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Current time domain metrics.
+
+        Returns:
+            Dictionary with mean_rri, mean_hr, sdnn, rmssd and pnn50, in the
+            same units as HRVCalculator.calculate_time_domain
+        """
+        if self.count < 2:
+            raise ValueError("Need at least 2 RR intervals for time domain analysis")
+        if self.n_diffs == 0:
+            raise ValueError("No successive differences between uncorrected beats")
+
+        return {
+            'mean_rri': float(self.mean),
+            'mean_hr': float(60000.0 / self.mean),
+            'sdnn': float(np.sqrt(self.m2 / (self.count - 1))),
+            'rmssd': float(np.sqrt(self.sum_sq_diff / self.n_diffs)),
+            'pnn50': float(self.nn50_count / self.n_diffs * 100)
+        }
+
+    def poincare(self) -> Tuple[float, float]:
+        """
+        Current Poincaré descriptors, as nonlinear.poincare().
+
+        Returns:
+            Tuple of (sd1, sd2) in ms
+        """
+        if self.n_diffs < 2:
+            raise ValueError("Need at least 3 RR intervals for nonlinear analysis")
+
+        diff_variance = (self.sum_sq_diff - self.sum_diff ** 2 / self.n_diffs) / (self.n_diffs - 1)
+        sd1_squared = max(diff_variance, 0.0) / 2
+        sdnn_squared = self.m2 / (self.count - 1)
+        return float(np.sqrt(sd1_squared)), float(np.sqrt(max(2 * sdnn_squared - sd1_squared, 0.0)))
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        """Serialize the accumulator state (e.g. to hand it between workers)"""
+        return {
+            'nn50_threshold': self.nn50_threshold,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'n_diffs': self.n_diffs,
+            'sum_diff': self.sum_diff,
+            'sum_sq_diff': self.sum_sq_diff,
+            'nn50_count': self.nn50_count,
+            'first_rri': self.first_rri,
+            'last_rri': self.last_rri,
+            'first_masked': self.first_masked,
+            'last_masked': self.last_masked
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Optional[float]]) -> 'RRAccumulator':
+        """Restore an accumulator from to_dict() output"""
+        accumulator = cls(nn50_threshold=state['nn50_threshold'])
+        accumulator.count = int(state['count'])
+        accumulator.mean = float(state['mean'])
+        accumulator.m2 = float(state['m2'])
+        accumulator.n_diffs = int(state['n_diffs'])
+        accumulator.sum_diff = float(state['sum_diff'])
+        accumulator.sum_sq_diff = float(state['sum_sq_diff'])
+        accumulator.nn50_count = int(state['nn50_count'])
+        accumulator.first_rri = state['first_rri']
+        accumulator.last_rri = state['last_rri']
+        accumulator.first_masked = bool(state['first_masked'])
+        accumulator.last_masked = bool(state['last_masked'])
+        return accumulator
+
+class WelchAccumulator:
+    """
+    Incremental Welch spectrum of an RR interval stream.
+
+    Beats are resampled to fs by linear interpolation at the beat onsets
+    (as RRSeries.resampled) as soon as the following beat is known, and each
+    Welch segment is transformed as soon as its samples are in, so only the
+    samples of the current segment are held. finish() returns the spectrum
+    HRVCalculator.calculate_frequency_domain computes with method='welch'
+    over the whole recording, to floating point tolerance.
+    """
+
+    def __init__(
+        self,
+        fs: float = 4.0,
+        nperseg: int = 256,
+        bands: Tuple[Tuple[str, Tuple[float, float]], ...] = spectral.FREQUENCY_BANDS
+    ):
+        """
+        Initialize an empty spectrum.
+
+        Args:
+            fs: Resampling rate in Hz (default: 4 Hz standard)
+            nperseg: Welch segment length (50% overlap, Hann window)
+            bands: (name, (low, high)) pairs for the returned band table
+        """
+        self.fs = fs
+        self.nperseg = nperseg
+        self.bands = bands
+
+        self.count = 0             # Beats received
+        self.elapsed_ms = 0.0      # Sum of the intervals received
+        self.n_samples = 0         # Resampled points produced
+        self.n_segments = 0        # Welch segments transformed
+        self.psd_sum: Optional[np.ndarray] = None
+        self._sample_step = 1.0 / fs
+        self._last_onset: Optional[float] = None
+        self._last_value: Optional[float] = None
+        self._samples = np.empty(0)  # Resampled points from the next segment start on
+
+    def extend(self, rr_intervals: Union[Iterable[float], np.ndarray]) -> None:
+        """
+        Add a chunk of RR intervals (ms).
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds
+        """
+        rr_array = np.asarray(rr_intervals, dtype=np.float64).ravel()
+        if rr_array.size == 0:
+            return
+
+        # Onsets continue the running sum exactly as one cumsum over the night would
+        stamps = np.cumsum(np.concatenate(([self.elapsed_ms], rr_array)))
+        onsets = stamps[:-1] / 1000.0
+        values = rr_array
+        if self._last_onset is not None:
+            onsets = np.concatenate(([self._last_onset], onsets))
+            values = np.concatenate(([self._last_value], values))
+        self.count += rr_array.size
+        self.elapsed_ms = float(stamps[-1])
+
+        # Points before the newest onset only depend on beats already received
+        self._resample(int(np.ceil(onsets[-1] / self._sample_step)), onsets, values)
+        self._last_onset, self._last_value = float(onsets[-1]), float(values[-1])
+
+    def finish(self) -> Tuple[spectral.BandTable, np.ndarray]:
+        """
+        Resample the end of the recording and average the segments.
+
+        Returns:
+            Tuple of (band table, PSD in ms²/Hz) for HRVCalculator's band
+            integration
+        """
+        if self._last_onset is None:
+            raise ValueError("No RR intervals received")
+
+        # After the last onset the interpolation holds the last interval
+        total_samples = int(np.ceil(self.elapsed_ms / 1000.0 / self._sample_step))
+        self._resample(total_samples, np.array([self._last_onset]), np.array([self._last_value]))
+
+        if self.n_segments == 0:
+            # Shorter than one segment: a single periodogram over everything
+            nperseg = len(self._samples)
+            _, psd = signal.welch(self._samples, fs=self.fs, nperseg=nperseg, scaling='density')
+        else:
+            nperseg = self.nperseg
+            psd = self.psd_sum / self.n_segments
+        return spectral.welch_band_table(self.fs, nperseg, self.bands), psd
+
+    def _resample(self, stop: int, onsets: np.ndarray, values: np.ndarray) -> None:
+        """Interpolate the points up to index stop and transform complete segments"""
+        if stop <= self.n_samples:
+            return
+        times = np.arange(self.n_samples, stop) * self._sample_step
+        self._samples = np.concatenate((self._samples, np.interp(times, onsets, values)))
+        self.n_samples = stop
+
+        if len(self._samples) < self.nperseg:
+            return
+        step = self.nperseg // 2
+        n_segments = (len(self._samples) - self.nperseg) // step + 1
+        _, psd = signal.welch(
+            self._samples[:self.nperseg + (n_segments - 1) * step],
+            fs=self.fs,
+            nperseg=self.nperseg,
+            scaling='density'
+        )
+        psd_sum = psd * n_segments
+        self.psd_sum = psd_sum if self.psd_sum is None else self.psd_sum + psd_sum
+        self.n_segments += n_segments
+        self._samples = self._samples[n_segments * step:]
+
+class HRVStream:
+    """
+    Quality check, artifact correction and metrics for a recording that
+    arrives in chunks.
+
+    This is the streaming counterpart of compute_pool.analyze_recording.
+    Beats are corrected in blocks of block_size, each classified together
+    with `context` beats on both sides: enough for every adaptive threshold
+    to see the same neighbours as in a pass over the whole recording, so the
+    classification matches check_data_quality() beat for beat (corrections
+    too, unless a run of artifacts is longer than the context). Corrected
+    beats go straight into an RRAccumulator and a WelchAccumulator, so
+    memory stays bounded by the block size whatever the recording length.
+
+    finish() returns the same {'quality', 'metrics'} dictionary as
+    analyze_recording(). Time domain, Welch frequency domain and Poincaré
+    metrics agree to floating point tolerance; entropy and DFA need the
+    whole recording at once and are None.
+    """
+
+    def __init__(
+        self,
+        calculator: Optional[HRVCalculator] = None,
+        min_hr: float = 30.0,
+        max_hr: float = 200.0,
+        max_artifact_percentage: float = 20.0,
+        block_size: int = 4096
+    ):
+        """
+        Initialize an empty stream.
+
+        Args:
+            calculator: HRVCalculator for the band configuration and metric
+                derivation (default: standard bands)
+            min_hr: Minimum physiological HR (bpm)
+            max_hr: Maximum physiological HR (bpm)
+            max_artifact_percentage: Highest share of corrected beats (%) for
+                the recording to remain usable
+            block_size: Beats corrected per block
+        """
+        self.calculator = calculator or HRVCalculator()
+        self.corrector = ArtifactCorrector(min_hr=min_hr, max_hr=max_hr)
+        self.max_artifact_percentage = max_artifact_percentage
+        self.block_size = block_size
+        # A beat's classification reaches half a threshold window plus half a
+        # median window (and a few neighbours) to either side
+        self.context = self.corrector.threshold_window + self.corrector.median_window
+
+        self.total_intervals = 0
+        self.artifact_types = {name: 0 for name in BEAT_TYPES[1:]}
+        self.accumulator = RRAccumulator()
+        self.spectrum = WelchAccumulator(bands=self.calculator.bands)
+        self._pending = np.empty(0)  # Raw beats: context already corrected, then the rest
+        self._n_context = 0
+
+    def extend(self, rr_intervals: Union[Iterable[float], np.ndarray]) -> None:
+        """
+        Add a chunk of raw RR intervals (ms).
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds
+        """
+        rr_array = np.asarray(rr_intervals, dtype=np.float64).ravel()
+        self.total_intervals += rr_array.size
+        self._pending = np.concatenate((self._pending, rr_array))
+        while len(self._pending) - self._n_context >= self.block_size + self.context:
+            self._correct_block(self.block_size)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Correct the remaining beats and compute the results.
+
+        Returns:
+            Dictionary with 'quality' (as check_data_quality() without the
+            corrected series) and 'metrics' (None if the recording is not
+            valid)
+        """
+        remaining = len(self._pending) - self._n_context
+        if remaining:
+            self._correct_block(remaining)
+
+        quality = self.calculator.summarize_quality(
+            self.artifact_types, self.total_intervals, self.max_artifact_percentage
+        )
+        metrics = self._metrics() if quality['is_valid'] else None
+        return {'quality': quality, 'metrics': metrics}
+
+    def _correct_block(self, size: int) -> None:
+        """Correct the next `size` pending beats and feed them to the accumulators"""
+        start = self._n_context
+        stop = start + size
+        window = self._pending[:stop + self.context]
+
+        beat_types = self.corrector.classify(window)
+        corrected = self.corrector.correct(window, beat_types)
+        offsets = np.concatenate(([0], np.cumsum(self.corrector.corrected_counts(beat_types))))
+        block = slice(offsets[start], offsets[stop])
+
+        self.accumulator.extend(corrected.values[block], corrected.mask[block])
+        self.spectrum.extend(corrected.values[block])
+        for name, count in self.corrector.summarize(beat_types[start:stop]).items():
+            self.artifact_types[name] += count
+
+        # The end of this block is the left context of the next one
+        keep = min(self.context, stop)
+        self._pending = self._pending[stop - keep:]
+        self._n_context = keep
+
+    def _metrics(self) -> Dict[str, Optional[float]]:
+        """All metrics from the accumulators (see class docstring)"""
+        if self.accumulator.count < 60:
+            raise ValueError("Need at least 60 RR intervals for frequency domain analysis")
+
+        metrics = self.accumulator.snapshot()
+        metrics.update(self.calculator._frequency_metrics(*self.spectrum.finish()))
+        sd1, sd2 = self.accumulator.poincare()
+        metrics.update({
+            'sd1': sd1,
+            'sd2': sd2,
+            'sample_entropy': None,
+            'approximate_entropy': None,
+            'dfa_alpha1': None,
+            'dfa_alpha2': None
+        })
+        return metrics
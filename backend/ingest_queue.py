@@ -0,0 +1,278 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from backend.database import SessionLocal
+from backend.models import IngestJob
+
+logger = logging.getLogger(__name__)
+
+# IngestJob.status values
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED)
+
+JobHandler = Callable[[Session, IngestJob], None]
+
+class JobFailed(Exception):
+    """Raised by a job handler for errors retrying cannot fix (e.g. invalid data)"""
+
+class IngestQueue:
+    """
+    Durable queue of uploads in the ingest_jobs table, drained by
+    background worker threads.
+
+    Uploads are committed to the table before the API answers, so they
+    survive restarts, and workers process them independently of the
+    request:
+
+    - Claiming: a worker moves the oldest due job to 'running' with one
+      UPDATE and holds it for `lease` seconds. While the handler runs, the
+      lease is renewed every third of it, so long jobs are never claimed
+      twice. Jobs whose worker died (e.g. the server restarted) become due
+      again when the lease expires.
+    - Retries: a handler exception puts the job back with exponential
+      backoff (retry_delay, doubled per attempt) until max_attempts; a
+      JobFailed exception fails it at once.
+    - Workers are threads: the heavy computation runs on the compute pool.
+
+    When the queue is not running (workers=0, or before start()) jobs stay
+    queued until run_once() is called.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_attempts: int = 5,
+        retry_delay: float = 2.0,
+        lease: float = 60.0,
+        poll_interval: float = 1.0
+    ):
+        """
+        Initialize ingest queue (call start() to run the workers).
+
+        Args:
+            workers: Number of worker threads; 0 disables background processing
+            max_attempts: Attempts before a job is marked failed
+            retry_delay: Seconds before the first retry, doubled per attempt
+            lease: Seconds a claimed job is reserved for its worker
+                without renewal (how soon a dead worker's job is retried)
+            poll_interval: Seconds between checks for due jobs when idle
+        """
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._handler: Optional[JobHandler] = None
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> 'IngestQueue':
+        """
+        Build a queue from environment variables:
+        HRV_INGEST_WORKERS (default: 2, 0 disables the workers),
+        HRV_INGEST_MAX_ATTEMPTS (default: 5),
+        HRV_INGEST_RETRY_DELAY (seconds, default: 2) and
+        HRV_INGEST_LEASE (seconds, default: 60).
+        """
+        return cls(
+            workers=int(os.getenv('HRV_INGEST_WORKERS', 2)),
+            max_attempts=int(os.getenv('HRV_INGEST_MAX_ATTEMPTS', 5)),
+            retry_delay=float(os.getenv('HRV_INGEST_RETRY_DELAY', 2.0)),
+            lease=float(os.getenv('HRV_INGEST_LEASE', 60.0))
+        )
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self, handler: JobHandler) -> None:
+        """
+        Start the worker threads.
+
+        Args:
+            handler: Called with a session and each claimed job; it stores
+                its results on the job and raises to retry or JobFailed to
+                give up
+        """
+        self._handler = handler
+        if self.running or self.workers <= 0:
+            return
+
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started ingest queue with {self.workers} workers")
+
+    def shutdown(self) -> None:
+        """Stop the workers after their current job"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def enqueue(self, db: Session, user_id: int, content_type: str, payload: bytes) -> IngestJob:
+        """
+        Commit an upload to the queue.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            content_type: Media type of the payload
+            payload: Request body
+
+        Returns:
+            The queued IngestJob
+        """
+        job = IngestJob(user_id=user_id, status=JOB_QUEUED, content_type=content_type, payload=payload)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        return job
+
+    def depth(self, db: Session) -> Dict[str, int]:
+        """Number of jobs per status"""
+        counts = dict(
+            db.query(IngestJob.status, func.count(IngestJob.id)).group_by(IngestJob.status).all()
+        )
+        return {job_status: counts.get(job_status, 0) for job_status in JOB_STATUSES}
+
+    def claim(self, db: Session) -> Optional[IngestJob]:
+        """
+        Claim the oldest due job: queued and past its retry delay, or
+        running with an expired lease.
+
+        Returns:
+            The claimed job (now 'running'), or None if no job is due
+        """
+        now = datetime.utcnow()
+        due = select(IngestJob.id).where(
+            IngestJob.status.in_((JOB_QUEUED, JOB_RUNNING)),
+            IngestJob.run_after <= now
+        ).order_by(IngestJob.run_after, IngestJob.id).limit(1).scalar_subquery()
+
+        # One statement, so two workers cannot claim the same job
+        job_id = db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == due)
+            .values(
+                status=JOB_RUNNING,
+                attempts=IngestJob.attempts + 1,
+                run_after=now + timedelta(seconds=self.lease),
+                updated_at=now
+            )
+            .returning(IngestJob.id)
+        ).scalar()
+        db.commit()
+        return db.get(IngestJob, job_id) if job_id is not None else None
+
+    def run_once(self, db: Session) -> bool:
+        """
+        Claim and process one due job.
+
+        Returns:
+            False if no job was due
+        """
+        job = self.claim(db)
+        if job is None:
+            return False
+
+        if job.attempts > self.max_attempts:
+            # Its worker kept dying (lease expired each time)
+            self._finish(db, job, JOB_FAILED, job.error or "Lease expired")
+            return True
+
+        try:
+            with self._holding_lease(db, job.id):
+                self._handler(db, job)
+        except JobFailed as e:
+            db.rollback()
+            self._finish(db, job, JOB_FAILED, str(e))
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ingest job {job.id} attempt {job.attempts} failed: {e}")
+            if job.attempts >= self.max_attempts:
+                self._finish(db, job, JOB_FAILED, str(e))
+            else:
+                job.status = JOB_QUEUED
+                job.error = str(e)
+                job.updated_at = datetime.utcnow()
+                job.run_after = job.updated_at + timedelta(
+                    seconds=self.retry_delay * 2 ** (job.attempts - 1)
+                )
+                db.commit()
+        else:
+            self._finish(db, job, JOB_DONE, None)
+        return True
+
+    @contextmanager
+    def _holding_lease(self, db: Session, job_id: int) -> Iterator[None]:
+        """Renew a claimed job's lease every third of it until the block exits"""
+        released = threading.Event()
+        renewer = threading.Thread(
+            target=self._renew_lease,
+            args=(sessionmaker(bind=db.get_bind()), job_id, released),
+            name=f"ingest-lease-{job_id}",
+            daemon=True
+        )
+        renewer.start()
+        try:
+            yield
+        finally:
+            released.set()
+            renewer.join()
+
+    def _renew_lease(self, sessions: sessionmaker, job_id: int, released: threading.Event) -> None:
+        """Lease renewal thread: push a running job's lease forward until released"""
+        while not released.wait(self.lease / 3):
+            try:
+                # Own session: the handler's session may be mid-transaction
+                with sessions() as db:
+                    db.execute(
+                        update(IngestJob)
+                        .where(IngestJob.id == job_id, IngestJob.status == JOB_RUNNING)
+                        .values(run_after=datetime.utcnow() + timedelta(seconds=self.lease))
+                    )
+                    db.commit()
+            except Exception:
+                logger.exception(f"Could not renew the lease of ingest job {job_id}")
+
+    def _finish(self, db: Session, job: IngestJob, job_status: str, error: Optional[str]) -> None:
+        """Mark a job done or failed; done jobs drop their payload"""
+        job.status = job_status
+        job.error = error
+        job.updated_at = datetime.utcnow()
+        if job_status == JOB_DONE:
+            job.payload = b""
+        db.commit()
+
+    def _work(self) -> None:
+        """Worker thread: process due jobs, wait for new ones when idle"""
+        while not self._stop.is_set():
+            try:
+                with SessionLocal() as db:
+                    while not self._stop.is_set() and self.run_once(db):
+                        pass
+            except Exception:
+                logger.exception("Ingest worker error")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+# Shared queue instance, started and stopped with the application
+ingest_queue = IngestQueue.from_env()
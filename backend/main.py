@@ -1,15 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from backend.api import hrv, users, energy_budget
-from backend.database import engine, Base
+from backend.compute_pool import compute_pool
+from backend.ingest_queue import ingest_queue
+from backend.database import async_engine, engine, settings
+from backend.storage import upgrade_schema, verify_storage
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or migrate the database tables (backend/migrations)
+upgrade_schema(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log the active SQLite settings, spawn the HRV compute workers before
+    # serving and stop them on shutdown; ingest workers resume any queued
+    # uploads left from a previous run
+    verify_storage(engine, settings)
+    compute_pool.start()
+    ingest_queue.start(hrv.process_ingest_job)
+    yield
+    ingest_queue.shutdown()
+    compute_pool.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="CFS-HRV Monitor API",
     description="Heart Rate Variability monitoring for ME/CFS management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -21,6 +40,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (e.g. history pages) for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(hrv.router, prefix="/api/hrv", tags=["hrv"])
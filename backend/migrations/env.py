@@ -0,0 +1,48 @@
+"""
+Alembic environment.
+
+Runs on the connection passed by backend.storage.upgrade_schema (API
+startup) or, from the alembic command line, on the application engine
+(DATABASE_URL and SQLite profile from backend.storage).
+"""
+from logging.config import fileConfig
+from alembic import context
+from backend.database import Base, engine
+import backend.models  # noqa: F401 (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    # Only from the command line (alembic.ini); the API keeps its logging
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations(connection) -> None:
+    # Batch mode: SQLite cannot ALTER most table properties in place, so
+    # such changes copy the table
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_offline() -> None:
+    """Emit the SQL instead of running it (alembic upgrade head --sql)"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif config.attributes.get("connection") is not None:
+    run_migrations(config.attributes["connection"])
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
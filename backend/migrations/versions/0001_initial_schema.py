@@ -0,0 +1,125 @@
+"""Initial schema
+
+The tables of the first release, as Base.metadata.create_all created them
+before migrations were introduced. Databases created that way by any
+later version are stamped with the revision their schema matches (see
+backend.storage.upgrade_schema).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 21:04:29.812086
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('sex', sa.String(), nullable=True),
+    sa.Column('bmi', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('baselines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('calculated_at', sa.DateTime(), nullable=True),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('days_count', sa.Integer(), nullable=True),
+    sa.Column('mean_ln_rmssd', sa.Float(), nullable=True),
+    sa.Column('sd_ln_rmssd', sa.Float(), nullable=True),
+    sa.Column('mean_rmssd', sa.Float(), nullable=True),
+    sa.Column('mean_hr', sa.Float(), nullable=True),
+    sa.Column('sd_hr', sa.Float(), nullable=True),
+    sa.Column('mean_total_power', sa.Float(), nullable=True),
+    sa.Column('mean_hf_power', sa.Float(), nullable=True),
+    sa.Column('mean_lf_power', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('baselines', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_baselines_id'), ['id'], unique=False)
+
+    op.create_table('energy_budgets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('hrv_score', sa.Float(), nullable=True),
+    sa.Column('rhr_score', sa.Float(), nullable=True),
+    sa.Column('sleep_score', sa.Float(), nullable=True),
+    sa.Column('stress_score', sa.Float(), nullable=True),
+    sa.Column('energy_budget', sa.Float(), nullable=False),
+    sa.Column('hrv_zscore', sa.Float(), nullable=True),
+    sa.Column('rhr_zscore', sa.Float(), nullable=True),
+    sa.Column('pem_risk_level', sa.String(), nullable=True),
+    sa.Column('consecutive_low_days', sa.Integer(), nullable=True),
+    sa.Column('activity_recommendation', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('energy_budgets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_energy_budgets_date'), ['date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_energy_budgets_id'), ['id'], unique=False)
+
+    op.create_table('hrv_readings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(), nullable=False),
+    sa.Column('mean_rri', sa.Float(), nullable=True),
+    sa.Column('mean_hr', sa.Float(), nullable=True),
+    sa.Column('sdnn', sa.Float(), nullable=True),
+    sa.Column('rmssd', sa.Float(), nullable=True),
+    sa.Column('pnn50', sa.Float(), nullable=True),
+    sa.Column('vlf_power', sa.Float(), nullable=True),
+    sa.Column('lf_power', sa.Float(), nullable=True),
+    sa.Column('hf_power', sa.Float(), nullable=True),
+    sa.Column('total_power', sa.Float(), nullable=True),
+    sa.Column('lf_hf_ratio', sa.Float(), nullable=True),
+    sa.Column('lf_nu', sa.Float(), nullable=True),
+    sa.Column('hf_nu', sa.Float(), nullable=True),
+    sa.Column('sleep_duration', sa.Float(), nullable=True),
+    sa.Column('sleep_quality', sa.Float(), nullable=True),
+    sa.Column('recording_duration', sa.Float(), nullable=True),
+    sa.Column('artifact_percentage', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_hrv_readings_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_hrv_readings_recorded_at'), ['recorded_at'], unique=False)
+
+def downgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hrv_readings_recorded_at'))
+        batch_op.drop_index(batch_op.f('ix_hrv_readings_id'))
+
+    op.drop_table('hrv_readings')
+    with op.batch_alter_table('energy_budgets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_energy_budgets_id'))
+        batch_op.drop_index(batch_op.f('ix_energy_budgets_date'))
+
+    op.drop_table('energy_budgets')
+    with op.batch_alter_table('baselines', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_baselines_id'))
+
+    op.drop_table('baselines')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
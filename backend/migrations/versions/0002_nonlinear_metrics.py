@@ -0,0 +1,27 @@
+"""Nonlinear metrics on readings
+
+Poincaré SD1/SD2, sample and approximate entropy and DFA exponents.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 21:04:30.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('sd1', 'sd2', 'sample_entropy', 'approximate_entropy', 'dfa_alpha1', 'dfa_alpha2')
+
+def upgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        for name in COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Float(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        for name in reversed(COLUMNS):
+            batch_op.drop_column(name)
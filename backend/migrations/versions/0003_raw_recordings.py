@@ -0,0 +1,34 @@
+"""Archive of raw RR intervals
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 21:04:31.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('hrv_raw_recordings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reading_id', sa.Integer(), nullable=False),
+    sa.Column('beat_count', sa.Integer(), nullable=False),
+    sa.Column('rr_data', sa.LargeBinary(), nullable=False),
+    sa.Column('algorithm_version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['reading_id'], ['hrv_readings.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('hrv_raw_recordings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_hrv_raw_recordings_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_hrv_raw_recordings_reading_id'), ['reading_id'], unique=True)
+
+def downgrade() -> None:
+    with op.batch_alter_table('hrv_raw_recordings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hrv_raw_recordings_reading_id'))
+        batch_op.drop_index(batch_op.f('ix_hrv_raw_recordings_id'))
+
+    op.drop_table('hrv_raw_recordings')
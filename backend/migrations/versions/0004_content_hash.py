@@ -0,0 +1,26 @@
+"""Content hash of readings for upload deduplication
+
+Existing readings keep a NULL hash (NULLs do not collide in the unique
+index), so only recordings uploaded from now on are deduplicated.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 21:04:32.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_hrv_readings_content_hash'), ['content_hash'], unique=True)
+
+def downgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hrv_readings_content_hash'))
+        batch_op.drop_column('content_hash')
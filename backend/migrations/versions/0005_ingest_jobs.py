@@ -0,0 +1,43 @@
+"""Durable ingest queue
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 21:04:33.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('ingest_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('reading_id', sa.Integer(), nullable=True),
+    sa.Column('energy_budget_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['energy_budget_id'], ['energy_budgets.id'], ),
+    sa.ForeignKeyConstraint(['reading_id'], ['hrv_readings.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ingest_jobs_id'), ['id'], unique=False)
+        batch_op.create_index('ix_ingest_jobs_status_run_after', ['status', 'run_after'], unique=False)
+
+def downgrade() -> None:
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_ingest_jobs_status_run_after')
+        batch_op.drop_index(batch_op.f('ix_ingest_jobs_id'))
+
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,27 @@
+"""Composite indexes for per-user history queries
+
+(user_id, recorded_at) and (user_id, date): history pages, baselines,
+trends and PEM risk all filter one user's rows by a time range.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 21:04:34.000000
+"""
+from alembic import op
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.create_index('ix_hrv_readings_user_id_recorded_at', ['user_id', 'recorded_at'], unique=False)
+    with op.batch_alter_table('energy_budgets', schema=None) as batch_op:
+        batch_op.create_index('ix_energy_budgets_user_id_date', ['user_id', 'date'], unique=False)
+
+def downgrade() -> None:
+    with op.batch_alter_table('energy_budgets', schema=None) as batch_op:
+        batch_op.drop_index('ix_energy_budgets_user_id_date')
+    with op.batch_alter_table('hrv_readings', schema=None) as batch_op:
+        batch_op.drop_index('ix_hrv_readings_user_id_recorded_at')
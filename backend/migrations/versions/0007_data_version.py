@@ -0,0 +1,44 @@
+"""Per-user data version for ETags
+
+users.data_version and the SQLite triggers that bump it on every write to
+a user's readings, baselines and energy budgets.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 21:04:35.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Per-user tables whose writes bump users.data_version
+DATA_VERSION_TABLES = ('hrv_readings', 'baselines', 'energy_budgets')
+DATA_VERSION_TRIGGERS = (
+    ('insert', 'INSERT', 'NEW.user_id'),
+    ('update', 'UPDATE', 'OLD.user_id, NEW.user_id'),
+    ('delete', 'DELETE', 'OLD.user_id'),
+)
+
+def upgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+    for table in DATA_VERSION_TABLES:
+        for name, operation, user_ids in DATA_VERSION_TRIGGERS:
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{name}_data_version "
+                f"AFTER {operation} ON {table} FOR EACH ROW BEGIN "
+                f"UPDATE users SET data_version = data_version + 1 WHERE id IN ({user_ids}); END"
+            )
+
+def downgrade() -> None:
+    for table in DATA_VERSION_TABLES:
+        for name, _, _ in DATA_VERSION_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{name}_data_version")
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,24 @@
+"""Partial index for active baseline lookups
+
+get_active_baseline and save_baseline filter baselines by user_id and
+is_active; only the active rows (one per user) are indexed.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 21:04:43.293776
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    with op.batch_alter_table('baselines', schema=None) as batch_op:
+        batch_op.create_index('ix_baselines_user_id_active', ['user_id'], unique=False, sqlite_where=sa.text('is_active = 1'))
+
+def downgrade() -> None:
+    with op.batch_alter_table('baselines', schema=None) as batch_op:
+        batch_op.drop_index('ix_baselines_user_id_active', sqlite_where=sa.text('is_active = 1'))
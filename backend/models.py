@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, Column, Integer, Float, String, DateTime, ForeignKey, Boolean, LargeBinary, Index, event, text
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+from typing import List
 from backend.database import Base
 
 class User(Base):
@@ -12,6 +13,10 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
+    # Bumped by triggers on every write to the user's readings, baselines
+    # and energy budgets; drives the ETags of the read endpoints
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+
     # User profile
     age = Column(Integer)
     sex = Column(String)
@@ -24,6 +29,10 @@ class User(Base):
 
 class HRVReading(Base):
     __tablename__ = "hrv_readings"
+    __table_args__ = (
+        # History pages: range scan on (user, recorded_at, id); id is the rowid every index ends with
+        Index("ix_hrv_readings_user_id_recorded_at", "user_id", "recorded_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -47,19 +56,62 @@ class HRVReading(Base):
     lf_nu = Column(Float)  # LF in normalized units
     hf_nu = Column(Float)  # HF in normalized units
 
+    # Nonlinear
+    sd1 = Column(Float)  # Poincaré SD1, short-term variability (ms)
+    sd2 = Column(Float)  # Poincaré SD2, long-term variability (ms)
+    # SampEn/ApEn (m=2, r=0.2×SDNN); beyond 5000 beats, the mean over
+    # equal windows with r from each window (nonlinear.entropies)
+    sample_entropy = Column(Float)
+    approximate_entropy = Column(Float)
+    dfa_alpha1 = Column(Float)  # Short-term DFA exponent (4-16 beats)
+    dfa_alpha2 = Column(Float)  # Long-term DFA exponent (16-64 beats)
+
     # Sleep context
     sleep_duration = Column(Float)  # Hours
     sleep_quality = Column(Float)   # Score 0-100
 
     # Data quality
     recording_duration = Column(Float)  # Minutes
-    artifact_percentage = Column(Float)  # Percentage of data removed
+    artifact_percentage = Column(Float)  # Percentage of beats corrected as artifacts
+
+    # SHA-256 of user, recorded_at and RR intervals; identical re-uploads hit this index
+    content_hash = Column(String(64), unique=True, index=True)
 
     # Relationships
     user = relationship("User", back_populates="hrv_readings")
+    raw_recording = relationship("RawRecording", back_populates="reading", uselist=False)
+
+class RawRecording(Base):
+    """
+    Archived RR intervals of a reading, kept so its metrics can be
+    recomputed when the algorithms change.
+
+    A side table, so queries on hrv_readings never read the blobs.
+    """
+    __tablename__ = "hrv_raw_recordings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reading_id = Column(Integer, ForeignKey("hrv_readings.id"), nullable=False, unique=True, index=True)
+    beat_count = Column(Integer, nullable=False)
+    rr_data = Column(LargeBinary, nullable=False)  # backend.rr_archive frames, about 1 byte per beat
+
+    # hrv_calculator.ALGORITHM_VERSION the reading's metrics were computed with
+    algorithm_version = Column(Integer, nullable=False)
+
+    # Relationships
+    reading = relationship("HRVReading", back_populates="raw_recording")
 
 class Baseline(Base):
     __tablename__ = "baselines"
+    __table_args__ = (
+        # Active baseline lookups; the predicate must match the query's
+        # "is_active = 1" term for SQLite to use the partial index
+        Index(
+            "ix_baselines_user_id_active",
+            "user_id",
+            sqlite_where=text("is_active = 1")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -92,6 +144,10 @@ class Baseline(Base):
 
 class EnergyBudget(Base):
     __tablename__ = "energy_budgets"
+    __table_args__ = (
+        # History pages: range scan on (user, date, id)
+        Index("ix_energy_budgets_user_id_date", "user_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -119,3 +175,55 @@ class EnergyBudget(Base):
 
     # Relationships
     user = relationship("User", back_populates="energy_budgets")
+
+class IngestJob(Base):
+    """Upload in the durable ingest queue (see backend.ingest_queue)"""
+    __tablename__ = "ingest_jobs"
+    __table_args__ = (
+        # Workers claim the oldest due job
+        Index("ix_ingest_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Request body as received, cleared once the job is done; loaded only when processed
+    content_type = Column(String, nullable=False)
+    payload = deferred(Column(LargeBinary, nullable=False))
+
+    # Retries
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # Next attempt, or lease expiry while running
+    error = Column(String)  # Last error
+
+    # Results
+    reading_id = Column(Integer, ForeignKey("hrv_readings.id"))
+    energy_budget_id = Column(Integer, ForeignKey("energy_budgets.id"))
+
+def _data_version_triggers(table_name: str) -> List[str]:
+    """
+    Triggers bumping users.data_version on every insert, update or delete
+    in a per-user table. Being in the database, they also cover bulk
+    statements and the reprocessing script, and commit with the write.
+    The syntax is SQLite's, the only database the app supports (see
+    backend.storage).
+    """
+    triggers = []
+    for operation, user_ids in (
+        ("INSERT", "NEW.user_id"),
+        ("UPDATE", "OLD.user_id, NEW.user_id"),
+        ("DELETE", "OLD.user_id"),
+    ):
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_{operation.lower()}_data_version "
+            f"AFTER {operation} ON {table_name} FOR EACH ROW BEGIN "
+            f"UPDATE users SET data_version = data_version + 1 WHERE id IN ({user_ids}); END"
+        )
+    return triggers
+
+for _table in (HRVReading.__table__, Baseline.__table__, EnergyBudget.__table__):
+    for _trigger in _data_version_triggers(_table.name):
+        event.listen(_table, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
@@ -0,0 +1,234 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+# DFA scale ranges in beats (Peng et al. 1995; Tarvainen et al. 2014)
+DFA_SHORT_SCALES = (4, 16)   # α1
+DFA_LONG_SCALES = (16, 64)   # α2
+
+# Longest stretch whose entropies are computed over all template pairs
+# (about 70 minutes at 70 bpm); longer recordings are averaged over windows
+ENTROPY_WINDOW_BEATS = 5000
+
+def poincare(rr: np.ndarray, successive_diffs: np.ndarray) -> Tuple[float, float]:
+    """
+    Poincaré plot descriptors.
+
+    SD1 = √(var(ΔRR) / 2) measures short-term (beat-to-beat) variability and
+    SD2 = √(2·SDNN² − SD1²) long-term variability.
+
+    Args:
+        rr: R-R intervals (ms)
+        successive_diffs: Successive differences to use for SD1 (ms), e.g.
+            only those between uncorrected beats
+
+    Returns:
+        Tuple of (sd1, sd2) in ms
+    """
+    sd1_squared = np.var(successive_diffs, ddof=1) / 2
+    sdnn_squared = np.var(rr, ddof=1)
+    sd1 = np.sqrt(sd1_squared)
+    sd2 = np.sqrt(max(2 * sdnn_squared - sd1_squared, 0.0))
+    return float(sd1), float(sd2)
+
+def entropies(
+    rr: np.ndarray,
+    m: int = 2,
+    r: Optional[float] = None,
+    window_beats: int = ENTROPY_WINDOW_BEATS
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Sample entropy and approximate entropy.
+
+    SampEn = −ln(A / B), where B and A count pairs of distinct templates of
+    length m and m + 1 within Chebyshev distance r (Richman & Moorman 2000).
+    ApEn = Φᵐ − Φᵐ⁺¹, where Φ is the mean log fraction of templates within r
+    of each template, self-matches included (Pincus 1991).
+
+    Up to window_beats beats, every template is compared with every other
+    template of the recording, exactly as defined. Exact counts need work
+    proportional to the number of matching pairs, which grows as N², so
+    longer recordings are split into ⌈N / window_beats⌉ equal windows. Each
+    window is analysed as a recording of its own (with r = 0.2 × its own SD
+    by default), and the values of the windows are averaged. The cost is
+    then bounded by O(N · window_beats).
+
+    Args:
+        rr: R-R intervals (ms)
+        m: Embedding dimension
+        r: Tolerance in ms (default: 0.2 × SDNN of the recording or window)
+        window_beats: Longest stretch analysed as a whole
+
+    Returns:
+        Tuple of (sample_entropy, approximate_entropy); each is None when it
+        cannot be computed (too few beats, zero tolerance or no matches)
+    """
+    n_windows = -(-len(rr) // window_beats)
+    if n_windows <= 1:
+        return _window_entropies(rr, m, r)
+
+    bounds = np.linspace(0, len(rr), n_windows + 1).astype(np.int64)
+    values = [_window_entropies(rr[start:stop], m, r) for start, stop in zip(bounds[:-1], bounds[1:])]
+    samples = [sample for sample, _ in values if sample is not None]
+    approximates = [approximate for _, approximate in values if approximate is not None]
+    return (
+        float(np.mean(samples)) if samples else None,
+        float(np.mean(approximates)) if approximates else None
+    )
+
+def dfa_fluctuations(rr: np.ndarray, scales: Sequence[int]) -> np.ndarray:
+    """
+    Detrended fluctuation F(n) for every scale n in one vectorized pass.
+
+    The integrated profile is cut into non-overlapping windows of n beats
+    and a least squares line is removed from each. Window sums of y, k·y and
+    y² are differences of three cumulative sums, so the residual of every
+    window at every scale is evaluated at once without fitting windows one
+    by one.
+
+    Args:
+        rr: R-R intervals (ms)
+        scales: Window sizes in beats
+
+    Returns:
+        Root mean square residual per scale (NaN where a scale has no window)
+    """
+    n_beats = len(rr)
+    scales = np.asarray(scales, dtype=np.int64)
+    n_windows = n_beats // scales
+    fluctuations = np.full(len(scales), np.nan)
+    has_window = n_windows > 0
+    if not np.any(has_window):
+        return fluctuations
+    scales, n_windows = scales[has_window], n_windows[has_window]
+
+    # Integrated profile; removing the end-to-end line keeps the cumulative
+    # sums small (it is linear, so every window's residual is unchanged)
+    profile = np.cumsum(rr - np.mean(rr))
+    profile -= np.linspace(profile[0], profile[-1], n_beats)
+    index = np.arange(n_beats, dtype=np.float64)
+    sum_y = np.concatenate(([0.0], np.cumsum(profile)))
+    sum_ky = np.concatenate(([0.0], np.cumsum(index * profile)))
+    sum_yy = np.concatenate(([0.0], np.cumsum(profile * profile)))
+
+    # All windows of all scales, flattened
+    offsets = np.concatenate(([0], np.cumsum(n_windows)[:-1]))
+    size = np.repeat(scales, n_windows)
+    start = (np.arange(int(n_windows.sum())) - np.repeat(offsets, n_windows)) * size
+    stop = start + size
+
+    window_y = sum_y[stop] - sum_y[start]
+    window_ky = sum_ky[stop] - sum_ky[start]
+    window_yy = sum_yy[stop] - sum_yy[start]
+
+    # Residual sum of squares of a straight-line fit: Syy − Sy²/n − Sty²/Stt
+    centre = start + (size - 1) / 2
+    covariance = window_ky - centre * window_y
+    index_variance = size * (size * size - 1) / 12
+    residual = window_yy - window_y ** 2 / size - covariance ** 2 / index_variance
+
+    fluctuations[has_window] = np.sqrt(
+        np.maximum(np.add.reduceat(residual, offsets), 0.0) / (n_windows * scales)
+    )
+    return fluctuations
+
+def dfa_alpha(rr: np.ndarray, scale_range: Tuple[int, int]) -> Optional[float]:
+    """
+    DFA scaling exponent: slope of log F(n) against log n.
+
+    Args:
+        rr: R-R intervals (ms)
+        scale_range: Smallest and largest window size in beats (inclusive)
+
+    Returns:
+        Scaling exponent, or None if fewer than 2 scales fit the recording
+    """
+    scales = np.arange(scale_range[0], scale_range[1] + 1)
+    fluctuations = dfa_fluctuations(rr, scales)
+    usable = np.isfinite(fluctuations) & (fluctuations > 0)
+    if np.count_nonzero(usable) < 2:
+        return None
+    slope, _ = np.polyfit(np.log(scales[usable]), np.log(fluctuations[usable]), 1)
+    return float(slope)
+
+def _window_entropies(
+    rr: np.ndarray,
+    m: int,
+    r: Optional[float]
+) -> Tuple[Optional[float], Optional[float]]:
+    """SampEn and ApEn of one recording or window, from exact match counts"""
+    if len(rr) < m + 1:
+        return None, None
+    if r is None:
+        r = 0.2 * np.std(rr, ddof=1)
+    if not r > 0:
+        return None, None
+
+    count_m, count_m_extendable, count_m1 = _template_matches(rr, m, float(r))
+
+    # SampEn: both lengths use the N − m templates that can be extended
+    b_count = np.sum(count_m_extendable) / 2
+    a_count = np.sum(count_m1) / 2
+    sample = float(-np.log(a_count / b_count)) if a_count > 0 and b_count > 0 else None
+
+    # ApEn: fraction of all templates within r, including self
+    phi_m = np.mean(np.log((count_m + 1) / len(count_m)))
+    phi_m1 = np.mean(np.log((count_m1 + 1) / len(count_m1)))
+    approximate = float(phi_m - phi_m1)
+
+    return sample, approximate
+
+def _template_matches(rr: np.ndarray, m: int, r: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count template matches of lengths m and m + 1 over the whole series.
+
+    Templates are sorted by their first point, so every template's
+    candidate matches are the next few templates in sorted order whose
+    first point is within r (found with searchsorted). Candidates are then
+    compared one sorted offset at a time with contiguous, vectorized
+    slices, and each pair is counted once for both of its templates.
+
+    Returns:
+        Tuple of (count_m, count_m_extendable, count_m1): per m-template the
+        matches with any m-template, per extendable m-template (the first
+        N − m) the matches with other extendable m-templates, and per
+        (m + 1)-template its matches. Self-matches are excluded.
+    """
+    n_templates = len(rr) - m + 1
+    order = np.argsort(rr[:n_templates], kind='stable')
+    points = np.ascontiguousarray(np.lib.stride_tricks.sliding_window_view(rr, m)[order].T)
+    # Only the last m-template has no next point
+    extendable = order < n_templates - 1
+    next_point = rr[np.minimum(order + m, len(rr) - 1)]
+
+    # Candidates are bounded just above first + r; the exact test is below
+    first = points[0]
+    bound = np.nextafter(first + r, np.inf)
+    n_candidates = np.searchsorted(first, bound, side='right') - np.arange(n_templates) - 1
+
+    count_m = np.zeros(n_templates)
+    count_m_extendable = np.zeros(n_templates)
+    count_m1 = np.zeros(n_templates)
+    for offset in range(1, int(n_candidates.max(initial=0)) + 1):
+        # Template p against template p + offset in sorted order
+        match = n_candidates[:-offset] >= offset
+        for k in range(m):
+            match &= np.abs(points[k, :-offset] - points[k, offset:]) <= r
+        both_extendable = match & extendable[:-offset] & extendable[offset:]
+        match_m1 = both_extendable & (np.abs(next_point[:-offset] - next_point[offset:]) <= r)
+
+        for counter, matched in (
+            (count_m, match),
+            (count_m_extendable, both_extendable),
+            (count_m1, match_m1)
+        ):
+            counter[:-offset] += matched
+            counter[offset:] += matched
+
+    # Back to template order
+    unsorted = np.empty_like(order)
+    unsorted[order] = np.arange(n_templates)
+    return (
+        count_m[unsorted],
+        count_m_extendable[unsorted][:-1],
+        count_m1[unsorted][:-1]
+    )
@@ -0,0 +1,48 @@
+"""
+HRVReading column values from an analyzed recording, shared by the API
+(new readings) and reprocess_hrv.py (recomputed readings).
+"""
+from typing import Any, Dict
+
+def reading_values(user_id: int, data, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Column values for an HRVReading.
+
+    The caller decides what to do with recordings that failed the quality
+    check (analysis['quality']['is_valid']); their metrics may be missing.
+
+    Args:
+        user_id: User ID
+        data: Anything with recorded_at, sleep_duration and sleep_quality
+            (RRPayload, RRIntervalsInput, RRStreamHeader or a stored reading)
+        analysis: analyze_recording() or HRVStream.finish() result
+    """
+    quality = analysis['quality']
+    metrics = analysis['metrics']
+
+    return dict(
+        user_id=user_id,
+        recorded_at=data.recorded_at,
+        mean_rri=metrics['mean_rri'],
+        mean_hr=metrics['mean_hr'],
+        sdnn=metrics['sdnn'],
+        rmssd=metrics['rmssd'],
+        pnn50=metrics['pnn50'],
+        vlf_power=metrics['vlf_power'],
+        lf_power=metrics['lf_power'],
+        hf_power=metrics['hf_power'],
+        total_power=metrics['total_power'],
+        lf_hf_ratio=metrics['lf_hf_ratio'],
+        lf_nu=metrics['lf_nu'],
+        hf_nu=metrics['hf_nu'],
+        sd1=metrics['sd1'],
+        sd2=metrics['sd2'],
+        sample_entropy=metrics['sample_entropy'],
+        approximate_entropy=metrics['approximate_entropy'],
+        dfa_alpha1=metrics['dfa_alpha1'],
+        dfa_alpha2=metrics['dfa_alpha2'],
+        sleep_duration=data.sleep_duration,
+        sleep_quality=data.sleep_quality,
+        recording_duration=quality['total_intervals'] / 60.0,  # Approximate minutes
+        artifact_percentage=quality['artifact_percentage']
+    )
@@ -0,0 +1,126 @@
+import numpy as np
+from functools import cached_property
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+class RRSeries:
+    """
+    RR interval series prepared once and shared by every HRV computation.
+
+    Holds the intervals as one contiguous, read-only float64 buffer and
+    lazily caches the arrays derived from it (successive differences, beat
+    onset times, the evenly resampled series), so the quality check, the
+    time domain and the frequency domain of a reading each reuse them
+    instead of converting and differencing the raw list again.
+    """
+
+    def __init__(
+        self,
+        rr_intervals: Union[Sequence[float], np.ndarray],
+        mask: Optional[np.ndarray] = None
+    ):
+        """
+        Prepare an RR interval series.
+
+        Args:
+            rr_intervals: R-R intervals in milliseconds. A contiguous float64
+                array is used without copying.
+            mask: Optional per-beat boolean mask, True for beats produced by
+                artifact correction. Successive differences touching a
+                masked beat are left out of RMSSD and pNN50.
+        """
+        values = np.ascontiguousarray(rr_intervals, dtype=np.float64).reshape(-1).view()
+        values.setflags(write=False)
+        self.values = values
+
+        if mask is not None:
+            mask = np.array(mask, dtype=bool).reshape(-1)
+            if len(mask) != len(values):
+                raise ValueError("Mask must have one entry per RR interval")
+            mask = self._frozen(mask)
+        self.mask = mask
+        self._resampled: Dict[float, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def coerce(cls, rr_intervals: Union['RRSeries', Sequence[float], np.ndarray]) -> 'RRSeries':
+        """Return rr_intervals unchanged if already an RRSeries, else wrap it"""
+        if isinstance(rr_intervals, cls):
+            return rr_intervals
+        return cls(rr_intervals)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if dtype is None or np.dtype(dtype) == self.values.dtype:
+            return self.values.copy() if copy else self.values
+        return self.values.astype(dtype)
+
+    @cached_property
+    def diffs(self) -> np.ndarray:
+        """Successive differences RRᵢ₊₁ - RRᵢ (ms)"""
+        return self._frozen(np.diff(self.values))
+
+    @cached_property
+    def abs_diffs(self) -> np.ndarray:
+        """Absolute successive differences (ms)"""
+        return self._frozen(np.abs(self.diffs))
+
+    @cached_property
+    def diff_mask(self) -> np.ndarray:
+        """True for each successive difference between two unmasked beats"""
+        usable = np.ones(max(len(self) - 1, 0), dtype=bool)
+        if self.mask is not None:
+            usable &= ~(self.mask[:-1] | self.mask[1:])
+        return self._frozen(usable)
+
+    @cached_property
+    def nn_diffs(self) -> np.ndarray:
+        """Successive differences between unmasked (normal) beats (ms)"""
+        if self.mask is None:
+            return self.diffs
+        return self._frozen(self.diffs[self.diff_mask])
+
+    @property
+    def artifact_percentage(self) -> float:
+        """Percentage of masked beats"""
+        if self.mask is None or len(self) == 0:
+            return 0.0
+        return float(np.count_nonzero(self.mask) / len(self) * 100)
+
+    @cached_property
+    def time_stamps(self) -> np.ndarray:
+        """Cumulative beat times in seconds, starting at 0 (length n + 1)"""
+        return self._frozen(np.insert(np.cumsum(self.values) / 1000.0, 0, 0))
+
+    @property
+    def onsets(self) -> np.ndarray:
+        """Time at which each interval starts (seconds)"""
+        return self.time_stamps[:-1]
+
+    @property
+    def total_time(self) -> float:
+        """Recording length (seconds)"""
+        return float(self.time_stamps[-1])
+
+    def resampled(self, fs: float = 4.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evenly resampled series for spectral analysis, cached per rate.
+
+        Args:
+            fs: Resampling rate in Hz (default: 4 Hz standard)
+
+        Returns:
+            Tuple of (even_time, rr_interpolated): sample times in seconds
+            and the linearly interpolated RR intervals (ms)
+        """
+        if fs not in self._resampled:
+            even_time = np.arange(0, self.total_time, 1.0 / fs)
+            rr_interpolated = np.interp(even_time, self.onsets, self.values)
+            self._resampled[fs] = (self._frozen(even_time), self._frozen(rr_interpolated))
+        return self._resampled[fs]
+
+    @staticmethod
+    def _frozen(array: np.ndarray) -> np.ndarray:
+        """Mark a cached array read-only so callers cannot corrupt the cache"""
+        array.setflags(write=False)
+        return array
@@ -0,0 +1,348 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+from scipy.fft import next_fast_len, rfft
+from typing import Dict, Optional, Tuple
+
+# Standard HRV frequency bands (Task Force 1996), in Hz
+FREQUENCY_BANDS = (
+    ('vlf', (0.0033, 0.04)),  # Very low frequency
+    ('lf', (0.04, 0.15)),     # Low frequency
+    ('hf', (0.15, 0.40)),     # High frequency
+)
+
+# Highest frequency of the Lomb-Scargle and AR grids (Hz)
+MAX_BAND_FREQ = 0.40
+
+# Narrowest band that always holds two points of the Welch grid (4 Hz
+# resampling, 256-sample segments: 1/64 Hz spacing); a band on fewer points
+# integrates to zero
+MIN_BAND_WIDTH = 2 * 4.0 / 256
+
+BandTable = namedtuple('BandTable', ['freqs', 'names', 'starts', 'stops'])
+
+@lru_cache(maxsize=256)
+def band_table(
+    first_freq: float,
+    freq_step: float,
+    n_freqs: int,
+    bands: Tuple[Tuple[str, Tuple[float, float]], ...] = FREQUENCY_BANDS
+) -> BandTable:
+    """
+    Cached band index table for an evenly spaced frequency grid.
+
+    Every spectral method here produces a grid of the form
+    first_freq + k × freq_step, so the grid and the index range of each band
+    on it are fully determined by (first_freq, freq_step, n_freqs, bands)
+    and are built once per configuration.
+
+    Args:
+        first_freq: Frequency of the first grid point (Hz)
+        freq_step: Grid spacing (Hz)
+        n_freqs: Number of grid points
+        bands: (name, (low, high)) pairs; each selects freqs in [low, high)
+
+    Returns:
+        BandTable with the read-only frequency grid, band names and the
+        start/stop index arrays of every band
+    """
+    freqs = first_freq + np.arange(n_freqs) * freq_step
+    freqs.setflags(write=False)
+    lows = np.array([low for _, (low, _) in bands])
+    highs = np.array([high for _, (_, high) in bands])
+    return BandTable(
+        freqs=freqs,
+        names=tuple(f'{name}_power' for name, _ in bands),
+        starts=np.searchsorted(freqs, lows, side='left'),
+        stops=np.searchsorted(freqs, highs, side='left')
+    )
+
+def welch_band_table(
+    fs: float,
+    nperseg: int,
+    bands: Tuple[Tuple[str, Tuple[float, float]], ...] = FREQUENCY_BANDS
+) -> BandTable:
+    """
+    Band table for the one-sided frequencies of signal.welch(fs, nperseg).
+
+    Args:
+        fs: Sampling rate (Hz)
+        nperseg: Welch segment length
+        bands: (name, (low, high)) pairs
+
+    Returns:
+        Cached BandTable from band_table()
+    """
+    return band_table(0.0, fs / nperseg, nperseg // 2 + 1, bands)
+
+def integrate_bands(table: BandTable, psd: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Integrate every band from one cumulative trapezoid over the PSD.
+
+    Matches np.trapezoid over each band's points, but walks the spectrum once
+    whatever the number of bands; each band is then a difference of two
+    lookups. psd may be 2-D (one spectrum per row, frequency on the last
+    axis), in which case every band power is an array.
+
+    Args:
+        table: Band table for the PSD's frequency grid
+        psd: Power spectral density (ms²/Hz) on table.freqs
+
+    Returns:
+        Dictionary with power per band (ms²), keyed '<band>_power'
+    """
+    psd = np.asarray(psd, dtype=np.float64)
+    steps = np.diff(table.freqs) * (psd[..., 1:] + psd[..., :-1]) / 2
+    cumulative = np.concatenate((np.zeros(psd.shape[:-1] + (1,)), np.cumsum(steps, axis=-1)), axis=-1)
+
+    # Bands on fewer than two points (including bands above the grid, whose
+    # start is past its end) have no area; index 0 keeps the lookup in range
+    has_area = table.stops - table.starts > 1
+    first = np.where(has_area, table.starts, 0)
+    last = np.where(has_area, table.stops - 1, 0)
+    powers = np.where(has_area, cumulative[..., last] - cumulative[..., first], 0.0)
+    return {name: powers[..., i] for i, name in enumerate(table.names)}
+
+def spectrum_grid(
+    max_freq: float = 0.40,
+    n_freqs: int = 256,
+    bands: Tuple[Tuple[str, Tuple[float, float]], ...] = FREQUENCY_BANDS
+) -> BandTable:
+    """
+    Evenly spaced grid (max_freq / n_freqs) × (1..n_freqs) used by the
+    Lomb-Scargle and AR estimators.
+
+    Args:
+        max_freq: Highest frequency on the grid (Hz)
+        n_freqs: Number of grid points
+        bands: (name, (low, high)) pairs
+
+    Returns:
+        Cached BandTable from band_table()
+    """
+    freq_step = max_freq / n_freqs
+    return band_table(freq_step, freq_step, n_freqs, bands)
+
+def lomb_scargle_grid(
+    duration: float,
+    max_freq: float = 0.40,
+    granularity: int = 256,
+    bands: Tuple[Tuple[str, Tuple[float, float]], ...] = FREQUENCY_BANDS
+) -> BandTable:
+    """
+    Cached Lomb-Scargle grid fine enough for a recording of a given length.
+
+    The periodogram resolves features 1/duration apart, so the spacing must
+    not be coarser than that or narrow peaks are sampled arbitrarily. The
+    point count is rounded up to a multiple of granularity so recordings of
+    similar length share one cached grid.
+
+    Args:
+        duration: Recording length in seconds
+        max_freq: Highest frequency on the grid (Hz)
+        granularity: Rounding step for the number of grid points
+        bands: (name, (low, high)) pairs
+
+    Returns:
+        BandTable from spectrum_grid()
+    """
+    n_freqs = int(np.ceil(max_freq * duration / granularity)) * granularity
+    return spectrum_grid(max_freq, max(n_freqs, granularity), bands)
+
+def lomb_scargle_psd(
+    times: np.ndarray,
+    values: np.ndarray,
+    freqs: np.ndarray,
+    oversampling: int = 16
+) -> np.ndarray:
+    """
+    One-sided Lomb-Scargle power spectral density of an unevenly sampled series.
+
+    Uses the fast algorithm of Press & Rybicki (1989): each sample is spread
+    ("extirpolated") onto a regular mesh with 4-point Lagrange weights, and
+    one FFT of the mesh yields the trigonometric sums for every frequency at
+    once, so the cost is O(N + M log M) instead of O(N × frequencies). The
+    grid must be evenly spaced from its first point (freqs = k × df).
+
+    Args:
+        times: Sample times in seconds (ascending)
+        values: Sample values (e.g. RR intervals in ms)
+        freqs: Evenly spaced frequency grid starting at df (Hz)
+        oversampling: Mesh points per grid frequency; controls accuracy
+
+    Returns:
+        PSD on freqs, scaled so that integrating it over frequency gives the
+        variance of values (ms²/Hz for RR intervals)
+    """
+    times = np.asarray(times, dtype=np.float64)
+    centred = np.asarray(values, dtype=np.float64) - np.mean(values)
+    n_samples = len(times)
+    duration = times[-1] - times[0]
+    n_freqs = len(freqs)
+    cycles = (times - times[0]) * freqs[0]  # Phase at the first grid frequency, in cycles
+
+    # Σ y·e^{iωt} at each grid frequency, and Σ e^{2iωt} at twice each one
+    data_sum = _mesh_sums(cycles, centred, n_freqs, oversampling)[1:n_freqs + 1]
+    double_sum = _mesh_sums(cycles, None, 2 * n_freqs, oversampling)[2:2 * n_freqs + 1:2]
+
+    # Time offset τ that makes the sine and cosine terms orthogonal
+    shifted = data_sum * np.exp(-0.5j * np.angle(double_sum))   # Σ y·e^{iω(t-τ)}
+    half_width = np.abs(double_sum) / 2
+    periodogram = 0.5 * (
+        shifted.real ** 2 / (n_samples / 2 + half_width)
+        + shifted.imag ** 2 / np.maximum(n_samples / 2 - half_width, 1e-12)
+    )
+
+    # Classical periodogram → one-sided density: PSD = 2·P / mean sampling rate
+    return 2 * periodogram * duration / n_samples
+
+def _mesh_sums(
+    cycles: np.ndarray,
+    values: Optional[np.ndarray],
+    max_index: int,
+    oversampling: int
+) -> np.ndarray:
+    """
+    Σ values·e^{-2πi·k·cycles} for k = 0..max_index via extirpolation and an FFT.
+
+    Each sample is spread onto a periodic mesh with 4-point Lagrange weights;
+    the real FFT of the mesh then approximates the sums for every k at once.
+    values=None sums unit weights.
+    """
+    mesh_size = next_fast_len(max(2 * max_index + 2, max_index * oversampling), real=True)
+    position = np.mod(cycles * mesh_size, mesh_size)
+
+    first = np.floor(position).astype(np.int64) - 1
+    u = position - first  # In [1, 2): offset from the first of the four nodes
+    weights = np.concatenate((
+        -(u - 1) * (u - 2) * (u - 3) / 6,
+        u * (u - 2) * (u - 3) / 2,
+        -u * (u - 1) * (u - 3) / 2,
+        u * (u - 1) * (u - 2) / 6,
+    ))
+    if values is not None:
+        weights *= np.tile(values, 4)
+    nodes = np.mod(np.concatenate((first, first + 1, first + 2, first + 3)), mesh_size)
+
+    mesh = np.bincount(nodes, weights=weights, minlength=mesh_size)
+    return rfft(mesh)
+
+@lru_cache(maxsize=32)
+def ar_basis(
+    fs: float,
+    max_order: int,
+    max_freq: float = 0.40,
+    n_freqs: int = 512
+) -> np.ndarray:
+    """
+    Precomputed e^{-2πi·f·k/fs} terms for autoregressive spectra.
+
+    Rows follow the spectrum_grid(max_freq, n_freqs) frequencies and
+    columns the lags k = 0..max_order, so evaluating a model's transfer
+    function on the whole grid is one matrix-vector product.
+
+    Args:
+        fs: Sampling rate of the modelled series (Hz)
+        max_order: Highest model order the basis must support
+        max_freq: Highest frequency on the grid (Hz)
+        n_freqs: Number of grid points
+
+    Returns:
+        Read-only complex array of shape (n_freqs, max_order + 1)
+    """
+    freqs = np.arange(1, n_freqs + 1) * (max_freq / n_freqs)
+    basis = np.exp(-2j * np.pi * np.outer(freqs / fs, np.arange(max_order + 1)))
+    basis.setflags(write=False)
+    return basis
+
+def burg_ar(
+    series: np.ndarray,
+    max_order: int,
+    criterion: Optional[str] = None
+) -> Tuple[np.ndarray, float]:
+    """
+    Fit an autoregressive model with Burg's method.
+
+    Burg's recursion yields the models of every order up to max_order in one
+    pass over the data (each step is a few vector operations on the forward
+    and backward prediction errors), so choosing the order by an information
+    criterion costs no extra fitting.
+
+    Args:
+        series: Evenly sampled series (mean is removed)
+        max_order: Fixed model order, or the highest order considered when a
+            criterion is given
+        criterion: None for a fixed order, 'aic' (Akaike) or 'fpe' (final
+            prediction error) to pick the order
+
+    Returns:
+        Tuple of (coefficients a with a[0] = 1, prediction error variance)
+    """
+    if criterion not in (None, 'aic', 'fpe'):
+        raise ValueError(f"Unknown AR order criterion: {criterion}")
+
+    x = np.asarray(series, dtype=np.float64)
+    x = x - np.mean(x)
+    n_samples = len(x)
+    if n_samples <= max_order:
+        raise ValueError("Series is too short for the requested AR order")
+
+    forward = x.copy()
+    backward = x.copy()
+    coefficients = np.array([1.0])
+    error = np.dot(x, x) / n_samples
+
+    best = (coefficients, error)
+    best_score = np.inf
+    for order in range(1, max_order + 1):
+        forward, backward = forward[1:], backward[:-1]
+        denominator = np.dot(forward, forward) + np.dot(backward, backward)
+        reflection = -2.0 * np.dot(forward, backward) / denominator if denominator > 0 else 0.0
+
+        forward, backward = forward + reflection * backward, backward + reflection * forward
+        extended = np.append(coefficients, 0.0)
+        coefficients = extended + reflection * extended[::-1]
+        error *= 1.0 - reflection ** 2
+
+        if criterion == 'aic':
+            score = n_samples * np.log(error) + 2 * order
+        elif criterion == 'fpe':
+            score = error * (n_samples + order + 1) / (n_samples - order - 1)
+        else:
+            score = -order  # Fixed order: keep the last model
+        if score < best_score:
+            best, best_score = (coefficients, error), score
+
+    return best
+
+def ar_psd(
+    series: np.ndarray,
+    fs: float,
+    order: int = 16,
+    criterion: Optional[str] = None,
+    bands: Tuple[Tuple[str, Tuple[float, float]], ...] = FREQUENCY_BANDS,
+    max_freq: float = 0.40,
+    n_freqs: int = 512
+) -> Tuple[BandTable, np.ndarray]:
+    """
+    One-sided AR (Burg) power spectral density on a cached frequency grid.
+
+    Args:
+        series: Evenly sampled series (e.g. RR intervals resampled to 4 Hz)
+        fs: Sampling rate of series (Hz)
+        order: Model order, or highest order considered with a criterion
+        criterion: Optional order selection criterion ('aic' or 'fpe')
+        bands: (name, (low, high)) pairs for the returned band table
+        max_freq: Highest frequency on the grid (Hz)
+        n_freqs: Number of grid points
+
+    Returns:
+        Tuple of (band table, psd); psd integrates over frequency to the
+        variance of series (ms²/Hz for RR intervals)
+    """
+    coefficients, error = burg_ar(series, order, criterion)
+    basis = ar_basis(fs, order, max_freq, n_freqs)
+
+    transfer = basis[:, :len(coefficients)] @ coefficients
+    psd = 2 * error / (fs * np.abs(transfer) ** 2)
+    return spectrum_grid(max_freq, n_freqs, bands), psd
@@ -0,0 +1,237 @@
+"""
+Database connection settings.
+
+The app runs on SQLite only: the data version triggers (ETags), the
+migrations and the query plan checks use SQLite syntax, and DATABASE_URL is
+rejected for other databases. Read from the environment (or .env):
+
+    DATABASE_URL=sqlite:///./cfs_hrv.db
+    DB_SQLITE_PROFILE=production      # or 'default' for SQLite's own settings
+    DB_POOL_SIZE=10
+    DB_MAX_OVERFLOW=10
+    DB_POOL_TIMEOUT=30
+
+The async engine for the async endpoints uses the same file through the
+aiosqlite driver and gets the same PRAGMAs and pool sizing.
+
+The production SQLite profile sets these PRAGMAs on every new connection:
+
+- journal_mode=WAL: readers no longer block behind a writer (and the
+  writer not behind readers); commits append to the write-ahead log
+  instead of rewriting pages through a rollback journal.
+- synchronous=NORMAL: in WAL mode fsync happens at checkpoints rather than
+  on every commit. A power loss can lose the last commits, but never
+  corrupts the database.
+- mmap_size: reads are served from a memory map instead of read() calls.
+- cache_size: page cache per connection.
+- busy_timeout: a writer waits for the lock instead of failing at once with
+  "database is locked" (the ingest workers and API requests write
+  concurrently).
+
+verify_storage() reads the PRAGMAs back; the API logs them at startup and
+warns if SQLite did not apply one (e.g. WAL is not available on network
+file systems).
+
+The schema is managed by Alembic (backend/migrations). upgrade_schema()
+brings the database to the latest revision at startup, first stamping a
+database created by create_all with the revision its schema matches; new
+revisions are written with `alembic revision --autogenerate -m "..."` after
+a change to backend/models.py. query_plan() shows how SQLite runs a statement, to check
+that a query uses the index meant for it (see tests/test_query_plans.py).
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Literal, Optional, Sequence, Tuple
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Connection, Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PATH = Path(__file__).parent / "migrations"
+
+# Table name -> (column names, indexes), and trigger names
+SchemaSignature = Tuple[Dict[str, Tuple[FrozenSet[str], FrozenSet[Tuple[str, Tuple[str, ...], bool]]]], FrozenSet[str]]
+
+# Driver of the async engine (backend.database.async_engine)
+ASYNC_DRIVER = "sqlite+aiosqlite"
+
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 1,  # NORMAL
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # Negative: KiB, i.e. 64 MiB
+        'busy_timeout': 5000,  # ms
+    },
+}
+
+class StorageSettings(BaseSettings):
+    """Database URL, SQLite profile and connection pool sizing"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./cfs_hrv.db"
+    db_sqlite_profile: Literal['default', 'production'] = 'production'
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+
+    @field_validator("database_url")
+    @classmethod
+    def _require_sqlite(cls, database_url: str) -> str:
+        if make_url(database_url).get_backend_name() != "sqlite":
+            raise ValueError("Only SQLite databases are supported (sqlite:///path/to/file.db)")
+        return database_url
+
+    @property
+    def is_memory(self) -> bool:
+        return make_url(self.database_url).database in (None, '', ':memory:')
+
+    @property
+    def async_database_url(self) -> str:
+        """database_url with the aiosqlite driver"""
+        return make_url(self.database_url).set(drivername=ASYNC_DRIVER).render_as_string(hide_password=False)
+
+    @property
+    def pragmas(self) -> Dict[str, Any]:
+        """PRAGMAs set on each connection (none for in-memory SQLite)"""
+        if self.is_memory:
+            return {}
+        return SQLITE_PROFILES[self.db_sqlite_profile]
+
+def engine_options(settings: StorageSettings) -> Dict[str, Any]:
+    """Keyword arguments for create_engine"""
+    # Sessions are used from the threadpool and the ingest workers
+    options: Dict[str, Any] = {'connect_args': {"check_same_thread": False}}
+    if not settings.is_memory:
+        # In-memory SQLite keeps one connection per thread instead of a pool
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        )
+    return options
+
+def apply_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Set the PRAGMAs on every new connection of an engine"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def verify_storage(engine: Engine, settings: StorageSettings) -> Dict[str, Any]:
+    """
+    Read back the PRAGMAs of the settings' profile on a pooled connection
+    and log them, with a warning for any SQLite did not apply.
+
+    Returns:
+        Dict of PRAGMA name to active value (empty for in-memory SQLite)
+    """
+    expected = settings.pragmas
+    active: Dict[str, Any] = {}
+    with engine.connect() as connection:
+        for name in expected:
+            active[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    mismatched = {
+        name: value for name, value in active.items()
+        if str(value).lower() != str(expected[name]).lower()
+    }
+    logger.info(f"Database {engine.url!r}, pool size {settings.db_pool_size}, pragmas {active}")
+    if mismatched:
+        logger.warning(f"SQLite did not apply pragmas (active values): {mismatched}")
+    return active
+
+def _migrations_config(connection: Connection) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.attributes["connection"] = connection
+    return config
+
+def schema_signature(connection: Connection) -> SchemaSignature:
+    """
+    Tables with their column names and indexes (name, columns, unique), and
+    the trigger names of a database, without alembic_version.
+    """
+    inspector = inspect(connection)
+    tables = {
+        table: (
+            frozenset(column['name'] for column in inspector.get_columns(table)),
+            frozenset(
+                (index['name'], tuple(index['column_names']), bool(index['unique']))
+                for index in inspector.get_indexes(table)
+            ),
+        )
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+    triggers = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'").scalars()
+    return tables, frozenset(triggers)
+
+def _matching_revision(connection: Connection) -> Optional[str]:
+    """
+    Latest revision whose schema is exactly the schema of a database created
+    without migrations, or None if no revision matches. Each revision is
+    built in turn in a scratch in-memory database to compare against.
+    """
+    signature = schema_signature(connection)
+    script = ScriptDirectory(str(MIGRATIONS_PATH))
+    revisions = [revision.revision for revision in reversed(list(script.walk_revisions()))]
+    scratch = create_engine("sqlite://")
+    matching = None
+    try:
+        with scratch.begin() as scratch_connection:
+            config = _migrations_config(scratch_connection)
+            for revision in revisions:
+                command.upgrade(config, revision)
+                if schema_signature(scratch_connection) == signature:
+                    matching = revision
+    finally:
+        scratch.dispose()
+    return matching
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Migrate the database to the latest revision.
+
+    A database created by Base.metadata.create_all (tables but no
+    alembic_version) is first stamped with the revision its schema matches,
+    so only the later revisions run on it.
+
+    Raises:
+        RuntimeError: Such a database matches no revision (it has to be
+            migrated and stamped by hand)
+    """
+    with engine.begin() as connection:
+        config = _migrations_config(connection)
+        tables = inspect(connection).get_table_names()
+        if tables and "alembic_version" not in tables:
+            revision = _matching_revision(connection)
+            if revision is None:
+                raise RuntimeError(
+                    "Database was created without migrations and its schema matches no revision; "
+                    "bring it to a revision's schema and run `alembic stamp <revision>`"
+                )
+            logger.info(f"Stamping database created without migrations as revision {revision}")
+            command.stamp(config, revision)
+        command.upgrade(config, "head")
+
+def query_plan(connection: Connection, statement: str, parameters: Sequence[Any] = ()) -> List[str]:
+    """
+    SQLite's plan for a statement (EXPLAIN QUERY PLAN), one line per step,
+    e.g. "SEARCH hrv_readings USING INDEX ix_hrv_readings_user_id_recorded_at
+    (user_id=? AND recorded_at>? AND recorded_at<?)"
+    """
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+    return [row[-1] for row in rows]
@@ -0,0 +1,181 @@
+"""
+Benchmarks for the HRV calculation, upload decoding and response
+serialization paths.
+
+Runs offline against backend.hrv_calculator, backend.api.rr_payload and
+an in-memory database (no server needed):
+    python benchmark_hrv.py
+"""
+import json
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from backend.database import Base
+from backend.models import HRVReading, User
+from backend.hrv_calculator import HRVCalculator
+from backend.api import projection, rr_payload
+from backend.api.hrv import HRVReadingResponse
+
+def generate_rr_intervals(num_intervals, mean_hr=65, rmssd=45, seed=0):
+    """
+    Generate synthetic RR intervals with respiratory and Mayer-wave components.
+
+    Args:
+        num_intervals: Number of intervals to generate
+        mean_hr: Mean heart rate (bpm)
+        rmssd: Approximate beat-to-beat variability (ms)
+        seed: Random seed
+
+    Returns:
+        NumPy array of RR intervals in milliseconds
+    """
+    rng = np.random.default_rng(seed)
+    mean_rri = 60000 / mean_hr
+    beat_times = np.arange(num_intervals) * mean_rri / 1000.0
+
+    rr = (
+        mean_rri
+        + 25 * np.sin(2 * np.pi * 0.25 * beat_times)   # Respiratory (HF)
+        + 20 * np.sin(2 * np.pi * 0.10 * beat_times)   # Mayer waves (LF)
+        + rng.normal(0, rmssd / np.sqrt(2), num_intervals)
+    )
+    return np.clip(rr, 300, 2000)
+
+def time_call(func, repeats=5):
+    """Best wall-clock time of several calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def benchmark_frequency_methods(sizes=(300, 5000, 50000)):
+    """Compare Welch (4 Hz resampling) with Lomb-Scargle on the raw beat times"""
+    print("\n=== Frequency domain: Welch vs Lomb-Scargle ===")
+    calc = HRVCalculator()
+
+    print(f"{'intervals':>10} {'welch ms':>10} {'lomb ms':>10} {'speedup':>8}   LF/HF welch / lomb")
+    for size in sizes:
+        rr = generate_rr_intervals(size)
+        welch_ms = time_call(lambda: calc.calculate_frequency_domain(rr, method='welch'))
+        lomb_ms = time_call(lambda: calc.calculate_frequency_domain(rr, method='lomb'))
+
+        welch = calc.calculate_frequency_domain(rr, method='welch')
+        lomb = calc.calculate_frequency_domain(rr, method='lomb')
+        print(
+            f"{size:>10} {welch_ms:>10.2f} {lomb_ms:>10.2f} {welch_ms / lomb_ms:>7.1f}x"
+            f"   {welch['lf_hf_ratio']:.2f} / {lomb['lf_hf_ratio']:.2f}"
+        )
+
+def benchmark_payload_decoding(sizes=(1000, 10000, 100000)):
+    """
+    Request body decoding for the readings endpoint.
+
+    'pydantic' is json.loads plus RRIntervalsInput validation and conversion
+    to an array (the path FastAPI takes for a model body parameter),
+    'fast' the vectorized JSON path and 'binary' the packed format.
+    """
+    print("\n=== Upload decoding: pydantic vs fast JSON vs binary ===")
+    recorded_at = datetime(2024, 1, 1, 23, 0)
+
+    def decode_pydantic(body):
+        data = rr_payload.RRIntervalsInput.model_validate(json.loads(body))
+        return np.asarray(data.rr_intervals, dtype=np.float64)
+
+    print(
+        f"{'intervals':>10} {'json KB':>8} {'pydantic ms':>12} {'fast ms':>8} {'speedup':>8}"
+        f" {'binary KB':>10} {'binary ms':>10}"
+    )
+    for size in sizes:
+        rr = np.round(generate_rr_intervals(size), 1)
+        body = json.dumps({
+            'rr_intervals': rr.tolist(),
+            'recorded_at': recorded_at.isoformat(),
+            'sleep_duration': 7.5
+        }).encode()
+        binary = rr_payload.encode_binary_payload(rr, recorded_at, sleep_duration=7.5, sample_type=1)
+
+        fast = rr_payload.decode_json_payload(body).rr_intervals
+        assert np.array_equal(fast, decode_pydantic(body)), "fast path disagrees with pydantic"
+
+        pydantic_ms = time_call(lambda: decode_pydantic(body))
+        fast_ms = time_call(lambda: rr_payload.decode_json_payload(body))
+        binary_ms = time_call(lambda: rr_payload.decode_binary_payload(binary))
+        print(
+            f"{size:>10} {len(body) / 1024:>8.1f} {pydantic_ms:>12.2f} {fast_ms:>8.2f}"
+            f" {pydantic_ms / fast_ms:>7.1f}x {len(binary) / 1024:>10.1f} {binary_ms:>10.3f}"
+        )
+
+def benchmark_list_serialization(sizes=(100, 1000)):
+    """
+    Response of the readings list endpoint.
+
+    'pydantic' is what a response_model does with ORM rows: load the
+    objects, validate every row from attributes, then encode
+    (FastAPI's serialize_response and JSONResponse). 'tuples' selects the
+    response model's columns and encodes them as they are
+    (backend.api.projection).
+    """
+    print(f"\n=== List responses: pydantic vs column tuples ({'orjson' if projection.orjson else 'json'}) ===")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1, 7, 0)
+    metrics = [name for name in HRVReadingResponse.model_fields if name not in ('id', 'user_id', 'recorded_at')]
+    with Session(engine) as db:
+        db.add(User(id=1, email='bench@example.com', hashed_password='x'))
+        db.execute(insert(HRVReading), [
+            dict({name: float(value) for name, value in zip(metrics, rng.uniform(1, 100, len(metrics)))},
+                 user_id=1, recorded_at=start + timedelta(days=day))
+            for day in range(max(sizes))
+        ])
+        db.commit()
+
+    adapter = TypeAdapter(List[HRVReadingResponse])
+    names = list(HRVReadingResponse.model_fields)
+
+    def serialize_pydantic(db, size):
+        db.expunge_all()
+        rows = db.query(HRVReading).order_by(HRVReading.recorded_at.desc()).limit(size).all()
+        validated = adapter.validate_python(rows, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode='json'), separators=(",", ":")).encode()
+
+    def serialize_tuples(db, size):
+        rows = db.query(*[getattr(HRVReading, name) for name in names]).order_by(
+            HRVReading.recorded_at.desc()
+        ).limit(size).all()
+        return projection.projected_response(rows, names, "rows").body
+
+    print(f"{'rows':>10} {'pydantic ms':>12} {'tuples ms':>10} {'speedup':>8} {'KB':>8}")
+    with Session(engine) as db:
+        for size in sizes:
+            before = serialize_pydantic(db, size)
+            after = serialize_tuples(db, size)
+            assert json.loads(before) == json.loads(after), "column tuples disagree with pydantic"
+
+            pydantic_ms = time_call(lambda: serialize_pydantic(db, size))
+            tuples_ms = time_call(lambda: serialize_tuples(db, size))
+            print(
+                f"{size:>10} {pydantic_ms:>12.2f} {tuples_ms:>10.2f}"
+                f" {pydantic_ms / tuples_ms:>7.1f}x {len(after) / 1024:>8.1f}"
+            )
+
+def run_all_benchmarks():
+    """Run every benchmark"""
+    print("=" * 60)
+    print("CFS-HRV Monitor Benchmarks")
+    print("=" * 60)
+
+    benchmark_frequency_methods()
+    benchmark_payload_decoding()
+    benchmark_list_serialization()
+
+    print("\n" + "=" * 60)
+
+if __name__ == "__main__":
+    run_all_benchmarks()
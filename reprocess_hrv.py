@@ -0,0 +1,299 @@
+"""
+Recompute stored HRV readings, baselines and energy budgets after a change
+to the HRV algorithms.
+
+Works on the database directly (no server needed):
+    python reprocess_hrv.py                    # All users
+    python reprocess_hrv.py --user 1 --user 2  # Selected users
+    python reprocess_hrv.py --stale-only       # Readings from an older ALGORITHM_VERSION
+
+1. Readings: archived RR intervals (hrv_raw_recordings) are read in
+   chunks ordered by reading id (keyset pagination, so every chunk is an
+   index range scan), analyzed in parallel worker processes, and written
+   back with one bulk UPDATE per chunk. Readings without an archive are
+   skipped.
+2. Baselines: every stored baseline is recalculated for its period.
+3. Energy budgets: every stored score is recalculated, oldest first and
+   in chunks, from the reading recorded at its date and the latest
+   baseline ending on or before it. A score's PEM risk looks back only at
+   earlier scores, so running the script again changes nothing.
+
+Progress is checkpointed after every chunk and every user, so an
+interrupted run continues where it stopped when started again with the
+same arguments (--restart starts over).
+"""
+import os
+import json
+import bisect
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend.models import Baseline, EnergyBudget, HRVReading, RawRecording
+from backend.compute_pool import analyze_recording
+from backend.hrv_calculator import ALGORITHM_VERSION
+from backend.readings import reading_values
+from backend.rr_archive import decode_rr
+from backend.api.energy_budget import baseline_tracker, energy_budget_calc
+
+PHASES = ("readings", "baselines", "energy_budgets")
+
+def analyze_archived(rr_data: bytes) -> Dict[str, Any]:
+    """Worker: decode an archived recording and analyze it (errors are returned, not raised)"""
+    try:
+        return analyze_recording(decode_rr(rr_data))
+    except Exception as e:
+        return {'error': str(e)}
+
+class Progress:
+    """Rows done per phase and rows per second, printed as the run goes"""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.rows = 0
+        self.skipped = 0
+        self.start = time.perf_counter()
+
+    def add(self, rows: int, skipped: int = 0) -> None:
+        self.rows += rows
+        self.skipped += skipped
+        print(f"  {self.phase}: {self.rows} recomputed, {self.skipped} skipped ({self.rate():.1f} rows/s)")
+
+    def rate(self) -> float:
+        return self.rows / max(time.perf_counter() - self.start, 1e-9)
+
+class Checkpoint:
+    """Resumable position of a run, stored as a JSON file"""
+
+    def __init__(self, path: str, run: Dict[str, Any], restart: bool = False):
+        self.path = path
+        self.state = {'run': run, 'phase': PHASES[0], 'last_id': 0}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('run') == run:
+                self.state = saved
+                print(f"Resuming {saved['phase']} after id {saved['last_id']}")
+            else:
+                print("Checkpoint is from a run with different arguments, starting over")
+
+    def save(self, phase: str, last_id: int) -> None:
+        self.state.update(phase=phase, last_id=last_id)
+        # Written then renamed, so an interruption never leaves half a file
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def position(self, phase: str) -> Optional[int]:
+        """Last id done in a phase: 0 if not started, None if already complete"""
+        current = PHASES.index(self.state['phase'])
+        if PHASES.index(phase) < current:
+            return None
+        return self.state['last_id'] if PHASES.index(phase) == current else 0
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def reprocess_readings(
+    db: Session,
+    executor: ProcessPoolExecutor,
+    checkpoint: Checkpoint,
+    user_ids: Optional[List[int]],
+    stale_only: bool,
+    chunk_size: int,
+    workers: int
+) -> Progress:
+    """Recompute reading metrics from the archived RR intervals, chunk by chunk"""
+    progress = Progress("readings")
+    last_id = checkpoint.position("readings")
+    if last_id is None:
+        return progress
+
+    while True:
+        query = select(
+            HRVReading.id,
+            HRVReading.user_id,
+            HRVReading.recorded_at,
+            HRVReading.sleep_duration,
+            HRVReading.sleep_quality,
+            RawRecording.id.label('raw_id'),
+            RawRecording.rr_data
+        ).join(
+            RawRecording, RawRecording.reading_id == HRVReading.id
+        ).where(
+            HRVReading.id > last_id
+        ).order_by(HRVReading.id).limit(chunk_size)
+        if user_ids:
+            query = query.where(HRVReading.user_id.in_(user_ids))
+        if stale_only:
+            query = query.where(RawRecording.algorithm_version < ALGORITHM_VERSION)
+
+        rows = db.execute(query).all()
+        if not rows:
+            break
+
+        analyses = executor.map(
+            analyze_archived,
+            [row.rr_data for row in rows],
+            chunksize=max(len(rows) // (4 * workers), 1)
+        )
+
+        reading_updates = []
+        archive_updates = []
+        skipped = 0
+        for row, analysis in zip(rows, analyses):
+            if 'error' in analysis or not analysis['quality']['is_valid']:
+                # Left as stored; the current algorithms reject this recording
+                skipped += 1
+                continue
+            values = reading_values(row.user_id, row, analysis)
+            reading_updates.append(dict(values, id=row.id))
+            archive_updates.append({'id': row.raw_id, 'algorithm_version': ALGORITHM_VERSION})
+
+        # Bulk UPDATE by primary key (executemany)
+        if reading_updates:
+            db.execute(update(HRVReading), reading_updates)
+            db.execute(update(RawRecording), archive_updates)
+        db.commit()
+
+        last_id = rows[-1].id
+        checkpoint.save("readings", last_id)
+        progress.add(len(reading_updates), skipped)
+
+    checkpoint.save("baselines", 0)
+    return progress
+
+def reprocess_baselines(db: Session, checkpoint: Checkpoint, user_ids: List[int]) -> Progress:
+    """Recalculate every stored baseline for its period, one user at a time"""
+    progress = Progress("baselines")
+    last_user = checkpoint.position("baselines")
+    if last_user is None:
+        return progress
+
+    for user_id in (user_id for user_id in user_ids if user_id > last_user):
+        baselines = db.query(Baseline).filter(Baseline.user_id == user_id).all()
+        recomputed = 0
+        for baseline in baselines:
+            baseline_data = baseline_tracker.calculate_baseline(db, user_id, end_date=baseline.end_date)
+            if baseline_data is None:
+                continue
+            baseline_data.pop('readings_count')
+            for column, value in baseline_data.items():
+                setattr(baseline, column, value)
+            recomputed += 1
+        db.commit()
+
+        checkpoint.save("baselines", user_id)
+        progress.add(recomputed, len(baselines) - recomputed)
+
+    checkpoint.save("energy_budgets", 0)
+    return progress
+
+def reprocess_energy_budgets(
+    db: Session,
+    checkpoint: Checkpoint,
+    user_ids: List[int],
+    chunk_size: int
+) -> Progress:
+    """Recalculate every stored energy budget, one user at a time in chunks of chunk_size"""
+    progress = Progress("energy_budgets")
+    last_user = checkpoint.position("energy_budgets")
+    if last_user is None:
+        return progress
+
+    for user_id in (user_id for user_id in user_ids if user_id > last_user):
+        baselines = db.query(Baseline).filter(
+            Baseline.user_id == user_id
+        ).order_by(Baseline.end_date).all()
+        baseline_ends = [baseline.end_date for baseline in baselines]
+        active_baseline = baseline_tracker.get_active_baseline(db, user_id)
+
+        # Oldest first, keyset paginated on (date, id): PEM risk looks back
+        # at the (already updated) previous days
+        last_key = None
+        recomputed = skipped = 0
+        while True:
+            query = db.query(EnergyBudget).filter(EnergyBudget.user_id == user_id)
+            if last_key is not None:
+                query = query.filter(tuple_(EnergyBudget.date, EnergyBudget.id) > tuple_(*last_key))
+            budgets = query.order_by(EnergyBudget.date, EnergyBudget.id).limit(chunk_size).all()
+            if not budgets:
+                break
+
+            readings = {
+                reading.recorded_at: reading
+                for reading in db.query(HRVReading).filter(
+                    HRVReading.user_id == user_id,
+                    HRVReading.recorded_at.in_({budget.date for budget in budgets})
+                )
+            }
+            for budget in budgets:
+                reading = readings.get(budget.date)
+                # Latest baseline ending on or before the budget's date
+                earlier = bisect.bisect_right(baseline_ends, budget.date)
+                baseline = baselines[earlier - 1] if earlier else active_baseline
+                if reading is None or baseline is None:
+                    skipped += 1
+                    continue
+                readiness_data = energy_budget_calc.calculate_readiness(db, user_id, reading, baseline)
+                for column, value in readiness_data.items():
+                    setattr(budget, column, value)
+                recomputed += 1
+
+            last_key = (budgets[-1].date, budgets[-1].id)
+            # One flush per chunk, batched into executemany UPDATEs
+            db.commit()
+
+        checkpoint.save("energy_budgets", user_id)
+        progress.add(recomputed, skipped)
+
+    return progress
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute stored HRV readings, baselines and energy budgets")
+    parser.add_argument("--user", type=int, action="append", dest="users", help="User ID (repeatable; default: all users)")
+    parser.add_argument("--stale-only", action="store_true", help="Only readings computed with an older ALGORITHM_VERSION")
+    parser.add_argument("--skip-budgets", action="store_true", help="Recompute readings only")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Readings or energy budgets per chunk (default: 500)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default=".reprocess_checkpoint.json", help="Checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    run = {
+        'users': sorted(args.users) if args.users else None,
+        'stale_only': args.stale_only,
+        'skip_budgets': args.skip_budgets,
+        'algorithm_version': ALGORITHM_VERSION
+    }
+    checkpoint = Checkpoint(args.checkpoint, run, restart=args.restart)
+    print(f"Reprocessing with algorithm version {ALGORITHM_VERSION} on {args.workers} workers")
+
+    start = time.perf_counter()
+    with SessionLocal() as db, ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        progress = [reprocess_readings(
+            db, executor, checkpoint, run['users'], args.stale_only, args.chunk_size, args.workers
+        )]
+        if not args.skip_budgets:
+            user_ids = run['users'] or sorted(
+                {user_id for (user_id,) in db.query(Baseline.user_id).distinct()}
+            )
+            progress.append(reprocess_baselines(db, checkpoint, user_ids))
+            progress.append(reprocess_energy_budgets(db, checkpoint, user_ids, args.chunk_size))
+
+    checkpoint.clear()
+    elapsed = time.perf_counter() - start
+    print(f"\nDone in {elapsed:.1f}s")
+    for phase in progress:
+        print(f"  {phase.phase}: {phase.rows} recomputed, {phase.skipped} skipped ({phase.rate():.1f} rows/s)")
+
+if __name__ == "__main__":
+    main()
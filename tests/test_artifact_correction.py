@@ -0,0 +1,91 @@
+"""
+Beat classification and correction (backend/artifact_correction.py) on a
+clean recording with synthetic missed, extra, ectopic and long beats.
+"""
+import numpy as np
+import pytest
+from backend.artifact_correction import (
+    ArtifactCorrector, BEAT_ECTOPIC, BEAT_EXTRA, BEAT_LONG, BEAT_MISSED, BEAT_NORMAL, BEAT_SHORT
+)
+
+corrector = ArtifactCorrector()
+
+# Smooth enough that no beat is flagged before artifacts are added
+CLEAN = 900.0 + 20.0 * np.sin(np.arange(600) / 3.0)
+
+def flagged(rr: np.ndarray) -> dict:
+    """Beat index -> BEAT_* code for every beat that is not normal"""
+    beat_types = corrector.classify(rr)
+    return {int(index): int(beat_types[index]) for index in np.flatnonzero(beat_types != BEAT_NORMAL)}
+
+def test_clean_recording_has_no_artifacts():
+    assert flagged(CLEAN) == {}
+    corrected = corrector.correct(CLEAN)
+    assert np.array_equal(corrected.values, CLEAN)
+    assert not np.any(corrected.mask)
+
+def test_missed_beat_is_split():
+    # Dropped R peak: beats 100 and 101 merged into one interval
+    rr = np.delete(CLEAN, 101)
+    rr[100] = CLEAN[100] + CLEAN[101]
+    assert flagged(rr) == {100: BEAT_MISSED}
+
+    corrected = corrector.correct(rr)
+    assert len(corrected.values) == len(CLEAN)
+    assert np.flatnonzero(corrected.mask).tolist() == [100, 101]
+    assert corrected.values[100:102] == pytest.approx([rr[100] / 2] * 2)
+
+def test_extra_beat_is_merged():
+    # Spurious R peak splitting beat 300 in two
+    rr = np.concatenate([CLEAN[:300], [0.4 * CLEAN[300], 0.6 * CLEAN[300]], CLEAN[301:]])
+    assert flagged(rr) == {300: BEAT_EXTRA, 301: BEAT_SHORT}
+
+    corrected = corrector.correct(rr)
+    assert corrected.values == pytest.approx(CLEAN)
+    assert np.flatnonzero(corrected.mask).tolist() == [300]
+
+def test_run_of_extra_beats_pairs_up():
+    # Beats 200 and 201 each split in two: the run 200-202 merges 200+201 and 202+203
+    halves = [CLEAN[200] / 2, CLEAN[200] / 2, CLEAN[201] / 2, CLEAN[201] / 2]
+    rr = np.concatenate([CLEAN[:200], halves, CLEAN[202:]])
+    assert flagged(rr) == {200: BEAT_EXTRA, 201: BEAT_EXTRA, 202: BEAT_EXTRA, 203: BEAT_SHORT}
+
+    corrected = corrector.correct(rr)
+    assert corrected.values == pytest.approx(CLEAN)
+    assert np.flatnonzero(corrected.mask).tolist() == [200, 201]
+
+def test_odd_run_of_extra_beats_absorbs_the_next_beat():
+    beat_types = np.full(8, BEAT_NORMAL, dtype=np.int8)
+    beat_types[2:5] = BEAT_EXTRA
+    assert ArtifactCorrector.corrected_counts(beat_types).tolist() == [1, 1, 1, 0, 1, 0, 1, 1]
+
+@pytest.mark.parametrize("shift", [100.0, 200.0, 300.0])
+def test_ectopic_beat_is_interpolated(shift):
+    # Premature beat followed by a compensatory pause
+    rr = CLEAN.copy()
+    rr[450] -= shift
+    rr[451] += shift
+    assert flagged(rr) == {450: BEAT_SHORT, 451: BEAT_ECTOPIC}
+
+    corrected = corrector.correct(rr)
+    assert len(corrected.values) == len(CLEAN)
+    assert np.flatnonzero(corrected.mask).tolist() == [450, 451]
+    # Linear interpolation between beats 449 and 452
+    assert corrected.values[450:452] == pytest.approx(np.interp([450, 451], [449, 452], CLEAN[[449, 452]]))
+
+@pytest.mark.parametrize("value", [1500.0, 2500.0])
+def test_long_beat_is_interpolated(value):
+    rr = CLEAN.copy()
+    rr[50] = value
+    assert flagged(rr) == {50: BEAT_LONG}
+    corrected = corrector.correct(rr)
+    assert corrected.values[50] == pytest.approx((CLEAN[49] + CLEAN[51]) / 2)
+
+def test_summarize_counts_artifact_types():
+    rr = np.delete(CLEAN, 101)
+    rr[100] = CLEAN[100] + CLEAN[101]
+    rr[450] -= 200.0
+    rr[451] += 200.0
+    assert ArtifactCorrector.summarize(corrector.classify(rr)) == {
+        'ectopic': 1, 'long': 0, 'short': 1, 'missed': 1, 'extra': 0
+    }
@@ -0,0 +1,139 @@
+"""
+Bulk uploads (POST /{user_id}/readings:bulk): per-recording results, chunks
+analyzed through calculate_batch, duplicates answered from the stored
+reading, and 409 when a concurrent upload stored a recording first.
+"""
+from typing import Iterator, List
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.compute_pool import analyze_recording
+from backend.database import get_db
+from backend.hrv_calculator import HRVCalculator
+from backend.models import HRVReading, RawRecording, User
+from backend.rr_archive import decode_rr
+from backend.storage import upgrade_schema
+from backend.api import hrv
+
+def night(seed: int, n_beats: int = 600) -> List[float]:
+    rng = np.random.default_rng(seed)
+    return np.round(900.0 + 40.0 * np.sin(np.arange(n_beats) / 6.0) + rng.normal(0.0, 15.0, n_beats)).tolist()
+
+def recording(day: int, rr_intervals: List[float]) -> dict:
+    return {"rr_intervals": rr_intervals, "recorded_at": f"2024-01-{day:02d}T07:00:00", "sleep_duration": 7.0}
+
+@pytest.fixture
+def sessions(tmp_path) -> Iterator[sessionmaker]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    upgrade_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="bulk@example.com", hashed_password="x"))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+@pytest.fixture
+def client(sessions) -> Iterator[TestClient]:
+    app = FastAPI()
+    app.include_router(hrv.router, prefix="/api/hrv")
+
+    def get_test_db():
+        with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def batch_sizes(monkeypatch) -> List[int]:
+    """Number of recordings per calculate_batch call"""
+    calls: List[int] = []
+    calculate_batch = HRVCalculator.calculate_batch
+
+    def counting_batch(self, recordings, lengths=None):
+        calls.append(len(recordings))
+        return calculate_batch(self, recordings, lengths)
+
+    monkeypatch.setattr(HRVCalculator, "calculate_batch", counting_batch)
+    return calls
+
+def post_bulk(client: TestClient, recordings: List[dict]):
+    return client.post("/api/hrv/1/readings:bulk", json={"readings": recordings})
+
+def test_bulk_results_per_recording(client, sessions, batch_sizes):
+    nights = [night(seed) for seed in range(3)]
+    recordings = [
+        recording(1, nights[0]),
+        recording(2, nights[1]),
+        recording(3, night(9, 20)),  # Too short
+        recording(1, nights[0]),  # Repeated within the request
+        recording(4, nights[2]),
+    ]
+    response = post_bulk(client, recordings)
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result["status_code"] for result in results] == [201, 201, 400, 200, 201]
+    assert "Invalid data quality" in results[2]["detail"]
+    assert results[3]["reading"] == results[0]["reading"]
+
+    # The valid recordings went through one calculate_batch call
+    assert batch_sizes == [3]
+    with sessions() as db:
+        assert db.query(HRVReading).count() == 3
+        for result, rr_intervals in zip([results[0], results[1], results[4]], nights):
+            # Same metrics as a single upload, and the intervals archived
+            reading = db.get(HRVReading, result["reading"]["id"])
+            for metric, value in analyze_recording(np.array(rr_intervals))['metrics'].items():
+                assert getattr(reading, metric) == pytest.approx(value, rel=1e-9), metric
+            assert decode_rr(reading.raw_recording.rr_data).tolist() == rr_intervals
+
+def test_recordings_are_batched_in_chunks(client, monkeypatch, batch_sizes):
+    map_batches = hrv.compute_pool.map_batches
+    monkeypatch.setattr(
+        hrv.compute_pool, "map_batches",
+        lambda func, recordings: map_batches(func, recordings, chunk_size=2)
+    )
+    response = post_bulk(client, [recording(day, night(day)) for day in range(1, 6)])
+    assert [result["status_code"] for result in response.json()] == [201] * 5
+    assert batch_sizes == [2, 2, 1]
+
+def test_stored_recordings_are_not_recomputed(client, sessions, batch_sizes):
+    recordings = [recording(1, night(1)), recording(2, night(2))]
+    first = post_bulk(client, recordings).json()
+    second = post_bulk(client, recordings).json()
+
+    assert [result["status_code"] for result in second] == [200, 200]
+    assert [result["reading"] for result in second] == [result["reading"] for result in first]
+    assert batch_sizes == [2]
+    with sessions() as db:
+        assert db.query(HRVReading).count() == 2
+
+def test_concurrent_upload_conflict(client, sessions, monkeypatch):
+    recordings = [recording(1, night(1)), recording(2, night(2))]
+    map_batches = hrv.compute_pool.map_batches
+
+    def store_first_elsewhere(func, rr_recordings):
+        # Another upload stores the second recording while this one computes
+        with sessions() as db:
+            db.add(HRVReading(
+                user_id=1, recorded_at=hrv.RRIntervalsInput(**recordings[1]).recorded_at,
+                content_hash=hrv._content_hash(1, hrv.RRIntervalsInput(**recordings[1]))
+            ))
+            db.commit()
+        return map_batches(func, rr_recordings)
+
+    monkeypatch.setattr(hrv.compute_pool, "map_batches", store_first_elsewhere)
+    response = post_bulk(client, recordings)
+    assert response.status_code == 409
+    assert "concurrent upload" in response.json()["detail"]
+
+    # The whole transaction was rolled back
+    with sessions() as db:
+        assert db.query(HRVReading).count() == 1
+        assert db.query(RawRecording).count() == 0
@@ -0,0 +1,39 @@
+"""
+Conditional GET helpers (backend/api/caching.py): weak ETags matched with
+weak comparison, whatever encoding the client was sent.
+"""
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+from backend.api.caching import check_etag, make_etag
+
+def request(if_none_match: str = None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_etags_are_weak_and_depend_on_every_part():
+    etag = make_etag(1, 7)
+    assert etag == 'W/"1.7"'
+    assert make_etag(1, 7, 30) != make_etag(1, 7, 31) != etag
+    assert make_etag(1, 7, 30).startswith('W/"1.7.')
+
+def test_etag_and_vary_are_set_without_if_none_match():
+    response = Response()
+    check_etag(request(), response, make_etag(1, 7))
+    assert response.headers["ETag"] == 'W/"1.7"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+@pytest.mark.parametrize("if_none_match", [
+    'W/"1.7"', '"1.7"', '"1.6", W/"1.7"', 'W/"1.6",W/"1.7"', '*'
+], ids=["weak", "strong", "list", "no_spaces", "any"])
+def test_matching_etag_is_not_modified(if_none_match):
+    with pytest.raises(HTTPException) as raised:
+        check_etag(request(if_none_match), Response(), make_etag(1, 7))
+    assert raised.value.status_code == 304
+    assert raised.value.headers == {"ETag": 'W/"1.7"', "Vary": "Accept-Encoding"}
+
+@pytest.mark.parametrize("if_none_match", ['W/"1.6"', '"2.7"', 'W/"1.7.0"', '1.7'])
+def test_stale_etag_is_answered(if_none_match):
+    response = Response()
+    check_etag(request(if_none_match), response, make_etag(1, 7))
+    assert response.headers["ETag"] == 'W/"1.7"'
@@ -0,0 +1,311 @@
+"""
+History endpoints (GET /{user_id}/readings and /{user_id}/readiness) served
+from the async session: keyset pages and their Link header, field
+projection, the columnar format, the JSON encoding of column rows and
+conditional GETs answered with 304 from the async session.
+"""
+from datetime import datetime, timedelta
+from typing import Iterator, List
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from backend.database import get_async_db, get_db
+from backend.models import Baseline, EnergyBudget, HRVReading, User
+from backend.storage import upgrade_schema
+from backend.api import energy_budget, hrv, projection
+from backend.api.pagination import encode_cursor
+
+START = datetime(2024, 3, 1, 7, 0)
+# Readings per timestamp: several share a recorded_at, so pages split ties
+TIES = [1, 3, 1, 4, 2, 1, 5, 1]
+
+@pytest.fixture
+def sessions(tmp_path) -> Iterator[sessionmaker]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    upgrade_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([
+            User(id=1, email="history@example.com", hashed_password="x"),
+            User(id=2, email="other@example.com", hashed_password="x"),
+        ])
+        for day, count in enumerate(TIES):
+            for repeat in range(count):
+                db.add(HRVReading(
+                    user_id=1, recorded_at=START + timedelta(days=day),
+                    rmssd=40.0 + day + repeat / 10, mean_hr=60.0 + repeat
+                ))
+            db.add(EnergyBudget(
+                user_id=1, date=START + timedelta(days=day), energy_budget=50.0 + day,
+                hrv_score=60.0, rhr_score=55.0, sleep_score=70.0, stress_score=50.0,
+                hrv_zscore=0.1 * day, rhr_zscore=-0.2, pem_risk_level="low",
+                consecutive_low_days=0, activity_recommendation="Normal activity"
+            ))
+        db.add(Baseline(
+            user_id=1, start_date=START - timedelta(days=28), end_date=START - timedelta(days=1),
+            days_count=28, mean_ln_rmssd=3.7, sd_ln_rmssd=0.2, mean_rmssd=42.0, mean_hr=60.0, sd_hr=3.0, is_active=True
+        ))
+        db.add(HRVReading(user_id=2, recorded_at=START, rmssd=30.0))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+@pytest.fixture
+def client(sessions, tmp_path) -> Iterator[TestClient]:
+    # The endpoints read through aiosqlite on the same database file
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}", poolclass=NullPool)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    app = FastAPI()
+    app.include_router(hrv.router, prefix="/api/hrv")
+    app.include_router(energy_budget.router, prefix="/api/readiness")
+
+    def get_test_db():
+        with sessions() as db:
+            yield db
+
+    async def get_test_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    with TestClient(app) as client:
+        yield client
+
+def newest_first(sessions) -> List[int]:
+    """Ids of user 1's readings in history order"""
+    with sessions() as db:
+        readings = db.query(HRVReading).filter(HRVReading.user_id == 1)
+        return [reading.id for reading in readings.order_by(HRVReading.recorded_at.desc(), HRVReading.id.desc())]
+
+def links(response) -> dict:
+    """rel -> URL of a Link header"""
+    result = {}
+    for link in filter(None, response.headers.get("link", "").split(", ")):
+        url, rel = link.split("; ")
+        result[rel[len('rel="'):-1]] = url[1:-1]
+    return result
+
+def walk(client: TestClient, url: str, rel: str) -> List[tuple]:
+    """(URL, reading ids) of every page, following rel links from url"""
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append((url, [reading["id"] for reading in response.json()]))
+        url = links(response).get(rel)
+    return pages
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 7, 18, 30])
+def test_pages_round_trip_across_ties(client, sessions, limit):
+    expected = newest_first(sessions)
+    assert len(expected) == sum(TIES)
+
+    # Older pages to the end, then newer pages back from the oldest page
+    forward = walk(client, f"/api/hrv/1/readings?limit={limit}", "next")
+    assert [id_ for _, page in forward for id_ in page] == expected
+    assert all(len(page) == limit for _, page in forward[:-1])
+
+    backward = walk(client, forward[-1][0], "prev")
+    assert [page for _, page in backward] == [page for _, page in reversed(forward)]
+
+def test_readiness_pages_round_trip(client):
+    forward = walk(client, "/api/readiness/1/readiness?limit=3", "next")
+    dates = [START + timedelta(days=day) for day in reversed(range(len(TIES)))]
+    assert [len(page) for _, page in forward] == [3, 3, 2]
+
+    response = client.get("/api/readiness/1/readiness?limit=30")
+    assert [datetime.fromisoformat(score["date"]) for score in response.json()] == dates
+    assert [id_ for _, page in forward for id_ in page] == [score["id"] for score in response.json()]
+
+def test_link_header(client):
+    first = client.get("/api/hrv/1/readings?limit=5&fields=rmssd")
+    assert set(links(first)) == {"next"}
+    assert first.headers["link"].endswith('>; rel="next"')
+
+    # Other parameters are kept and the cursor is replaced
+    middle_url = links(first)["next"]
+    assert middle_url.startswith("http://testserver/api/hrv/1/readings?")
+    assert "limit=5" in middle_url and "fields=rmssd" in middle_url
+    middle = client.get(middle_url)
+    assert set(links(middle)) == {"next", "prev"}
+    for url in links(middle).values():
+        assert url.count("before=") + url.count("after=") == 1
+        assert "limit=5" in url and "fields=rmssd" in url
+
+    # The newer page of the second page is the first page
+    assert client.get(links(middle)["prev"]).json() == first.json()
+
+def test_single_page_has_no_link_header(client):
+    response = client.get("/api/hrv/1/readings?limit=30")
+    assert len(response.json()) == sum(TIES)
+    assert "link" not in response.headers
+
+    assert client.get("/api/hrv/2/readings").json()[0]["rmssd"] == 30.0
+
+@pytest.mark.parametrize("query", ["before=not-a-cursor", "after=%%%", "before=MjAyNA"])
+def test_malformed_cursor_is_rejected(client, query):
+    response = client.get(f"/api/hrv/1/readings?{query}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_both_cursors_are_rejected(client):
+    cursor = links(client.get("/api/hrv/1/readings?limit=2"))["next"].split("before=")[1]
+    response = client.get(f"/api/hrv/1/readings?before={cursor}&after={cursor}")
+    assert response.status_code == 400
+
+def test_fields_select_columns(client):
+    readings = client.get("/api/hrv/1/readings?limit=3&fields=rmssd,mean_hr").json()
+    assert len(readings) == 3
+    # id and recorded_at always come first
+    assert all(list(reading) == ["id", "recorded_at", "rmssd", "mean_hr"] for reading in readings)
+
+    full = client.get("/api/hrv/1/readings?limit=3").json()
+    assert set(full[0]) == set(hrv.HRVReadingResponse.model_fields)
+    for reading, full_reading in zip(readings, full):
+        assert reading == {name: full_reading[name] for name in reading}
+
+def test_repeated_and_always_included_fields(client):
+    readings = client.get("/api/hrv/1/readings?limit=1&fields=rmssd, id,rmssd,,recorded_at").json()
+    assert list(readings[0]) == ["id", "recorded_at", "rmssd"]
+
+@pytest.mark.parametrize("url", [
+    "/api/hrv/1/readings?fields=rmssd,hashed_password",
+    "/api/hrv/1/readings?fields=content_hash",
+    "/api/readiness/1/readiness?fields=rmssd",
+])
+def test_unknown_fields_are_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail.startswith("Unknown fields: ")
+    assert "Available: " in detail
+
+def test_columns_format(client):
+    rows = client.get("/api/hrv/1/readings?limit=4&fields=rmssd").json()
+    columns = client.get("/api/hrv/1/readings?limit=4&fields=rmssd&format=columns").json()
+    assert list(columns) == ["id", "recorded_at", "rmssd"]
+    assert columns == {name: [row[name] for row in rows] for name in columns}
+
+    # Pages and links are the same as for rows
+    response = client.get("/api/readiness/1/readiness?limit=2&format=columns&fields=energy_budget")
+    assert response.json()["energy_budget"] == [57.0, 56.0]
+    assert "format=columns" in links(response)["next"]
+
+def test_columns_format_of_an_empty_page(client):
+    # Nothing is newer than the last day
+    cursor = encode_cursor(START + timedelta(days=len(TIES)), 0)
+    response = client.get(f"/api/hrv/1/readings?after={cursor}&fields=rmssd&format=columns")
+    assert response.status_code == 200
+    assert response.json() == {"id": [], "recorded_at": [], "rmssd": []}
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/api/hrv/1/readings?format=csv").status_code == 422
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch) -> str:
+    """Run with orjson (if installed) and with the standard library fallback"""
+    if request.param == "json":
+        monkeypatch.setattr(projection, "orjson", None)
+    elif projection.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_rows_encode_like_the_response_model(client, sessions, encoder):
+    with sessions() as db:
+        db.add(HRVReading(user_id=2, recorded_at=START + timedelta(days=1), lf_hf_ratio=float("inf"), sdnn=float("-inf")))
+        db.commit()
+        expected = [
+            json.loads(hrv.HRVReadingResponse.model_validate(reading).model_dump_json())
+            for reading in db.query(HRVReading).filter(HRVReading.user_id == 2).order_by(HRVReading.recorded_at.desc())
+        ]
+
+    # Same values as validating every row into the model, infinities as null
+    response = client.get("/api/hrv/2/readings")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected
+    assert expected[0]["lf_hf_ratio"] is None and expected[0]["sdnn"] is None
+
+    single = client.get(f"/api/hrv/2/readings/{expected[0]['id']}")
+    assert single.json() == expected[0]
+
+def test_readiness_rows_encode_like_the_response_model(client, sessions, encoder):
+    with sessions() as db:
+        expected = [
+            json.loads(energy_budget.EnergyBudgetResponse.model_validate(score).model_dump_json())
+            for score in db.query(EnergyBudget).order_by(EnergyBudget.date.desc())
+        ]
+    assert client.get("/api/readiness/1/readiness").json() == expected
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_dumps_writes_non_finite_floats_as_null(encoder, value):
+    content = {"a": [1.5, value], "b": (value,), "at": datetime(2024, 1, 2, 7, 0, 30)}
+    assert json.loads(projection.dumps(content)) == {"a": [1.5, None], "b": [None], "at": "2024-01-02T07:00:30"}
+
+def no_sync_session():
+    raise AssertionError("read endpoints must not open a sync session")
+    yield
+
+@pytest.mark.parametrize("url", [
+    "/api/hrv/1/readings?limit=5",
+    "/api/hrv/1/readings?limit=5&fields=rmssd&format=columns",
+    "/api/readiness/1/readiness",
+    "/api/readiness/1/baseline",
+    "/api/readiness/1/interpretation/42.0/60.0",
+])
+def test_matching_etag_is_not_modified(client, url):
+    client.app.dependency_overrides[get_db] = no_sync_session
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"1.')
+    assert first.headers["vary"] == "Accept-Encoding"
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    # A client that cached the gzip response may echo the tag without W/
+    assert client.get(url, headers={"If-None-Match": etag[2:]}).status_code == 304
+
+def test_single_reading_etag(client, sessions):
+    reading_id = newest_first(sessions)[0]
+    first = client.get(f"/api/hrv/1/readings/{reading_id}")
+    assert client.get(
+        f"/api/hrv/1/readings/{reading_id}", headers={"If-None-Match": first.headers["etag"]}
+    ).status_code == 304
+
+def test_write_changes_the_etag(client, sessions):
+    url = "/api/hrv/1/readings?limit=5"
+    etag = client.get(url).headers["etag"]
+
+    with sessions() as db:
+        db.add(HRVReading(user_id=1, recorded_at=START + timedelta(days=30), rmssd=45.0))
+        db.commit()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["rmssd"] == 45.0
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+def test_other_users_writes_keep_the_etag(client, sessions):
+    url = "/api/hrv/1/readings"
+    etag = client.get(url).headers["etag"]
+    with sessions() as db:
+        db.add(HRVReading(user_id=2, recorded_at=START + timedelta(days=30), rmssd=45.0))
+        db.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+def test_unknown_user_has_no_etag(client):
+    response = client.get("/api/hrv/3/readings", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "etag" not in response.headers
@@ -0,0 +1,76 @@
+"""
+HRVCalculator.calculate_batch (backend/hrv_calculator.py) against the
+per-recording calculate_time_domain and calculate_frequency_domain.
+"""
+from typing import List
+import numpy as np
+import pytest
+from backend.hrv_calculator import BATCH_METRICS, HRVCalculator
+
+TIME_DOMAIN = ('mean_rri', 'mean_hr', 'sdnn', 'rmssd', 'pnn50')
+FREQUENCY_DOMAIN = tuple(metric for metric in BATCH_METRICS if metric not in TIME_DOMAIN)
+
+calculator = HRVCalculator()
+
+def recording(seed: int, n_beats: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    beats = np.arange(n_beats)
+    return 850.0 + 30.0 * np.sin(beats / 5.0) + 20.0 * np.sin(beats / 40.0) + rng.normal(0.0, 25.0, n_beats)
+
+def assert_matches_single(batch, recordings: List[np.ndarray]) -> None:
+    """Every batch row equals the per-recording methods (NaN where they raise)"""
+    assert batch['n_intervals'].tolist() == [len(rr) for rr in recordings]
+    for row, rr in enumerate(recordings):
+        time_domain = calculator.calculate_time_domain(rr)
+        for metric in TIME_DOMAIN:
+            assert batch[metric][row] == pytest.approx(time_domain[metric], rel=1e-9), metric
+
+        if len(rr) < 60:
+            assert all(np.isnan(batch[metric][row]) for metric in FREQUENCY_DOMAIN)
+            continue
+        frequency_domain = calculator.calculate_frequency_domain(rr)
+        for metric in FREQUENCY_DOMAIN:
+            assert batch[metric][row] == pytest.approx(frequency_domain[metric], rel=1e-9), metric
+
+def test_ragged_recordings():
+    recordings = [recording(seed, n_beats) for seed, n_beats in enumerate([300, 61, 1200, 450])]
+    assert_matches_single(calculator.calculate_batch(recordings), recordings)
+
+def test_ragged_lists():
+    recordings = [recording(seed, n_beats) for seed, n_beats in enumerate([120, 500])]
+    batch = calculator.calculate_batch([rr.tolist() for rr in recordings])
+    assert_matches_single(batch, recordings)
+
+def test_padded_array():
+    recordings = [recording(seed, n_beats) for seed, n_beats in enumerate([400, 250, 700])]
+    padded = np.full((len(recordings), 700), np.nan)
+    for row, rr in enumerate(recordings):
+        padded[row, :len(rr)] = rr
+    assert_matches_single(calculator.calculate_batch(padded), recordings)
+
+def test_padded_array_with_lengths():
+    recordings = [recording(seed, n_beats) for seed, n_beats in enumerate([400, 250])]
+    # Padding that is not NaN is ignored past each row's length
+    padded = np.zeros((len(recordings), 400))
+    for row, rr in enumerate(recordings):
+        padded[row, :len(rr)] = rr
+    batch = calculator.calculate_batch(padded, lengths=[len(rr) for rr in recordings])
+    assert_matches_single(batch, recordings)
+
+def test_single_short_recording():
+    rr = np.array([800.0, 860.0, 790.0, 805.0])
+    batch = calculator.calculate_batch([rr])
+    assert_matches_single(batch, [rr])
+    assert calculator.batch_to_records(batch)[0]['hf_power'] is None
+
+def test_single_interval_has_no_metrics():
+    batch = calculator.calculate_batch([[800.0]])
+    assert batch['n_intervals'].tolist() == [1]
+    assert all(np.isnan(batch[metric][0]) for metric in BATCH_METRICS if metric not in ('mean_rri', 'mean_hr'))
+
+@pytest.mark.parametrize("recordings", [[], np.empty((0, 10))], ids=["list", "padded"])
+def test_empty_batch(recordings):
+    batch = calculator.calculate_batch(recordings)
+    assert set(batch) == {'n_intervals', *BATCH_METRICS}
+    assert all(len(column) == 0 for column in batch.values())
+    assert calculator.batch_to_records(batch) == []
@@ -0,0 +1,110 @@
+"""
+Streaming accumulators (backend/hrv_stream.py): chunked, merged and
+serialized states give the metrics of the concatenated recording.
+"""
+from typing import List
+import numpy as np
+import pytest
+from backend import nonlinear, spectral
+from backend.hrv_calculator import HRVCalculator
+from backend.hrv_stream import RRAccumulator, WelchAccumulator
+from backend.rr_series import RRSeries
+
+calculator = HRVCalculator()
+
+TIME_DOMAIN = ('mean_rri', 'mean_hr', 'sdnn', 'rmssd', 'pnn50')
+
+def night(n_beats: int = 2000, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    beats = np.arange(n_beats)
+    return 950.0 + 60.0 * np.sin(beats / 7.0) + rng.normal(0.0, 35.0, n_beats)
+
+def split(values: np.ndarray, bounds: List[int]) -> List[np.ndarray]:
+    return np.split(values, bounds)
+
+def merged(rr: np.ndarray, bounds: List[int], mask=None) -> RRAccumulator:
+    """Accumulators built per chunk, then merged left to right"""
+    masks = split(mask, bounds) if mask is not None else [None] * (len(bounds) + 1)
+    parts = [RRAccumulator.from_array(chunk, mask=chunk_mask) for chunk, chunk_mask in zip(split(rr, bounds), masks)]
+    total = RRAccumulator()
+    for part in parts:
+        total.merge(part)
+    return total
+
+def assert_time_domain(accumulator: RRAccumulator, series) -> None:
+    expected = calculator.calculate_time_domain(series)
+    snapshot = accumulator.snapshot()
+    for metric in TIME_DOMAIN:
+        assert snapshot[metric] == pytest.approx(expected[metric], rel=1e-9), metric
+
+def test_merged_chunks_match_calculate_time_domain():
+    rr = night()
+    # Uneven chunks, including a single beat and an empty one
+    bounds = [1, 250, 250, 251, 1300]
+    assert_time_domain(merged(rr, bounds), rr)
+
+def test_extend_matches_beat_by_beat_updates():
+    rr = night(300)
+    by_chunk = RRAccumulator()
+    for chunk in split(rr, [100, 200]):
+        by_chunk.extend(chunk)
+    by_beat = RRAccumulator()
+    for value in rr:
+        by_beat.update(value)
+    assert by_chunk.snapshot() == pytest.approx(by_beat.snapshot(), rel=1e-9)
+
+@pytest.mark.parametrize("bounds", [[400], [401], [402], [399, 401, 403]], ids=["before", "inside", "after", "several"])
+def test_seam_inside_an_artifact(bounds):
+    rr = night()
+    mask = np.zeros(len(rr), dtype=bool)
+    # Corrected beats 400-402: the chunk boundary falls before, inside or after them
+    mask[400:403] = True
+    mask[1500] = True
+    series = RRSeries(rr, mask=mask)
+
+    accumulator = merged(rr, bounds, mask)
+    assert_time_domain(accumulator, series)
+    assert accumulator.n_diffs == len(series.nn_diffs)
+
+    sd1, sd2 = accumulator.poincare()
+    expected_sd1, expected_sd2 = nonlinear.poincare(rr, series.nn_diffs)
+    assert sd1 == pytest.approx(expected_sd1, rel=1e-9)
+    assert sd2 == pytest.approx(expected_sd2, rel=1e-9)
+
+def test_state_round_trips_between_workers():
+    rr = night()
+    mask = np.zeros(len(rr), dtype=bool)
+    mask[999:1001] = True
+    first = RRAccumulator.from_array(rr[:1000], mask=mask[:1000])
+    second = RRAccumulator.from_dict(RRAccumulator.from_array(rr[1000:], mask=mask[1000:]).to_dict())
+
+    restored = RRAccumulator.from_dict(first.to_dict()).merge(second)
+    assert_time_domain(restored, RRSeries(rr, mask=mask))
+
+def test_mismatched_mask_is_rejected():
+    with pytest.raises(ValueError):
+        RRAccumulator.from_array([800.0, 810.0], mask=[False])
+
+@pytest.mark.parametrize("chunk", [1, 37, 500, 2000])
+def test_welch_accumulator_matches_calculate_frequency_domain(chunk):
+    rr = night()
+    spectrum = WelchAccumulator()
+    for start in range(0, len(rr), chunk):
+        spectrum.extend(rr[start:start + chunk])
+    table, psd = spectrum.finish()
+    powers = spectral.integrate_bands(table, psd)
+
+    expected = calculator.calculate_frequency_domain(rr)
+    for band in ('vlf_power', 'lf_power', 'hf_power'):
+        assert float(powers[band]) == pytest.approx(expected[band], rel=1e-9), band
+
+def test_welch_accumulator_shorter_than_one_segment():
+    rr = night(60)
+    spectrum = WelchAccumulator()
+    spectrum.extend(rr[:30])
+    spectrum.extend(rr[30:])
+    table, psd = spectrum.finish()
+    assert spectrum.n_segments == 0
+
+    expected = calculator.calculate_frequency_domain(rr)
+    assert float(spectral.integrate_bands(table, psd)['hf_power']) == pytest.approx(expected['hf_power'], rel=1e-9)
@@ -0,0 +1,62 @@
+"""
+IngestQueue (backend/ingest_queue.py) leases: a job that runs longer than
+its lease keeps it, and a job whose worker died is claimed again.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from backend.ingest_queue import JOB_DONE, JOB_RUNNING, IngestQueue
+from backend.models import IngestJob, User
+from backend.storage import upgrade_schema
+
+LEASE = 0.3
+
+@pytest.fixture
+def sessions(tmp_path) -> Iterator[sessionmaker]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    upgrade_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="queue@example.com", hashed_password="x"))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+def test_long_job_keeps_its_lease(sessions):
+    queue = IngestQueue(workers=0, lease=LEASE)
+    claimed_meanwhile: List[object] = []
+
+    def slow_handler(db: Session, job: IngestJob) -> None:
+        # Other workers polling during the job find nothing due
+        for _ in range(4):
+            time.sleep(LEASE)
+            with sessions() as other:
+                claimed_meanwhile.append(queue.claim(other))
+
+    queue.start(slow_handler)
+    with sessions() as db:
+        job_id = queue.enqueue(db, 1, "application/json", b"{}").id
+        assert queue.run_once(db)
+
+        job = db.get(IngestJob, job_id)
+        assert job.status == JOB_DONE
+        assert job.attempts == 1
+    assert claimed_meanwhile == [None] * 4
+
+def test_job_of_dead_worker_is_claimed_again(sessions):
+    queue = IngestQueue(workers=0, lease=LEASE)
+    with sessions() as db:
+        job_id = queue.enqueue(db, 1, "application/json", b"{}").id
+        # Claimed by a worker that never finishes or renews it
+        assert queue.claim(db).id == job_id
+        assert queue.claim(db) is None
+
+        db.get(IngestJob, job_id).run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        job = queue.claim(db)
+        assert job.id == job_id
+        assert job.status == JOB_RUNNING
+        assert job.attempts == 2
@@ -0,0 +1,75 @@
+"""
+Sample and approximate entropy (backend/nonlinear.py) against a direct
+O(N²) computation of their definitions, and their cost on long recordings.
+"""
+import time
+from typing import List, Tuple
+import numpy as np
+import pytest
+from backend import nonlinear
+from backend.nonlinear import ENTROPY_WINDOW_BEATS, entropies
+
+def naive_entropies(rr: np.ndarray, m: int = 2) -> Tuple[float, float]:
+    """SampEn and ApEn comparing every pair of templates, r = 0.2 × SDNN"""
+    r = 0.2 * np.std(rr, ddof=1)
+    n = len(rr)
+
+    def matches(length: int, count: int) -> np.ndarray:
+        """Templates within r of each of the first count templates, self included"""
+        templates = np.array([rr[i:i + length] for i in range(count)])
+        distance = np.max(np.abs(templates[:, None, :] - templates[None, :, :]), axis=2)
+        return np.sum(distance <= r, axis=1)
+
+    b_count = (np.sum(matches(m, n - m)) - (n - m)) / 2
+    a_count = (np.sum(matches(m + 1, n - m)) - (n - m)) / 2
+    sample = -np.log(a_count / b_count)
+    approximate = (
+        np.mean(np.log(matches(m, n - m + 1) / (n - m + 1)))
+        - np.mean(np.log(matches(m + 1, n - m) / (n - m)))
+    )
+    return float(sample), float(approximate)
+
+@pytest.mark.parametrize("n_beats", [450, 1000, 1500])
+def test_entropies_match_naive_definition(n_beats):
+    rng = np.random.default_rng(n_beats)
+    # Slow trend plus beat-to-beat noise, like a long recording
+    rr = 800.0 + 50.0 * np.sin(np.arange(n_beats) / 40.0) + rng.normal(0.0, 30.0, n_beats)
+
+    sample, approximate = entropies(rr)
+    expected_sample, expected_approximate = naive_entropies(rr)
+
+    assert sample == pytest.approx(expected_sample, rel=1e-12)
+    assert approximate == pytest.approx(expected_approximate, rel=1e-12)
+
+def test_entropies_without_variability():
+    assert entropies(np.full(100, 800.0)) == (None, None)
+
+def test_long_recording_cost_is_bounded_by_windows(monkeypatch):
+    n_beats = 50_000
+    rng = np.random.default_rng(7)
+    rr = 800.0 + 50.0 * np.sin(np.arange(n_beats) / 400.0) + rng.normal(0.0, 30.0, n_beats)
+
+    # Exact counting is quadratic in its input, so its input size bounds the work
+    counted: List[int] = []
+    template_matches = nonlinear._template_matches
+
+    def recording_matches(window, m, r):
+        counted.append(len(window))
+        return template_matches(window, m, r)
+
+    monkeypatch.setattr(nonlinear, "_template_matches", recording_matches)
+    start = time.perf_counter()
+    sample, approximate = entropies(rr)
+    elapsed = time.perf_counter() - start
+
+    assert sum(counted) == n_beats
+    assert max(counted) <= ENTROPY_WINDOW_BEATS
+    assert sum(length ** 2 for length in counted) <= n_beats * ENTROPY_WINDOW_BEATS
+    # About 0.25 s here; the unwindowed count takes several seconds
+    assert elapsed < 2.0
+
+    # The mean of the windows, each exact on its own
+    windows = np.array_split(rr, len(counted))
+    per_window = [entropies(window) for window in windows]
+    assert sample == pytest.approx(np.mean([value for value, _ in per_window]), rel=1e-12)
+    assert approximate == pytest.approx(np.mean([value for _, value in per_window]), rel=1e-12)
@@ -0,0 +1,120 @@
+"""
+The hot per-user queries use the indexes meant for them, on a schema built
+by upgrade_schema (backend/migrations).
+
+Each test fills a scratch SQLite database with a few users' history, runs
+a calculation that filters by user and time range, and inspects SQLite's
+plan (EXPLAIN QUERY PLAN) for every SELECT it issues.
+"""
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from backend.models import Baseline, EnergyBudget, HRVReading, User
+from backend.storage import MIGRATIONS_PATH, _migrations_config, query_plan, schema_signature, upgrade_schema
+from backend.api.energy_budget import baseline_tracker, energy_budget_calc
+
+USERS = 20
+DAYS = 90
+USER_ID = USERS // 2
+
+HEAD = ScriptDirectory(str(MIGRATIONS_PATH)).get_current_head()
+
+def populate(db: Session) -> None:
+    """USERS users with DAYS readings and energy budgets each, and two baselines"""
+    start = datetime.utcnow() - timedelta(days=DAYS)
+    db.execute(insert(User), [
+        {'id': user_id, 'email': f'user{user_id}@example.com', 'hashed_password': 'x'}
+        for user_id in range(1, USERS + 1)
+    ])
+    db.execute(insert(HRVReading), [
+        {'user_id': user_id, 'recorded_at': start + timedelta(days=day), 'rmssd': 40.0 + day % 7, 'mean_hr': 62.0}
+        for user_id in range(1, USERS + 1) for day in range(DAYS)
+    ])
+    db.execute(insert(EnergyBudget), [
+        {'user_id': user_id, 'date': start + timedelta(days=day), 'energy_budget': 60.0, 'hrv_score': 60.0,
+         'hrv_zscore': -0.5, 'rhr_zscore': 0.2}
+        for user_id in range(1, USERS + 1) for day in range(DAYS)
+    ])
+    db.execute(insert(Baseline), [
+        {'user_id': user_id, 'start_date': start, 'end_date': start + timedelta(days=28),
+         'mean_ln_rmssd': 3.7, 'sd_ln_rmssd': 0.2, 'mean_rmssd': 42.0, 'is_active': day == 1}
+        for user_id in range(1, USERS + 1) for day in range(2)
+    ])
+    db.commit()
+
+@pytest.fixture
+def engine(tmp_path) -> Iterator[Engine]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    upgrade_schema(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine) -> Iterator[Session]:
+    with Session(engine) as db:
+        populate(db)
+        yield db
+
+HOT_QUERIES = [
+    ("calculate_baseline", "ix_hrv_readings_user_id_recorded_at",
+     lambda db: baseline_tracker.calculate_baseline(db, USER_ID)),
+    ("calculate_7day_trend", "ix_hrv_readings_user_id_recorded_at",
+     lambda db: baseline_tracker.calculate_7day_trend(db, USER_ID)),
+    ("_assess_pem_risk", "ix_energy_budgets_user_id_date",
+     lambda db: energy_budget_calc._assess_pem_risk(db, USER_ID, -1.5, 0.5, datetime.utcnow())),
+    ("get_readiness_trend", "ix_energy_budgets_user_id_date",
+     lambda db: energy_budget_calc.get_readiness_trend(db, USER_ID, 7)),
+    ("get_active_baseline", "ix_baselines_user_id_active",
+     lambda db: baseline_tracker.get_active_baseline(db, USER_ID)),
+]
+
+@pytest.mark.parametrize("index, call", [query[1:] for query in HOT_QUERIES], ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_index(engine, db, index, call):
+    statements: List[Tuple[str, tuple]] = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, tuple(parameters)))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert statements, "no query issued"
+    for statement in statements:
+        plan = query_plan(db.connection(), *statement)
+        assert any(index in step for step in plan), plan
+        assert not [step for step in plan if step.startswith("SCAN")], plan
+
+@pytest.mark.parametrize("revision", ["0001", "0004", "0007"])
+def test_database_without_migrations_is_stamped(tmp_path, engine, revision):
+    """A database with a revision's schema but no alembic_version is upgraded to head"""
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as connection:
+        command.upgrade(_migrations_config(connection), revision)
+        connection.execute(text("DROP TABLE alembic_version"))
+        connection.execute(text("INSERT INTO users (email, hashed_password) VALUES ('legacy@example.com', 'x')"))
+
+    upgrade_schema(legacy)
+
+    with legacy.connect() as connection, engine.connect() as expected:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == HEAD
+        assert schema_signature(connection) == schema_signature(expected)
+        assert connection.execute(text("SELECT data_version FROM users")).scalar() == 0
+    legacy.dispose()
+
+def test_database_matching_no_revision_is_rejected(tmp_path):
+    unknown = create_engine(f"sqlite:///{tmp_path / 'unknown.db'}")
+    with unknown.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR)"))
+
+    with pytest.raises(RuntimeError):
+        upgrade_schema(unknown)
+    unknown.dispose()
@@ -0,0 +1,73 @@
+"""
+reprocess_hrv.py energy budget phase: recomputing stored budgets with
+unchanged algorithms leaves them unchanged, however often it runs.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from backend.models import Baseline, EnergyBudget, HRVReading, User
+from backend.storage import upgrade_schema
+from backend.api.energy_budget import energy_budget_calc
+from reprocess_hrv import Checkpoint, reprocess_energy_budgets
+
+START = datetime(2026, 9, 1, 7, 0)
+DAYS = 40
+# Days with low RMSSD, including runs long enough for moderate and high PEM risk
+LOW_DAYS = {5, 6, 12, 13, 14, 15, 16, 25, 30, 31, 32}
+
+@pytest.fixture
+def db(tmp_path) -> Iterator[Session]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'reprocess.db'}")
+    upgrade_schema(engine)
+    with sessionmaker(bind=engine)() as db:
+        populate(db)
+        yield db
+    engine.dispose()
+
+def populate(db: Session) -> None:
+    """One user with DAYS readings, a baseline and budgets saved as the API does"""
+    db.add(User(id=1, email="reprocess@example.com", hashed_password="x"))
+    baseline = Baseline(
+        user_id=1, start_date=START - timedelta(days=28), end_date=START - timedelta(days=1),
+        mean_ln_rmssd=3.7, sd_ln_rmssd=0.2, mean_rmssd=42.0, mean_hr=60.0, sd_hr=3.0, is_active=True
+    )
+    db.add(baseline)
+    for day in range(DAYS):
+        db.add(HRVReading(
+            user_id=1, recorded_at=START + timedelta(days=day),
+            rmssd=25.0 if day in LOW_DAYS else 42.0 + day % 5, mean_hr=61.0 + day % 3,
+            hf_power=400.0, lf_hf_ratio=1.5, sleep_quality=70.0
+        ))
+    db.commit()
+
+    for reading in db.query(HRVReading).order_by(HRVReading.recorded_at):
+        readiness_data = energy_budget_calc.calculate_readiness(db, 1, reading, baseline)
+        energy_budget_calc.save_energy_budget(db, 1, reading.recorded_at, readiness_data)
+
+def stored_budgets(db: Session) -> Dict[datetime, Tuple]:
+    db.expire_all()
+    return {
+        budget.date: (budget.hrv_zscore, budget.consecutive_low_days, budget.pem_risk_level, budget.energy_budget)
+        for budget in db.query(EnergyBudget).filter(EnergyBudget.user_id == 1)
+    }
+
+def reprocess(db: Session, tmp_path, chunk_size: int) -> None:
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), {}, restart=True)
+    progress = reprocess_energy_budgets(db, checkpoint, [1], chunk_size)
+    assert progress.rows == DAYS
+
+@pytest.mark.parametrize("chunk_size", [7, 500])
+def test_reprocessing_budgets_is_repeatable(db, tmp_path, chunk_size):
+    saved = stored_budgets(db)
+    assert {risk for _, _, risk, _ in saved.values()} == {"low", "moderate", "high"}
+
+    runs: List[Dict[datetime, Tuple]] = []
+    for _ in range(2):
+        reprocess(db, tmp_path, chunk_size)
+        runs.append(stored_budgets(db))
+
+    # Same as saved by the API, and unchanged by a second run
+    assert runs[0] == saved
+    assert runs[1] == saved
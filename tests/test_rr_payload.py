@@ -0,0 +1,55 @@
+"""
+Every RR upload decoder (backend/api/rr_payload.py) rejects intervals that
+are not finite positive numbers with the same 400.
+"""
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from backend.api.rr_payload import (
+    decode_binary_payload,
+    decode_json_payload,
+    decode_stream_chunk,
+    encode_binary_payload
+)
+
+def json_body(values: str, count: int = 10) -> bytes:
+    """RRIntervalsInput body with the given JSON text in the middle of the intervals"""
+    intervals = ", ".join(["812.5"] * count + [values] + ["790"] * count)
+    return f'{{"rr_intervals": [{intervals}], "recorded_at": "2024-01-15T07:00:00"}}'.encode()
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", "1e400"])
+@pytest.mark.parametrize("count", [10, 5000], ids=["small", "fast_path"])
+def test_json_rejects_non_finite_intervals(value, count):
+    with pytest.raises(HTTPException) as error:
+        decode_json_payload(json_body(value, count))
+    assert error.value.status_code == 400
+    assert error.value.detail == "Malformed RR payload: intervals must be finite numbers"
+
+@pytest.mark.parametrize("count", [10, 5000], ids=["small", "fast_path"])
+def test_json_rejects_non_positive_intervals(count):
+    with pytest.raises(HTTPException) as error:
+        decode_json_payload(json_body("-812", count))
+    assert error.value.status_code == 400
+    assert error.value.detail == "Malformed RR payload: intervals must be positive"
+
+def test_json_and_binary_share_the_error():
+    binary = encode_binary_payload(np.array([812.0, np.nan, 790.0]), datetime(2024, 1, 15, 7), sample_type=2)
+    with pytest.raises(HTTPException) as binary_error:
+        decode_binary_payload(binary)
+    with pytest.raises(HTTPException) as json_error:
+        decode_json_payload(json_body("NaN"))
+    assert binary_error.value.detail == json_error.value.detail
+
+@pytest.mark.parametrize("line", [b"[812, NaN, 790]", b"[812, 1e400]", b"[812, 0, 790]"])
+def test_stream_chunk_rejects_invalid_intervals(line):
+    with pytest.raises(HTTPException) as error:
+        decode_stream_chunk(line, 3)
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("Malformed RR payload: line 3: intervals must be")
+
+def test_valid_json_intervals_decode():
+    values = [812.5, 790.0, 845.25]
+    body = json.dumps({"rr_intervals": values, "recorded_at": "2024-01-15T07:00:00"}).encode()
+    assert decode_json_payload(body).rr_intervals.tolist() == values
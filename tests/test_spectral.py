@@ -0,0 +1,152 @@
+"""
+Spectral estimators (backend/spectral.py) against direct computations:
+Lomb-Scargle against scipy.signal.lombscargle and Burg AR against known
+AR(2) processes, and band integration against np.trapezoid.
+"""
+import numpy as np
+import pytest
+from scipy import signal
+from backend import spectral
+from backend.hrv_calculator import HRVCalculator
+from backend.rr_series import RRSeries
+
+def uneven_rr(n_beats: int = 600, seed: int = 0) -> np.ndarray:
+    """RR intervals with LF and HF oscillations, so the beat times are uneven"""
+    rng = np.random.default_rng(seed)
+    beats = np.arange(n_beats)
+    return 900.0 + 40.0 * np.sin(beats / 12.0) + 50.0 * np.sin(beats / 1.8) + rng.normal(0.0, 30.0, n_beats)
+
+def reference_lomb_psd(times: np.ndarray, values: np.ndarray, freqs: np.ndarray) -> np.ndarray:
+    """Direct O(N × frequencies) Lomb-Scargle, scaled like lomb_scargle_psd"""
+    periodogram = signal.lombscargle(times, values - np.mean(values), 2 * np.pi * freqs)
+    return 2 * periodogram * (times[-1] - times[0]) / len(times)
+
+@pytest.mark.parametrize("n_beats", [120, 600, 3000])
+def test_lomb_scargle_matches_scipy(n_beats):
+    rr = uneven_rr(n_beats)
+    onsets = RRSeries(rr).onsets
+    table = spectral.lomb_scargle_grid(onsets[-1])
+
+    psd = spectral.lomb_scargle_psd(onsets, rr, table.freqs)
+    expected = reference_lomb_psd(onsets, rr, table.freqs)
+    assert np.max(np.abs(psd - expected)) <= 1e-4 * np.max(expected)
+
+def test_lomb_band_powers_match_scipy():
+    rr = uneven_rr()
+    onsets = RRSeries(rr).onsets
+    table = spectral.lomb_scargle_grid(onsets[-1])
+    expected = reference_lomb_psd(onsets, rr, table.freqs)
+
+    metrics = HRVCalculator().calculate_frequency_domain(rr, method='lomb')
+    # Extirpolation error grows towards the top of the grid, so the bands
+    # agree to 1e-4 of the total power rather than of their own power
+    tolerance = 1e-4 * np.trapezoid(expected, table.freqs)
+    for (name, (low, high)) in spectral.FREQUENCY_BANDS:
+        in_band = (table.freqs >= low) & (table.freqs < high)
+        power = np.trapezoid(expected[in_band], table.freqs[in_band])
+        assert metrics[f'{name}_power'] == pytest.approx(power, abs=tolerance), name
+
+def test_lomb_scargle_finds_the_oscillation():
+    # A pure 0.25 Hz oscillation sampled at uneven times
+    rng = np.random.default_rng(1)
+    times = np.cumsum(rng.uniform(0.6, 1.2, 800))
+    values = 900.0 + 30.0 * np.sin(2 * np.pi * 0.25 * times)
+    table = spectral.lomb_scargle_grid(times[-1] - times[0])
+
+    psd = spectral.lomb_scargle_psd(times, values, table.freqs)
+    assert table.freqs[np.argmax(psd)] == pytest.approx(0.25, abs=2 * table.freqs[0])
+
+def ar2_process(n_samples: int = 20000, radius: float = 0.95, peak: float = 0.25, fs: float = 4.0):
+    """AR(2) series with poles at radius·e^{±iθ}, θ = 2π·peak/fs, and its coefficients"""
+    theta = 2 * np.pi * peak / fs
+    coefficients = np.array([1.0, -2 * radius * np.cos(theta), radius ** 2])
+    noise = np.random.default_rng(4).normal(0.0, 1.0, n_samples)
+    # x[t] = -a1·x[t-1] - a2·x[t-2] + e[t]
+    return signal.lfilter([1.0], coefficients, noise), coefficients
+
+def test_burg_recovers_ar2_coefficients():
+    series, coefficients = ar2_process()
+    fitted, error = spectral.burg_ar(series, 2)
+    assert fitted == pytest.approx(coefficients, abs=0.01)
+    assert error == pytest.approx(1.0, rel=0.05)
+
+@pytest.mark.parametrize("criterion", ["aic", "fpe"])
+def test_burg_order_criterion_finds_ar2(criterion):
+    series, coefficients = ar2_process()
+    fitted, _ = spectral.burg_ar(series, 12, criterion)
+    # Higher orders than 2 may only add negligible coefficients
+    assert 3 <= len(fitted) <= 5
+    assert fitted[:3] == pytest.approx(coefficients, abs=0.02)
+
+def test_ar_psd_peak_of_ar2_process():
+    fs = 4.0
+    series, coefficients = ar2_process(fs=fs)
+    table, psd = spectral.ar_psd(series, fs=fs, order=2)
+
+    # Peak of the true AR(2) spectrum on the same grid
+    transfer = np.exp(-2j * np.pi * np.outer(table.freqs / fs, np.arange(3))) @ coefficients
+    true_peak = table.freqs[np.argmax(1 / np.abs(transfer) ** 2)]
+    assert table.freqs[np.argmax(psd)] == pytest.approx(true_peak, abs=2 * (table.freqs[1] - table.freqs[0]))
+    assert true_peak == pytest.approx(0.25, abs=0.01)
+
+@pytest.mark.parametrize("n_samples", [5, 16])
+def test_ar_order_not_below_series_length_is_rejected(n_samples):
+    series = np.random.default_rng(5).normal(size=n_samples)
+    with pytest.raises(ValueError, match="too short"):
+        spectral.burg_ar(series, 16)
+    with pytest.raises(ValueError, match="too short"):
+        spectral.ar_psd(series, fs=4.0, order=16)
+
+def test_unknown_ar_criterion_is_rejected():
+    with pytest.raises(ValueError):
+        spectral.burg_ar(np.arange(100.0), 4, 'bic')
+
+# Standard bands plus bands narrower than MIN_BAND_WIDTH (down to between
+# two grid points) and bands reaching or lying above MAX_BAND_FREQ
+EDGE_BANDS = spectral.FREQUENCY_BANDS + (
+    ('narrow', (7 / 64, 7 / 64 + 0.75 * spectral.MIN_BAND_WIDTH)),
+    ('between_points', (0.2001, 0.2002)),
+    ('edge', (0.38, spectral.MAX_BAND_FREQ + 0.05)),
+    ('above', (spectral.MAX_BAND_FREQ + 0.1, spectral.MAX_BAND_FREQ + 0.5)),
+    ('all', (0.0, 10.0)),
+)
+
+def trapezoid_bands(freqs: np.ndarray, psd: np.ndarray, bands) -> dict:
+    """np.trapezoid over the grid points in [low, high) of each band"""
+    powers = {}
+    for name, (low, high) in bands:
+        in_band = (freqs >= low) & (freqs < high)
+        powers[f'{name}_power'] = np.trapezoid(psd[..., in_band], freqs[in_band], axis=-1)
+    return powers
+
+@pytest.mark.parametrize("grid", [
+    spectral.welch_band_table(4.0, 256, EDGE_BANDS),
+    spectral.welch_band_table(4.0, 100, EDGE_BANDS),
+    spectral.spectrum_grid(0.40, 512, EDGE_BANDS),
+    spectral.lomb_scargle_grid(3600.0, bands=EDGE_BANDS),
+], ids=["welch_256", "welch_100", "ar", "lomb"])
+def test_integrate_bands_matches_trapezoid(grid):
+    psd = np.random.default_rng(6).uniform(10.0, 1000.0, (3, len(grid.freqs)))
+    expected = trapezoid_bands(grid.freqs, psd, EDGE_BANDS)
+
+    # One spectrum and a batch of spectra
+    single = spectral.integrate_bands(grid, psd[0])
+    batch = spectral.integrate_bands(grid, psd)
+    for name in grid.names:
+        assert single[name] == pytest.approx(expected[name][0], rel=1e-12), name
+        assert batch[name] == pytest.approx(expected[name], rel=1e-12), name
+
+def test_bands_without_two_points_have_zero_power():
+    grid = spectral.welch_band_table(4.0, 256, EDGE_BANDS)
+    powers = spectral.integrate_bands(grid, np.ones(len(grid.freqs)))
+    # Narrower than MIN_BAND_WIDTH but aligned to hold two points of the 1/64 Hz grid
+    assert powers['narrow_power'] == pytest.approx(1 / 64)
+    assert powers['between_points_power'] == 0.0
+
+    ar_grid = spectral.spectrum_grid(0.40, 512, EDGE_BANDS)
+    assert spectral.integrate_bands(ar_grid, np.ones(512))['above_power'] == 0.0
+
+def test_band_tables_are_cached():
+    assert spectral.welch_band_table(4.0, 256) is spectral.welch_band_table(4.0, 256)
+    table = spectral.spectrum_grid(0.40, 512)
+    assert not table.freqs.flags.writeable
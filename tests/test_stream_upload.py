@@ -0,0 +1,120 @@
+"""
+NDJSON stream uploads (POST /{user_id}/readings:stream): the archive is
+written as chunks arrive, the beat count is capped, and re-uploads skip
+the artifact correction.
+"""
+import json
+from typing import Iterator, List
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.database import get_db
+from backend.models import HRVReading, User
+from backend.rr_archive import decode_rr
+from backend.storage import upgrade_schema
+from backend.api import hrv
+
+RECORDED_AT = "2024-01-15T07:00:00"
+
+def stream_body(rr_intervals: np.ndarray, chunk: int = 1000) -> bytes:
+    """Header line, then the intervals as JSON arrays of chunk beats"""
+    lines = [json.dumps({"recorded_at": RECORDED_AT, "sleep_duration": 7.5})]
+    lines += [json.dumps(rr_intervals[start:start + chunk].tolist()) for start in range(0, len(rr_intervals), chunk)]
+    return "\n".join(lines).encode()
+
+def night(seed: int, n_beats: int = 6000) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.round(900.0 + 40.0 * np.sin(np.arange(n_beats) / 6.0) + rng.normal(0.0, 15.0, n_beats))
+
+@pytest.fixture
+def sessions(tmp_path) -> Iterator[sessionmaker]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'stream.db'}")
+    upgrade_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, email="stream@example.com", hashed_password="x"))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+@pytest.fixture
+def client(sessions) -> Iterator[TestClient]:
+    app = FastAPI()
+    app.include_router(hrv.router, prefix="/api/hrv")
+
+    def get_test_db():
+        with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def corrected_beats(monkeypatch) -> List[int]:
+    """Number of beats handed to HRVStream.extend, per call"""
+    calls: List[int] = []
+    extend = hrv.HRVStream.extend
+
+    def counting_extend(self, rr_intervals):
+        calls.append(len(rr_intervals))
+        extend(self, rr_intervals)
+
+    monkeypatch.setattr(hrv.HRVStream, "extend", counting_extend)
+    return calls
+
+def post_stream(client: TestClient, body: bytes):
+    return client.post(
+        "/api/hrv/1/readings:stream",
+        content=body,
+        headers={"content-type": "application/x-ndjson"}
+    )
+
+def test_stream_archives_every_chunk(client, sessions):
+    rr_intervals = night(1)
+    response = post_stream(client, stream_body(rr_intervals))
+    assert response.status_code == 201
+
+    with sessions() as db:
+        reading = db.get(HRVReading, response.json()["id"])
+        assert reading.raw_recording.beat_count == len(rr_intervals)
+        assert np.array_equal(decode_rr(reading.raw_recording.rr_data), rr_intervals)
+
+def test_stream_over_beat_limit_is_rejected(client, sessions, monkeypatch):
+    monkeypatch.setattr(hrv, "MAX_STREAM_BEATS", 2500)
+    response = post_stream(client, stream_body(night(1)))
+    assert response.status_code == 413
+
+    with sessions() as db:
+        assert db.query(HRVReading).count() == 0
+
+def test_repeated_stream_skips_correction(client, corrected_beats):
+    body = stream_body(night(1))
+    first = post_stream(client, body)
+    assert first.status_code == 201
+    assert sum(corrected_beats) == 6000
+
+    corrected_beats.clear()
+    second = post_stream(client, body)
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert corrected_beats == []
+
+def test_changed_stream_at_same_time_is_corrected_from_archive(client, corrected_beats):
+    assert post_stream(client, stream_body(night(1))).status_code == 201
+
+    changed = night(2)
+    corrected_beats.clear()
+    response = post_stream(client, stream_body(changed))
+    assert response.status_code == 201
+    assert sum(corrected_beats) == len(changed)
+
+    # Same metrics as correcting the changed night directly
+    stream = hrv.HRVStream()
+    stream.extend(changed)
+    expected = stream.finish()['metrics']
+    for metric in ("rmssd", "sdnn", "hf_power"):
+        assert response.json()[metric] == pytest.approx(expected[metric], rel=1e-9)